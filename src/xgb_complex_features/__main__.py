@@ -12,7 +12,23 @@ def _build_parser() -> argparse.ArgumentParser:
     sub = parser.add_subparsers(dest="command", required=True)
 
     p_run = sub.add_parser("run", help="Run an experiment grid from YAML config.")
-    p_run.add_argument("--config", required=True, help="Path to YAML config.")
+    run_src = p_run.add_mutually_exclusive_group(required=True)
+    run_src.add_argument("--config", help="Path to YAML config.")
+    run_src.add_argument("--resume", help="Existing run directory; only specs missing from its shard manifest are run.")
+
+    p_plan = sub.add_parser("plan", help="Dry-run a config: grid size, compute/memory estimates, suggested n_jobs.")
+    p_plan.add_argument("--config", required=True, help="Path to YAML config.")
+    p_plan.add_argument("--output", help="Optional path to write the plan as JSON.")
+
+    p_prof = sub.add_parser("profile", help="Run one dataset spec under cProfile and write hot-function tables.")
+    p_prof.add_argument("--config", required=True, help="Path to YAML config.")
+    p_prof.add_argument("--task", required=True, help="Task id from the config.")
+    p_prof.add_argument("--regime", required=True, help="Regime id from the config.")
+    p_prof.add_argument("--n", required=True, type=int, help="Dataset size (need not be in n_values).")
+    p_prof.add_argument("--seed", type=int, help="Seed (default: first seed in the config).")
+    p_prof.add_argument("--tracemalloc", action="store_true", help="Add a separate tracemalloc pass.")
+    p_prof.add_argument("--top", type=int, default=50, help="Rows per hot-function table.")
+    p_prof.add_argument("--output", help="Output directory (default: <base_dir>/profile/<spec_id>).")
 
     p_agg = sub.add_parser("aggregate", help="Aggregate run-level results into summaries and deltas.")
     p_agg.add_argument("--input", required=True, help="Input run directory (contains results).")
@@ -27,6 +43,20 @@ def _build_parser() -> argparse.ArgumentParser:
     p_work.add_argument("--aggregate-output", help="Directory for aggregated tables (default: <run_dir>/aggregate).")
     p_work.add_argument("--report", help="Path to report.md (default: <aggregate_output>/report.md).")
 
+    p_trace = sub.add_parser("trace", help="Merge a traced run's per-worker span files into one Chrome trace JSON.")
+    p_trace.add_argument("--input", required=True, help="Run directory (contains trace/).")
+    p_trace.add_argument("--output", help="Path to trace JSON (default: <run_dir>/trace.json).")
+
+    p_rediag = sub.add_parser("rediagnose", help="Recompute invariance diagnostics of a run from its stored models.")
+    p_rediag.add_argument("--run", required=True, help="Run directory (contains results and config_source.yaml).")
+    p_rediag.add_argument("--config", help="Config with the new diagnostics settings (default: the run's config).")
+    p_rediag.add_argument("--n-jobs", type=int, help="Parallel datasets (default: runner.n_jobs).")
+
+    p_remetric = sub.add_parser("remetric", help="Recompute test metrics and bootstrap CIs from stored predictions.")
+    p_remetric.add_argument("--run", required=True, help="Run directory (contains results and config_source.yaml).")
+    p_remetric.add_argument("--config", help="Config with the new metrics settings (default: the run's config).")
+    p_remetric.add_argument("--n-jobs", type=int, help="Parallel datasets (default: runner.n_jobs).")
+
     sub.add_parser("smoke", help="Run the end-to-end smoke suite (run+aggregate+report).")
 
     return parser
@@ -39,7 +69,29 @@ def main(argv: list[str] | None = None) -> int:
     if args.command == "run":
         from xgb_complex_features.runner.execute import run_experiment
 
-        run_experiment(config_path=args.config)
+        run_experiment(config_path=args.config, resume_dir=args.resume)
+        return 0
+    if args.command == "plan":
+        from xgb_complex_features.runner.plan import format_plan, plan_experiment, write_plan
+
+        plan = plan_experiment(config_path=args.config)
+        sys.stdout.write(format_plan(plan))
+        if args.output:
+            write_plan(plan, args.output)
+        return 0
+    if args.command == "profile":
+        from xgb_complex_features.runner.profile import profile_spec
+
+        profile_spec(
+            config_path=args.config,
+            task_id=args.task,
+            regime_id=args.regime,
+            n=args.n,
+            seed=args.seed,
+            trace_memory=args.tracemalloc,
+            top=args.top,
+            output_dir=args.output,
+        )
         return 0
     if args.command == "aggregate":
         from xgb_complex_features.reporting.aggregate import aggregate_runs
@@ -55,12 +107,32 @@ def main(argv: list[str] | None = None) -> int:
         from xgb_complex_features.runner.execute import run_experiment
         from xgb_complex_features.reporting.aggregate import aggregate_runs
         from xgb_complex_features.reporting.report_md import build_report
+        from xgb_complex_features.tracing import tracing_dir, write_chrome_trace
 
         run_dir = run_experiment(config_path=args.config)
         agg_dir = Path(args.aggregate_output) if args.aggregate_output else run_dir / "aggregate"
         aggregate_runs(input_dir=str(run_dir), output_dir=str(agg_dir))
         report_path = Path(args.report) if args.report else agg_dir / "report.md"
         build_report(input_dir=str(agg_dir), output_path=str(report_path))
+        if tracing_dir() is not None:
+            # Re-merge so the aggregation spans are on the timeline too.
+            write_chrome_trace(tracing_dir())
+        return 0
+    if args.command == "trace":
+        from xgb_complex_features.tracing import TRACE_DIRNAME, write_chrome_trace
+
+        out = write_chrome_trace(Path(args.input) / TRACE_DIRNAME, args.output)
+        logging.getLogger(__name__).info("Wrote Chrome trace to %s", out)
+        return 0
+    if args.command == "rediagnose":
+        from xgb_complex_features.runner.offline import rediagnose_run
+
+        rediagnose_run(run_dir=args.run, config_path=args.config, n_jobs=args.n_jobs)
+        return 0
+    if args.command == "remetric":
+        from xgb_complex_features.runner.offline import remetric_run
+
+        remetric_run(run_dir=args.run, config_path=args.config, n_jobs=args.n_jobs)
         return 0
     if args.command == "smoke":
         from xgb_complex_features.runner.execute import run_experiment
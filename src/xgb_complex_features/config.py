@@ -21,13 +21,28 @@ class Paths:
     base_dir: Path
     formats: tuple[str, ...]
     overwrite: bool
+    cache_dir: Path | None = None
+    artifacts_dir: Path | None = None
+
+
+def _resolve_dir(path: str | Path) -> Path:
+    p = Path(path)
+    if not p.is_absolute():
+        p = (Path.cwd() / p).resolve()
+    return p
 
 
 def resolve_output_paths(cfg: dict[str, Any], config_path: str | Path) -> Paths:
     out = cfg.get("output", {})
-    base_dir = Path(out.get("base_dir", "runs/exp"))
-    if not base_dir.is_absolute():
-        base_dir = (Path.cwd() / base_dir).resolve()
+    base_dir = _resolve_dir(out.get("base_dir", "runs/exp"))
     formats = tuple(out.get("formats", ["parquet"]))
     overwrite = bool(out.get("overwrite", False))
-    return Paths(base_dir=base_dir, formats=formats, overwrite=overwrite)
+    cache_dir = _resolve_dir(out["cache_dir"]) if out.get("cache_dir") else None
+    artifacts_dir = _resolve_dir(out["artifacts_dir"]) if out.get("artifacts_dir") else None
+    return Paths(
+        base_dir=base_dir,
+        formats=formats,
+        overwrite=overwrite,
+        cache_dir=cache_dir,
+        artifacts_dir=artifacts_dir,
+    )
@@ -1,15 +1,21 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any, Literal
+import contextlib
+import os
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Literal
 
 import numpy as np
 
-from xgb_complex_features.dgp.label import calibrate_beta0, sample_labels
-from xgb_complex_features.dgp.latent import CorrelationSpec, make_correlation_matrix, sample_latent_normal
+from xgb_complex_features.dgp.label import calibrate_beta0, label_probability, sample_labels
+from xgb_complex_features.dgp.latent import CorrelationSpec, sample_latent
 from xgb_complex_features.dgp.marginals import make_positive_features
 from xgb_complex_features.dgp.tasks import FittedTask, TaskTransform, fit_task
-from xgb_complex_features.utils import make_rng
+from xgb_complex_features.tracing import traced
+from xgb_complex_features.utils import ensure_dir, make_rng, stable_hash
 
 
 OracleMode = Literal["raw_only", "oracle_s_only", "oracle_coords_only", "oracle_all"]
@@ -32,20 +38,27 @@ class Dataset:
     beta0: float
     p_true: np.ndarray
     metadata: dict[str, Any]
+    # Per-row label noise (kept for re-labelling shifted test rows, see shift_test_set).
+    eps_noise: np.ndarray | None = None
 
 
-def _split_indices(n: int, splits: dict[str, Any], rng: np.random.Generator) -> SplitIndices:
+def _split_sizes(n: int, splits: dict[str, Any]) -> tuple[int, int]:
     train_frac = float(splits.get("train", 0.6))
     val_frac = float(splits.get("val", 0.2))
     test_frac = float(splits.get("test", 0.2))
     if abs(train_frac + val_frac + test_frac - 1.0) > 1e-8:
         raise ValueError("splits must sum to 1.0")
 
-    perm = rng.permutation(n)
     n_train = int(round(train_frac * n))
     n_val = int(round(val_frac * n))
     n_train = min(max(n_train, 1), n - 2)
     n_val = min(max(n_val, 1), n - n_train - 1)
+    return n_train, n_val
+
+
+def _split_indices(n: int, splits: dict[str, Any], rng: np.random.Generator) -> SplitIndices:
+    n_train, n_val = _split_sizes(n, splits)
+    perm = rng.permutation(n)
     train = perm[:n_train]
     val = perm[n_train : n_train + n_val]
     test = perm[n_train + n_val :]
@@ -100,6 +113,40 @@ def _apply_shift_preserve(
     return x, {"shift_cols": affected.tolist(), "shift_scales": scales[affected].tolist()}
 
 
+def shift_test_set(
+    ds: Dataset,
+    *,
+    shift_type: str,
+    c: float,
+    subset_fraction: float,
+    label_cfg: dict[str, Any],
+    rng: np.random.Generator,
+    u: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    # Test rows of an unshifted dataset under a test-time shift, labelled as generate_dataset labels
+    # a shift regime (base beta0, the rows' own label noise). Labels come from the uniforms `u`
+    # instead of a fresh draw, so all shifts of one dataset share common random numbers.
+    if ds.eps_noise is None:
+        raise ValueError("shift_test_set needs a dataset with eps_noise")
+    test = ds.splits.test
+    x_test = ds.x_raw[test]
+    rows = np.arange(test.size)
+    if shift_type == "naive":
+        x_test, _ = _apply_shift_naive(x_test, rows, c=c, subset_fraction=subset_fraction, rng=rng)
+    elif shift_type == "preserve":
+        x_test, _ = _apply_shift_preserve(x_test, rows, c=c, task=ds.task)
+    else:
+        raise ValueError(f"Unknown shift.type: {shift_type}")
+    p = label_probability(
+        ds.task.transform(x_test).s_total,
+        ds.eps_noise[test],
+        beta0=ds.beta0,
+        a=float(label_cfg.get("a", 2.0)),
+        component_weight=float(label_cfg.get("component_weight", 1.0)),
+    )
+    return x_test, (u < p).astype(np.int8)
+
+
 def _generate_raw_features(
     n: int,
     *,
@@ -110,7 +157,10 @@ def _generate_raw_features(
     regime: dict[str, Any],
     marginal_cfg: dict[str, Any],
     rng: np.random.Generator,
+    duplicate_sources: np.ndarray | None = None,
+    latent: np.ndarray | None = None,
 ) -> tuple[np.ndarray, dict[str, Any]]:
+    # `latent`: a precomputed (n, d_total - n_duplicates) Gaussian latent (common_random_numbers).
     n_duplicates = int(distractors.get("n_duplicates", 0))
     dup_sigma = float(distractors.get("duplicate_log_noise_sigma", 0.02))
     base_d = d_total - n_duplicates
@@ -122,8 +172,12 @@ def _generate_raw_features(
     blocks = corr_cfg.get("blocks")
     corr_spec = CorrelationSpec(block_size=block_size, n_blocked_features=n_blocked, blocks=blocks)
     rho = float(regime.get("rho", 0.0))
-    corr = make_correlation_matrix(base_d, rho=rho, spec=corr_spec)
-    z = sample_latent_normal(n, corr=corr, rng=rng)
+    if latent is None:
+        z = sample_latent(
+            n, d=base_d, rho=rho, spec=corr_spec, rng=rng, sampler=str(corr_cfg.get("sampler", "dense"))
+        )
+    else:
+        z = latent
 
     marginal_kind = str(regime.get("marginal_kind") or marginal_cfg.get("kind", "lognormal"))
     sigma = float(regime.get("sigma", marginal_cfg.get("sigma", 0.7)))
@@ -139,7 +193,11 @@ def _generate_raw_features(
     )
 
     if n_duplicates > 0:
-        src = rng.choice(base_d, size=n_duplicates, replace=False if n_duplicates <= base_d else True)
+        if duplicate_sources is None:
+            src = _duplicate_sources(n_duplicates, base_d, rng=rng)
+        else:
+            # Row chunks of one streamed dataset share the duplicated columns.
+            src = np.asarray(duplicate_sources)
         log_noise = rng.normal(0.0, dup_sigma, size=(n, n_duplicates))
         x_dup = x_base[:, src] * np.exp(log_noise)
         x = np.concatenate([x_base, x_dup], axis=1)
@@ -156,6 +214,174 @@ def _generate_raw_features(
     return x.astype(np.float32, copy=False), {"corr_rho": rho, "corr_spec": corr_cfg, **dup_info}
 
 
+class _LruCache:
+    # Small per-process cache; loky workers are reused across specs, so entries outlive one dataset.
+    def __init__(self, entries: int) -> None:
+        self.entries = entries
+        self._items: OrderedDict[str, Any] = OrderedDict()
+
+    def get(self, key: str, build: Callable[[], Any]) -> Any:
+        if key in self._items:
+            self._items.move_to_end(key)
+            return self._items[key]
+        value = build()
+        self._items[key] = value
+        while len(self._items) > self.entries:
+            self._items.popitem(last=False)
+        return value
+
+
+# data.common_random_numbers: the latent of the last (seed, n, rho), and raw features of the last
+# two regimes (shared by every task of a regime).
+_COMMON_LATENTS = _LruCache(entries=1)
+_COMMON_FEATURES = _LruCache(entries=2)
+
+
+def _common_raw_features(
+    n: int,
+    *,
+    seed: int,
+    d_total: int,
+    d_signal_max: int,
+    distractors: dict[str, Any],
+    corr_cfg: dict[str, Any],
+    regime: dict[str, Any],
+    marginal_cfg: dict[str, Any],
+) -> tuple[np.ndarray, dict[str, Any]]:
+    # Common random numbers: the latent z depends only on (seed, n, rho), and the marginal draws
+    # (mixture sigmas, duplicate noise) only on the regime's marginal settings. Regimes differing
+    # by sigma see the same z, and every task (and shift) of a regime the same raw features.
+    rho = float(regime.get("rho", 0.0))
+    base_d = d_total - int(distractors.get("n_duplicates", 0))
+    marginal = {k: v for k, v in regime.items() if k not in {"id", "family", "shift"}}
+
+    def _latent() -> np.ndarray:
+        spec = CorrelationSpec(
+            block_size=int(corr_cfg.get("block_size", 5)),
+            n_blocked_features=int(corr_cfg.get("n_blocked_features", 0)),
+            blocks=corr_cfg.get("blocks"),
+        )
+        rng = make_rng(seed, "latent", rho, n)
+        return sample_latent(n, d=base_d, rho=rho, spec=spec, rng=rng, sampler=str(corr_cfg.get("sampler", "dense")))
+
+    def _features() -> tuple[np.ndarray, dict[str, Any]]:
+        latent = _COMMON_LATENTS.get(stable_hash(["latent", seed, n, rho, base_d, corr_cfg]), _latent)
+        x, meta = _generate_raw_features(
+            n,
+            d_total=d_total,
+            d_signal_max=d_signal_max,
+            distractors=distractors,
+            corr_cfg=corr_cfg,
+            regime=regime,
+            marginal_cfg=marginal_cfg,
+            rng=make_rng(seed, "marginals", stable_hash(marginal), n),
+            latent=latent,
+        )
+        # Shared by later datasets of this process: must never be modified in place.
+        x.flags.writeable = False
+        return x, meta
+
+    key = stable_hash(["x", seed, n, marginal, d_total, d_signal_max, distractors, corr_cfg, marginal_cfg])
+    return _COMMON_FEATURES.get(key, _features)
+
+
+def _row_chunks(n: int, chunk_rows: int) -> list[slice]:
+    return [slice(start, min(start + chunk_rows, n)) for start in range(0, n, chunk_rows)]
+
+
+def chunk_rng(seed: int, task_id: str, regime_id: str, n: int, k: int, stream: str) -> np.random.Generator:
+    # The one per-chunk seeding scheme, shared by data.chunk_rows and data.stream: row chunk k
+    # draws its features ("x"), noise ("noise"), split ("split") and labels ("y") from its own streams.
+    return make_rng(seed, task_id, regime_id, n, "chunk", k, stream)
+
+
+def _duplicate_sources(n_duplicates: int, base_d: int, *, rng: np.random.Generator) -> np.ndarray:
+    return rng.choice(base_d, size=n_duplicates, replace=False if n_duplicates <= base_d else True)
+
+
+def chunked_duplicate_sources(
+    seed: int, task_id: str, regime_id: str, n: int, *, d_total: int, distractors: dict[str, Any]
+) -> np.ndarray | None:
+    # Duplicated columns of a chunked or streamed dataset: drawn once, from their own stream.
+    n_duplicates = int(distractors.get("n_duplicates", 0))
+    base_d = d_total - n_duplicates
+    if n_duplicates <= 0 or base_d <= 0:
+        return None
+    return _duplicate_sources(n_duplicates, base_d, rng=make_rng(seed, task_id, regime_id, n, "duplicates"))
+
+
+def _map_chunks(fn: Callable[[Any], Any], jobs: list[Any], threads: int) -> list[Any]:
+    # Chunks write disjoint rows from their own streams, so the result does not depend on threads;
+    # NumPy's samplers and ufuncs release the GIL.
+    if threads <= 1 or len(jobs) <= 1:
+        return [fn(job) for job in jobs]
+    with ThreadPoolExecutor(max_workers=min(threads, len(jobs))) as pool:
+        return list(pool.map(fn, jobs))
+
+
+def _float32_matrix(shape: tuple[int, int], memmap_dir: str | None) -> np.ndarray:
+    if memmap_dir is None:
+        return np.empty(shape, dtype=np.float32)
+    fd, path = tempfile.mkstemp(dir=ensure_dir(memmap_dir), suffix=".x_raw")
+    os.close(fd)
+    x = np.memmap(path, dtype=np.float32, mode="w+", shape=shape)
+    # The mapping outlives the name; the file is freed once the array is garbage collected.
+    with contextlib.suppress(OSError):
+        os.unlink(path)
+    return x
+
+
+def _generate_raw_features_chunked(
+    n: int,
+    *,
+    chunk_rows: int,
+    memmap_dir: str | None,
+    d_total: int,
+    d_signal_max: int,
+    distractors: dict[str, Any],
+    corr_cfg: dict[str, Any],
+    regime: dict[str, Any],
+    marginal_cfg: dict[str, Any],
+    rngs: list[np.random.Generator],
+    duplicate_sources: np.ndarray | None,
+    threads: int = 1,
+) -> tuple[np.ndarray, dict[str, Any]]:
+    # Same features as _generate_raw_features, written one row chunk at a time into a float32
+    # matrix; chunk k draws from rngs[k], so the float64 intermediates are chunk-sized. Every
+    # chunk duplicates the same columns.
+    x = _float32_matrix((n, d_total), memmap_dir)
+    chunks = _row_chunks(n, chunk_rows)
+
+    def _fill(job: tuple[slice, np.random.Generator]) -> dict[str, Any]:
+        rows, rng = job
+        x[rows], meta = _generate_raw_features(
+            rows.stop - rows.start,
+            d_total=d_total,
+            d_signal_max=d_signal_max,
+            distractors=distractors,
+            corr_cfg=corr_cfg,
+            regime=regime,
+            marginal_cfg=marginal_cfg,
+            rng=rng,
+            duplicate_sources=duplicate_sources,
+        )
+        return meta
+
+    metas = _map_chunks(_fill, list(zip(chunks, rngs)), threads)
+    return x, metas[-1]
+
+
+def _scale_rows_in_place(
+    x: np.ndarray, rows: np.ndarray, cols: list[int], scales: list[float], chunk_rows: int
+) -> None:
+    cols_arr = np.asarray(cols, dtype=np.int64)
+    scales_arr = np.asarray(scales, dtype=np.float64)
+    for chunk in _row_chunks(rows.size, chunk_rows):
+        idx = np.ix_(rows[chunk], cols_arr)
+        x[idx] = x[idx] * scales_arr
+
+
+@traced
 def generate_dataset(
     *,
     n: int,
@@ -180,10 +406,21 @@ def generate_dataset(
     gating_cfg = label_cfg.get("gating", {}) or {}
     gating_q = float(gating_cfg.get("threshold_quantile", 0.7))
 
+    # data.chunk_rows: generate row chunks from per-chunk streams (chunk_rng; different draws than
+    # unchunked, the same as data.stream's chunks of that size), into a float32 matrix (memory-mapped under data.memmap_dir), and shift it in place.
+    chunk_rows = int(data_cfg.get("chunk_rows") or 0)
+    memmap_dir = data_cfg.get("memmap_dir")
+    # data.generation_threads: fill the chunks concurrently (same output for any thread count).
+    threads = int(data_cfg.get("generation_threads", 1) or 1)
+    if threads > 1 and chunk_rows <= 0:
+        raise ValueError("data.generation_threads needs data.chunk_rows (the block size)")
+    common = bool(data_cfg.get("common_random_numbers", False))
+    if common and chunk_rows > 0:
+        raise ValueError("data.common_random_numbers cannot be combined with data.chunk_rows")
+
     # Raw features for the full dataset (unshifted).
     rng_x = make_rng(exp_seed, task_cfg["id"], regime_cfg["id"], n, "x")
-    x_base, raw_meta = _generate_raw_features(
-        n,
+    raw_kwargs = dict(
         d_total=d_total,
         d_signal_max=d_signal_max,
         distractors=distractors,
@@ -192,11 +429,38 @@ def generate_dataset(
         marginal_cfg=marginal_cfg,
         rng=rng_x,
     )
+    if common:
+        raw_kwargs.pop("rng")
+        x_base, raw_meta = _common_raw_features(n, seed=exp_seed, **raw_kwargs)  # type: ignore[arg-type]
+        x_signal = x_base
+    elif chunk_rows > 0:
+        chunks = _row_chunks(n, chunk_rows)
+
+        def _chunk_rngs(stream: str) -> list[np.random.Generator]:
+            return [chunk_rng(exp_seed, task_cfg["id"], regime_cfg["id"], n, k, stream) for k in range(len(chunks))]
+
+        raw_kwargs.pop("rng")
+        x_base, raw_meta = _generate_raw_features_chunked(
+            n,
+            chunk_rows=chunk_rows,
+            memmap_dir=str(memmap_dir) if memmap_dir else None,
+            threads=threads,
+            rngs=_chunk_rngs("x"),
+            duplicate_sources=chunked_duplicate_sources(
+                exp_seed, task_cfg["id"], regime_cfg["id"], n, d_total=d_total, distractors=distractors
+            ),
+            **raw_kwargs,  # type: ignore[arg-type]
+        )
+        # Tasks only read the signal columns; avoids float64 copies of the full matrix.
+        x_signal = x_base[:, :d_signal_max]
+    else:
+        x_base, raw_meta = _generate_raw_features(n, **raw_kwargs)
+        x_signal = x_base
 
     # Fit task-level constants (epsilon, gate threshold) on full base dataset.
     task = fit_task(
         task_cfg,
-        x_base,
+        x_signal,
         d_signal_max=d_signal_max,
         epsilon_rel=epsilon_rel,
         nonmonotone_mu=nonmonotone_mu,
@@ -205,9 +469,19 @@ def generate_dataset(
     )
 
     # Calibrate beta0 using base (unshifted) signal.
-    base_tf = task.transform(x_base)
+    base_tf = task.transform(x_signal)
     rng_noise = make_rng(exp_seed, task_cfg["id"], regime_cfg["id"], n, "noise")
-    eps_noise = rng_noise.normal(0.0, float(label_cfg.get("sigma_eps", 0.5)), size=n).astype(np.float64)
+    sigma_eps = float(label_cfg.get("sigma_eps", 0.5))
+    if chunk_rows > 0:
+        eps_noise = np.concatenate(
+            _map_chunks(
+                lambda job: job[1].normal(0.0, sigma_eps, size=job[0].stop - job[0].start),
+                list(zip(chunks, _chunk_rngs("noise"))),
+                threads,
+            )
+        ).astype(np.float64)
+    else:
+        eps_noise = rng_noise.normal(0.0, sigma_eps, size=n).astype(np.float64)
     beta0 = calibrate_beta0(
         base_tf.s_total,
         eps_noise,
@@ -227,6 +501,22 @@ def generate_dataset(
     x_obs = x_base
     if shift_type == "none":
         pass
+    elif chunk_rows > 0 and shift_type in {"naive", "preserve"}:
+        # Same columns/scales as below (computed on one row), applied in place chunk by chunk.
+        if shift_type == "naive":
+            _, meta = _apply_shift_naive(
+                x_base[:1],
+                np.arange(1),
+                c=float(shift.get("c", 5.0)),
+                subset_fraction=float(shift.get("subset_fraction", 0.2)),
+                rng=make_rng(exp_seed, task_cfg["id"], regime_cfg["id"], n, "shift_naive"),
+            )
+            scales = [float(shift.get("c", 5.0))] * len(meta["shift_cols"])
+        else:
+            _, meta = _apply_shift_preserve(x_base[:1], np.arange(1), c=float(shift.get("c", 5.0)), task=task)
+            scales = meta["shift_scales"]
+        _scale_rows_in_place(x_obs, splits.test, meta["shift_cols"], scales, chunk_rows)
+        shift_meta.update(meta)
     elif shift_type == "naive":
         x_obs, meta = _apply_shift_naive(
             x_obs,
@@ -247,18 +537,26 @@ def generate_dataset(
     else:
         raise ValueError(f"Unknown shift.type: {shift_type}")
 
-    task_tf = task.transform(x_obs)
+    task_tf = task.transform(x_obs[:, :d_signal_max] if chunk_rows > 0 else x_obs)
 
     # Labels from observed signal, using beta0 calibrated on base signal.
     rng_y = make_rng(exp_seed, task_cfg["id"], regime_cfg["id"], n, "y")
-    y, p_true = sample_labels(
-        task_tf.s_total,
-        eps_noise,
-        rng=rng_y,
+    label_kwargs = dict(
         beta0=beta0,
         a=float(label_cfg.get("a", 2.0)),
         component_weight=float(label_cfg.get("component_weight", 1.0)),
     )
+    if chunk_rows > 0:
+        y = np.empty(n, dtype=np.int8)
+        p_true = np.empty(n, dtype=np.float64)
+
+        def _label(job: tuple[slice, np.random.Generator]) -> None:
+            c, r = job
+            y[c], p_true[c] = sample_labels(task_tf.s_total[c], eps_noise[c], rng=r, **label_kwargs)
+
+        _map_chunks(_label, list(zip(chunks, _chunk_rngs("y"))), threads)
+    else:
+        y, p_true = sample_labels(task_tf.s_total, eps_noise, rng=rng_y, **label_kwargs)
 
     def _prev(idx: np.ndarray) -> float:
         return float(y[idx].mean()) if idx.size else float("nan")
@@ -290,9 +588,43 @@ def generate_dataset(
         beta0=beta0,
         p_true=p_true,
         metadata=meta,
+        eps_noise=eps_noise,
     )
 
 
+def _stratified_order(idx: np.ndarray, y: np.ndarray) -> np.ndarray:
+    # Interleave the classes by relative rank (each keeps its random order), so every prefix has
+    # close to the overall prevalence.
+    labels = y[idx]
+    rank = np.empty(idx.size, dtype=np.float64)
+    for value in np.unique(labels):
+        members = np.flatnonzero(labels == value)
+        rank[members] = (np.arange(members.size) + 0.5) / members.size
+    return idx[np.argsort(rank, kind="stable")]
+
+
+def nested_subset(ds: Dataset, n: int, splits_cfg: dict[str, Any]) -> Dataset:
+    # Sample-complexity view of a dataset generated at a larger n: train/val are stratified prefixes
+    # (nested across n) of the full splits, the test set is the full one for every n.
+    n_full = int(ds.y.shape[0])
+    if n >= n_full:
+        return ds
+    n_train, n_val = _split_sizes(n, splits_cfg)
+    splits = SplitIndices(
+        train=_stratified_order(ds.splits.train, ds.y)[:n_train],
+        val=_stratified_order(ds.splits.val, ds.y)[:n_val],
+        test=ds.splits.test,
+    )
+    meta = {
+        **ds.metadata,
+        "nested_n_max": n_full,
+        "prevalence_train": float(ds.y[splits.train].mean()),
+        "prevalence_val": float(ds.y[splits.val].mean()),
+    }
+    return replace(ds, splits=splits, metadata=meta)
+
+
+@traced
 def build_features(dataset: Dataset, oracle_mode: OracleMode) -> tuple[np.ndarray, list[str]]:
     x_raw = dataset.x_raw
     tf = dataset.task_transform
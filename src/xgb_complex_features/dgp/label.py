@@ -68,21 +68,30 @@ def calibrate_beta0(
     return 0.5 * (lo + hi)
 
 
-def sample_labels(
+def label_probability(
     s: np.ndarray,
     eps_noise: np.ndarray,
-    rng: np.random.Generator,
     *,
     beta0: float,
     a: float,
     component_weight: float,
-) -> tuple[np.ndarray, np.ndarray]:
+) -> np.ndarray:
     s = np.asarray(s, dtype=np.float64).reshape(-1)
     eps_noise = np.asarray(eps_noise, dtype=np.float64).reshape(-1)
     if s.shape != eps_noise.shape:
         raise ValueError("s and eps_noise must have the same shape")
+    return sigmoid(float(beta0) + (float(a) * float(component_weight)) * s + eps_noise)
+
 
-    eta = float(beta0) + (float(a) * float(component_weight)) * s + eps_noise
-    p = sigmoid(eta)
+def sample_labels(
+    s: np.ndarray,
+    eps_noise: np.ndarray,
+    rng: np.random.Generator,
+    *,
+    beta0: float,
+    a: float,
+    component_weight: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    p = label_probability(s, eps_noise, beta0=beta0, a=a, component_weight=component_weight)
     y = rng.binomial(1, p).astype(np.int8, copy=False)
     return y, p
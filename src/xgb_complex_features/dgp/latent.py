@@ -42,19 +42,70 @@ def make_correlation_matrix(d: int, rho: float, spec: CorrelationSpec) -> np.nda
 
     corr = np.eye(d, dtype=np.float64)
     for block in _explicit_blocks(spec, d):
-        m = len(block)
-        if m <= 1:
+        if len(block) <= 1:
             continue
-        if rho >= 1.0:
-            raise ValueError("rho must be < 1")
         # Equicorrelation within block.
-        for i in range(m):
-            for j in range(i + 1, m):
-                corr[block[i], block[j]] = rho
-                corr[block[j], block[i]] = rho
+        idx = np.asarray(block)
+        corr[np.ix_(idx, idx)] = rho
+        corr[idx, idx] = 1.0
     return corr
 
 
+@dataclass(frozen=True)
+class BlockEquicorrelation:
+    # Identity plus disjoint equicorrelated blocks: column j of block b is
+    # sqrt(rho) * f_b + sqrt(1 - rho) * e_j, one shared factor per block.
+    d: int
+    rho: float
+    blocks: tuple[tuple[int, ...], ...]
+
+
+def block_equicorrelation(d: int, rho: float, spec: CorrelationSpec) -> BlockEquicorrelation | None:
+    # None when explicit blocks overlap (or repeat an index): those need the dense sampler.
+    rho = float(rho)
+    if not (0.0 <= rho < 1.0):
+        raise ValueError(f"rho must be in [0,1): {rho}")
+    blocks = [tuple(b) for b in _explicit_blocks(spec, d) if len(b) > 1]
+    cols = [j for b in blocks for j in b]
+    if len(cols) != len(set(cols)):
+        return None
+    return BlockEquicorrelation(d=d, rho=rho, blocks=tuple(blocks))
+
+
+def sample_block_equicorrelated(n: int, structure: BlockEquicorrelation, rng: np.random.Generator) -> np.ndarray:
+    # O(n * d): no d x d matrix, Cholesky factor or matmul.
+    z = rng.standard_normal(size=(n, structure.d), dtype=np.float64)
+    if not structure.blocks or structure.rho == 0.0:
+        return z
+    factors = rng.standard_normal(size=(n, len(structure.blocks)), dtype=np.float64)
+    cols = np.concatenate([np.asarray(b) for b in structure.blocks])
+    owner = np.repeat(np.arange(len(structure.blocks)), [len(b) for b in structure.blocks])
+    z[:, cols] = np.sqrt(structure.rho) * factors[:, owner] + np.sqrt(1.0 - structure.rho) * z[:, cols]
+    return z
+
+
+LATENT_SAMPLERS = {"dense", "structured"}
+
+
+def sample_latent(
+    n: int,
+    *,
+    d: int,
+    rho: float,
+    spec: CorrelationSpec,
+    rng: np.random.Generator,
+    sampler: str = "dense",
+) -> np.ndarray:
+    # "structured" draws different (equally distributed) numbers than "dense" from the same rng.
+    if sampler not in LATENT_SAMPLERS:
+        raise ValueError(f"Unknown data.correlation.sampler: {sampler}")
+    if sampler == "structured":
+        structure = block_equicorrelation(d, rho=rho, spec=spec)
+        if structure is not None:
+            return sample_block_equicorrelated(n, structure, rng)
+    return sample_latent_normal(n, corr=make_correlation_matrix(d, rho=rho, spec=spec), rng=rng)
+
+
 def sample_latent_normal(n: int, corr: np.ndarray, rng: np.random.Generator) -> np.ndarray:
     corr = np.asarray(corr, dtype=np.float64)
     if corr.ndim != 2 or corr.shape[0] != corr.shape[1]:
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import contextlib
+import os
+import pickle
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Literal
+
+import numpy as np
+
+from xgb_complex_features.dgp.dataset import Dataset, SplitIndices
+from xgb_complex_features.dgp.tasks import TaskTransform
+
+_ARRAYS = ("x_raw", "y", "split_train", "split_val", "split_test", "p_true", "tf_coords", "tf_s", "tf_s_total")
+
+
+def save_dataset(ds: Dataset, path: str | Path) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    arrays = {
+        "x_raw": ds.x_raw,
+        "y": ds.y,
+        "split_train": ds.splits.train,
+        "split_val": ds.splits.val,
+        "split_test": ds.splits.test,
+        "p_true": ds.p_true,
+        "tf_coords": ds.task_transform.coords,
+        "tf_s": ds.task_transform.s,
+        "tf_s_total": ds.task_transform.s_total,
+    }
+    if ds.eps_noise is not None:
+        arrays["eps_noise"] = ds.eps_noise
+    meta = {
+        "task": ds.task,
+        "beta0": ds.beta0,
+        "metadata": ds.metadata,
+        "coord_names": ds.task_transform.coord_names,
+        "s_names": ds.task_transform.s_names,
+    }
+
+    # Build in a sibling temp dir and rename, so readers never see a half-written dataset.
+    tmp = Path(tempfile.mkdtemp(dir=path.parent, prefix=f".{path.name}."))
+    try:
+        for name, arr in arrays.items():
+            np.save(tmp / f"{name}.npy", np.ascontiguousarray(arr), allow_pickle=False)
+        with (tmp / "meta.pkl").open("wb") as f:
+            pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return path
+
+
+def load_dataset(path: str | Path, *, mmap_mode: Literal["r", "c"] | None = "r") -> Dataset:
+    path = Path(path)
+    arrays = {name: np.load(path / f"{name}.npy", mmap_mode=mmap_mode, allow_pickle=False) for name in _ARRAYS}
+    with (path / "meta.pkl").open("rb") as f:
+        meta = pickle.load(f)
+    eps_path = path / "eps_noise.npy"
+    return Dataset(
+        x_raw=arrays["x_raw"],
+        y=arrays["y"],
+        splits=SplitIndices(train=arrays["split_train"], val=arrays["split_val"], test=arrays["split_test"]),
+        task=meta["task"],
+        task_transform=TaskTransform(
+            coord_names=meta["coord_names"],
+            coords=arrays["tf_coords"],
+            s_names=meta["s_names"],
+            s=arrays["tf_s"],
+            s_total=arrays["tf_s_total"],
+        ),
+        beta0=meta["beta0"],
+        p_true=arrays["p_true"],
+        metadata=meta["metadata"],
+        eps_noise=np.load(eps_path, mmap_mode=mmap_mode, allow_pickle=False) if eps_path.exists() else None,
+    )
+
+
+def _dir_bytes(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.iterdir() if f.is_file())
+
+
+class DatasetCache:
+    # Generated datasets in save_dataset layout, one directory per generation key. Hits are
+    # memory-mapped read-only (zero-copy); each hit touches the entry, and puts evict the least
+    # recently used entries once the cache holds more than max_bytes.
+    def __init__(self, root: str | Path, *, max_bytes: int | None = None) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+
+    def _dir(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def get(self, key: str) -> Dataset | None:
+        path = self._dir(key)
+        try:
+            ds = load_dataset(path, mmap_mode="r")
+        except FileNotFoundError:
+            return None
+        with contextlib.suppress(OSError):
+            os.utime(path)
+        return ds
+
+    def put(self, key: str, ds: Dataset) -> None:
+        path = self._dir(key)
+        try:
+            save_dataset(ds, path)
+        except OSError:
+            # Another worker stored the same dataset first.
+            if not path.exists():
+                raise
+        if self.max_bytes is not None:
+            self.evict(keep=key)
+
+    def evict(self, *, keep: str | None = None) -> None:
+        entries = []
+        for path in self.root.glob("*/*"):
+            if path.is_dir() and not path.name.startswith("."):
+                with contextlib.suppress(OSError):
+                    entries.append((path.stat().st_mtime, path, _dir_bytes(path)))
+        total = sum(size for _, _, size in entries)
+        for _, path, size in sorted(entries, key=lambda e: e[0]):
+            if self.max_bytes is None or total <= self.max_bytes:
+                break
+            if path.name == keep:
+                continue
+            # Open memory maps of an evicted entry stay valid (POSIX).
+            shutil.rmtree(path, ignore_errors=True)
+            try:
+                path.parent.rmdir()
+            except OSError:
+                pass
+            total -= size
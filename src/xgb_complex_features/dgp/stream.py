@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+import numpy as np
+
+from xgb_complex_features.dgp.dataset import (
+    _apply_shift_naive,
+    _apply_shift_preserve,
+    _generate_raw_features,
+    chunk_rng,
+    chunked_duplicate_sources,
+)
+from xgb_complex_features.dgp.label import calibrate_beta0, sample_labels
+from xgb_complex_features.dgp.tasks import FittedTask, fit_task
+from xgb_complex_features.tracing import traced
+from xgb_complex_features.utils import make_rng
+
+SPLIT_CODES = {"train": 0, "val": 1, "test": 2}
+
+
+@dataclass(frozen=True)
+class StreamSettings:
+    chunk_rows: int
+    pilot_rows: int
+    sample_rows: int
+    min_n: int
+
+
+def stream_settings(data_cfg: dict[str, Any]) -> StreamSettings | None:
+    stream_cfg = data_cfg.get("stream")
+    if not stream_cfg:
+        return None
+    settings = StreamSettings(
+        chunk_rows=int(stream_cfg.get("chunk_rows", 100_000)),
+        pilot_rows=int(stream_cfg.get("pilot_rows", 200_000)),
+        sample_rows=int(stream_cfg.get("sample_rows", 20_000)),
+        min_n=int(stream_cfg.get("min_n", 0)),
+    )
+    if settings.chunk_rows < 1 or settings.pilot_rows < 2 or settings.sample_rows < 1:
+        raise ValueError("data.stream needs chunk_rows >= 1, pilot_rows >= 2 and sample_rows >= 1")
+    return settings
+
+
+def streams(data_cfg: dict[str, Any], n: int) -> bool:
+    settings = stream_settings(data_cfg)
+    return settings is not None and int(n) >= settings.min_n
+
+
+@dataclass(frozen=True)
+class Chunk:
+    x_raw: np.ndarray
+    y: np.ndarray
+    split: np.ndarray
+    p_true: np.ndarray
+
+    def rows(self, part: str) -> np.ndarray:
+        return np.flatnonzero(self.split == SPLIT_CODES[part])
+
+
+@dataclass
+class StreamingDataset:
+    # A dataset that is never materialized: row chunks are regenerated on demand from per-chunk
+    # RNG streams (chunk_rng, as data.chunk_rows), with task constants (epsilon, gate threshold)
+    # and beta0 fitted on a pilot sample.
+    n: int
+    seed: int
+    settings: StreamSettings
+    task: FittedTask
+    beta0: float
+    metadata: dict[str, Any]
+    task_cfg: dict[str, Any]
+    regime_cfg: dict[str, Any]
+    data_cfg: dict[str, Any]
+    label_cfg: dict[str, Any]
+    splits_cfg: dict[str, Any]
+    duplicate_sources: np.ndarray | None = None
+    # Per-split (rows, positives), filled in as chunks are generated.
+    _counts: dict[int, np.ndarray] = field(default_factory=dict)
+
+    @property
+    def n_chunks(self) -> int:
+        return -(-self.n // self.settings.chunk_rows)
+
+    def _rng(self, *parts: Any) -> np.random.Generator:
+        return make_rng(self.seed, self.task_cfg["id"], self.regime_cfg["id"], self.n, *parts)
+
+    def _chunk_rng(self, k: int, stream: str) -> np.random.Generator:
+        return chunk_rng(self.seed, self.task_cfg["id"], self.regime_cfg["id"], self.n, k, stream)
+
+    def chunk(self, k: int) -> Chunk:
+        start = k * self.settings.chunk_rows
+        rows = min(self.settings.chunk_rows, self.n - start)
+        if rows <= 0:
+            raise IndexError(f"Chunk {k} out of range ({self.n_chunks} chunks)")
+        x_base, _ = _generate_raw_features(
+            rows,
+            d_total=int(self.data_cfg.get("d_total", 120)),
+            d_signal_max=int(self.data_cfg.get("d_signal_max", 10)),
+            distractors=self.data_cfg.get("distractors", {}),
+            corr_cfg=self.data_cfg.get("correlation", {}),
+            regime=self.regime_cfg,
+            marginal_cfg=self.data_cfg.get("marginals", {"kind": "lognormal"}),
+            rng=self._chunk_rng(k, "x"),
+            duplicate_sources=self.duplicate_sources,
+        )
+        eps_noise = self._chunk_rng(k, "noise").normal(0.0, float(self.label_cfg.get("sigma_eps", 0.5)), size=rows).astype(np.float64)
+        # Rows are assigned to splits independently, so split sizes match the fractions only in expectation.
+        fractions = np.array(
+            [
+                float(self.splits_cfg.get("train", 0.6)),
+                float(self.splits_cfg.get("val", 0.2)),
+                float(self.splits_cfg.get("test", 0.2)),
+            ]
+        )
+        split = self._chunk_rng(k, "split").choice(3, size=rows, p=fractions / fractions.sum()).astype(np.int8)
+        test_idx = np.flatnonzero(split == SPLIT_CODES["test"])
+
+        shift = self.regime_cfg.get("shift") or {}
+        shift_type = str(shift.get("type", "none"))
+        x_obs = x_base
+        if shift_type == "naive":
+            x_obs, _ = _apply_shift_naive(
+                x_obs,
+                test_idx,
+                c=float(shift.get("c", 5.0)),
+                subset_fraction=float(shift.get("subset_fraction", 0.2)),
+                # Re-seeded per chunk: every chunk shifts the same columns.
+                rng=self._rng("shift_naive"),
+            )
+        elif shift_type == "preserve":
+            x_obs, _ = _apply_shift_preserve(x_obs, test_idx, c=float(shift.get("c", 5.0)), task=self.task)
+        elif shift_type != "none":
+            raise ValueError(f"Unknown shift.type: {shift_type}")
+
+        y, p_true = sample_labels(
+            self.task.transform(x_obs).s_total,
+            eps_noise,
+            rng=self._chunk_rng(k, "y"),
+            beta0=self.beta0,
+            a=float(self.label_cfg.get("a", 2.0)),
+            component_weight=float(self.label_cfg.get("component_weight", 1.0)),
+        )
+        self._counts[k] = np.array(
+            [[np.sum(split == code), np.sum(y[split == code])] for code in range(3)], dtype=np.int64
+        )
+        return Chunk(x_raw=np.asarray(x_obs, dtype=np.float32), y=y, split=split, p_true=p_true)
+
+    def iter_chunks(self) -> Iterator[Chunk]:
+        for k in range(self.n_chunks):
+            yield self.chunk(k)
+
+    def record_prevalence(self) -> None:
+        # Needs one full pass over the chunks (any pass: training already makes several).
+        if len(self._counts) < self.n_chunks:
+            for k in range(self.n_chunks):
+                if k not in self._counts:
+                    self.chunk(k)
+        counts = sum(self._counts.values())
+        for part, code in SPLIT_CODES.items():
+            rows, positives = counts[code]
+            self.metadata[f"prevalence_{part}"] = float(positives / rows) if rows else float("nan")
+            self.metadata[f"n_{part}"] = int(rows)
+
+    def sample(self, part: str, max_rows: int) -> np.ndarray:
+        # The first rows of a split across chunks: a random sample, since splits are drawn per row.
+        parts = []
+        n_rows = 0
+        for chunk in self.iter_chunks():
+            x = chunk.x_raw[chunk.rows(part)]
+            parts.append(x[: max_rows - n_rows])
+            n_rows += parts[-1].shape[0]
+            if n_rows >= max_rows:
+                break
+        return np.concatenate(parts, axis=0)
+
+
+@traced
+def generate_streaming_dataset(
+    *,
+    n: int,
+    seed: int,
+    task_cfg: dict[str, Any],
+    regime_cfg: dict[str, Any],
+    data_cfg: dict[str, Any],
+    label_cfg: dict[str, Any],
+    splits_cfg: dict[str, Any],
+) -> StreamingDataset:
+    settings = stream_settings(data_cfg)
+    if settings is None:
+        raise ValueError("generate_streaming_dataset needs data.stream in the config")
+    if data_cfg.get("common_random_numbers"):
+        raise ValueError("data.common_random_numbers is not supported with data.stream")
+    exp_seed = int(seed)
+    d_signal_max = int(data_cfg.get("d_signal_max", 10))
+    nonmono_cfg = label_cfg.get("nonmonotone", {}) or {}
+    gating_cfg = label_cfg.get("gating", {}) or {}
+
+    # Pilot sample (unshifted, its own RNG stream): stands in for the full base dataset when fitting
+    # task constants and calibrating beta0. The duplicated columns (shared by every chunk) are
+    # drawn from their own stream, as in chunked generation.
+    pilot_rows = min(settings.pilot_rows, int(n))
+    rng_pilot = make_rng(exp_seed, task_cfg["id"], regime_cfg["id"], n, "pilot")
+    distractors = data_cfg.get("distractors", {})
+    x_pilot, raw_meta = _generate_raw_features(
+        pilot_rows,
+        d_total=int(data_cfg.get("d_total", 120)),
+        d_signal_max=d_signal_max,
+        distractors=distractors,
+        corr_cfg=data_cfg.get("correlation", {}),
+        regime=regime_cfg,
+        marginal_cfg=data_cfg.get("marginals", {"kind": "lognormal"}),
+        rng=rng_pilot,
+        duplicate_sources=chunked_duplicate_sources(
+            exp_seed,
+            task_cfg["id"],
+            regime_cfg["id"],
+            n,
+            d_total=int(data_cfg.get("d_total", 120)),
+            distractors=distractors,
+        ),
+    )
+    task = fit_task(
+        task_cfg,
+        x_pilot,
+        d_signal_max=d_signal_max,
+        epsilon_rel=float(label_cfg.get("epsilon_rel", 1e-3)),
+        nonmonotone_mu=float(nonmono_cfg.get("mu", 0.0)),
+        nonmonotone_delta=float(nonmono_cfg.get("delta", 1.0)),
+        gating_threshold_quantile=float(gating_cfg.get("threshold_quantile", 0.7)),
+    )
+    eps_pilot = rng_pilot.normal(0.0, float(label_cfg.get("sigma_eps", 0.5)), size=pilot_rows).astype(np.float64)
+    beta0 = calibrate_beta0(
+        task.transform(x_pilot).s_total,
+        eps_pilot,
+        target_prevalence=float(label_cfg.get("target_prevalence", 0.05)),
+        a=float(label_cfg.get("a", 2.0)),
+        component_weight=float(label_cfg.get("component_weight", 1.0)),
+    )
+
+    shift = regime_cfg.get("shift") or {}
+    shift_type = str(shift.get("type", "none"))
+    shift_meta: dict[str, Any] = {"shift_type": shift_type}
+    if shift_type == "naive":
+        # Same column draw as every chunk's shift (see StreamingDataset.chunk).
+        _, meta = _apply_shift_naive(
+            x_pilot[:1],
+            np.arange(1),
+            c=float(shift.get("c", 5.0)),
+            subset_fraction=float(shift.get("subset_fraction", 0.2)),
+            rng=make_rng(exp_seed, task_cfg["id"], regime_cfg["id"], n, "shift_naive"),
+        )
+        shift_meta.update(meta)
+    elif shift_type == "preserve":
+        _, meta = _apply_shift_preserve(x_pilot[:1], np.arange(1), c=float(shift.get("c", 5.0)), task=task)
+        shift_meta.update(meta)
+
+    meta = {
+        "task_id": task.task_id,
+        "task_kind": task.kind,
+        "task_level": task.level,
+        "component_count": task.component_count,
+        "regime_id": str(regime_cfg["id"]),
+        "regime_family": str(regime_cfg.get("family", "")),
+        "sigma": float(regime_cfg.get("sigma", float("nan"))),
+        "rho": float(regime_cfg.get("rho", float("nan"))),
+        "mixture": regime_cfg.get("mixture"),
+        **raw_meta,
+        **shift_meta,
+        "beta0": beta0,
+        "stream_chunk_rows": settings.chunk_rows,
+        "stream_pilot_rows": pilot_rows,
+    }
+    dup = raw_meta.get("duplicate_sources")
+    return StreamingDataset(
+        n=int(n),
+        seed=exp_seed,
+        settings=settings,
+        task=task,
+        beta0=beta0,
+        metadata=meta,
+        task_cfg=task_cfg,
+        regime_cfg=regime_cfg,
+        data_cfg=data_cfg,
+        label_cfg=label_cfg,
+        splits_cfg=splits_cfg,
+        duplicate_sources=np.asarray(dup) if dup is not None else None,
+    )
@@ -1,14 +1,15 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from time import perf_counter
 from typing import Any
 
 import numpy as np
-from xgboost import XGBClassifier
 
 from xgb_complex_features.dgp.dataset import OracleMode
 from xgb_complex_features.dgp.tasks import FittedTask
-from xgb_complex_features.models.xgb import predict_proba_positive
+from xgb_complex_features.models.xgb import Model, predict_proba_positive
+from xgb_complex_features.tracing import traced
 
 
 @dataclass(frozen=True)
@@ -33,7 +34,7 @@ def _loguniform(rng: np.random.Generator, low: float, high: float, size: tuple[i
     return np.exp(rng.uniform(np.log(low), np.log(high), size=size))
 
 
-def _features_from_raw(x_raw: np.ndarray, task: FittedTask, oracle_mode: OracleMode) -> np.ndarray:
+def features_from_raw(x_raw: np.ndarray, task: FittedTask, oracle_mode: OracleMode) -> np.ndarray:
     if oracle_mode == "raw_only":
         return x_raw.astype(np.float32, copy=False)
     tf = task.transform(x_raw)
@@ -47,7 +48,7 @@ def _features_from_raw(x_raw: np.ndarray, task: FittedTask, oracle_mode: OracleM
 
 def ratio_scale_invariance(
     *,
-    model: XGBClassifier,
+    model: Model,
     oracle_mode: OracleMode,
     task: FittedTask,
     x_test_raw: np.ndarray,
@@ -62,7 +63,7 @@ def ratio_scale_invariance(
 
     idx = rng.choice(x_test_raw.shape[0], size=n, replace=False)
     x0 = x_test_raw[idx].astype(np.float64, copy=True)
-    p0 = predict_proba_positive(model, _features_from_raw(x0, task, oracle_mode))
+    p0 = predict_proba_positive(model, features_from_raw(x0, task, oracle_mode))
 
     cs = _loguniform(rng, cfg.c_loguniform_low, cfg.c_loguniform_high, size=(n, int(cfg.m_c)))
     deltas = []
@@ -72,14 +73,14 @@ def ratio_scale_invariance(
         for rc in task.diagnostics.ratio_coords:
             cols = list(set(rc.numerator_cols) | set(rc.denominator_cols))
             x[:, cols] *= c[:, None]
-        pj = predict_proba_positive(model, _features_from_raw(x, task, oracle_mode))
+        pj = predict_proba_positive(model, features_from_raw(x, task, oracle_mode))
         deltas.append(np.abs(pj - p0))
     return float(np.mean(np.concatenate(deltas)))
 
 
 def product_comp_invariance(
     *,
-    model: XGBClassifier,
+    model: Model,
     oracle_mode: OracleMode,
     task: FittedTask,
     x_test_raw: np.ndarray,
@@ -94,7 +95,7 @@ def product_comp_invariance(
 
     idx = rng.choice(x_test_raw.shape[0], size=n, replace=False)
     x0 = x_test_raw[idx].astype(np.float64, copy=True)
-    p0 = predict_proba_positive(model, _features_from_raw(x0, task, oracle_mode))
+    p0 = predict_proba_positive(model, features_from_raw(x0, task, oracle_mode))
 
     cs = _loguniform(rng, cfg.c_loguniform_low, cfg.c_loguniform_high, size=(n, int(cfg.m_c)))
     deltas = []
@@ -104,14 +105,14 @@ def product_comp_invariance(
         for pc in task.diagnostics.product_coords:
             x[:, pc.group_a_cols] *= c[:, None]
             x[:, pc.group_b_cols] *= (1.0 / c)[:, None]
-        pj = predict_proba_positive(model, _features_from_raw(x, task, oracle_mode))
+        pj = predict_proba_positive(model, features_from_raw(x, task, oracle_mode))
         deltas.append(np.abs(pj - p0))
     return float(np.mean(np.concatenate(deltas)))
 
 
 def iso_coordinate_variance_ratio(
     *,
-    model: XGBClassifier,
+    model: Model,
     oracle_mode: OracleMode,
     task: FittedTask,
     x_test_raw: np.ndarray,
@@ -137,14 +138,14 @@ def iso_coordinate_variance_ratio(
             for rc in task.diagnostics.ratio_coords:
                 cols = list(set(rc.numerator_cols) | set(rc.denominator_cols))
                 x[:, cols] *= c
-            preds.append(float(predict_proba_positive(model, _features_from_raw(x, task, oracle_mode))[0]))
+            preds.append(float(predict_proba_positive(model, features_from_raw(x, task, oracle_mode))[0]))
         vars_.append(float(np.var(preds)))
     return float(np.mean(vars_))
 
 
 def iso_coordinate_variance_product(
     *,
-    model: XGBClassifier,
+    model: Model,
     oracle_mode: OracleMode,
     task: FittedTask,
     x_test_raw: np.ndarray,
@@ -170,19 +171,21 @@ def iso_coordinate_variance_product(
             for pc in task.diagnostics.product_coords:
                 x[:, pc.group_a_cols] *= c
                 x[:, pc.group_b_cols] *= 1.0 / c
-            preds.append(float(predict_proba_positive(model, _features_from_raw(x, task, oracle_mode))[0]))
+            preds.append(float(predict_proba_positive(model, features_from_raw(x, task, oracle_mode))[0]))
         vars_.append(float(np.var(preds)))
     return float(np.mean(vars_))
 
 
+@traced
 def compute_all_invariance(
     *,
-    model: XGBClassifier,
+    model: Model,
     oracle_mode: OracleMode,
     task: FittedTask,
     x_test_raw: np.ndarray,
     rng: np.random.Generator,
     cfg: dict[str, Any],
+    timings: dict[str, float] | None = None,
 ) -> dict[str, float]:
     inv_cfg = cfg.get("invariance", {}) or {}
     iso_cfg = cfg.get("iso_variance", {}) or {}
@@ -200,37 +203,17 @@ def compute_all_invariance(
         c_loguniform_high=float(inv_cfg.get("c_loguniform_high", 2.0)),
     )
 
-    return {
-        "ratio_scale_invariance": ratio_scale_invariance(
-            model=model,
-            oracle_mode=oracle_mode,
-            task=task,
-            x_test_raw=x_test_raw,
-            rng=rng,
-            cfg=invariance,
-        ),
-        "product_comp_invariance": product_comp_invariance(
-            model=model,
-            oracle_mode=oracle_mode,
-            task=task,
-            x_test_raw=x_test_raw,
-            rng=rng,
-            cfg=invariance,
-        ),
-        "iso_var_ratio": iso_coordinate_variance_ratio(
-            model=model,
-            oracle_mode=oracle_mode,
-            task=task,
-            x_test_raw=x_test_raw,
-            rng=rng,
-            cfg=iso,
-        ),
-        "iso_var_product": iso_coordinate_variance_product(
-            model=model,
-            oracle_mode=oracle_mode,
-            task=task,
-            x_test_raw=x_test_raw,
-            rng=rng,
-            cfg=iso,
-        ),
-    }
+    diagnostics = (
+        ("ratio_scale_invariance", ratio_scale_invariance, invariance),
+        ("product_comp_invariance", product_comp_invariance, invariance),
+        ("iso_var_ratio", iso_coordinate_variance_ratio, iso),
+        ("iso_var_product", iso_coordinate_variance_product, iso),
+    )
+    out: dict[str, float] = {}
+    # Called in a fixed order: all diagnostics draw from the same rng.
+    for name, fn, fn_cfg in diagnostics:
+        start = perf_counter()
+        out[name] = fn(model=model, oracle_mode=oracle_mode, task=task, x_test_raw=x_test_raw, rng=rng, cfg=fn_cfg)
+        if timings is not None:
+            timings[name] = perf_counter() - start
+    return out
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+
+# Same clipping as sklearn.metrics.log_loss(eps="auto") for float64 predictions.
+_EPS = float(np.finfo(np.float64).eps)
+
+# Bootstrap replicates weighted per pass: bounds the (replicates x n) weight and cumsum arrays.
+_BOOTSTRAP_BATCH = 16
+
+
+def _sorted_inputs(y_true: np.ndarray, p_pred: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # One stable descending sort shared by every metric (and every bootstrap replicate).
+    order = np.argsort(-p_pred, kind="mergesort")
+    p_sorted = p_pred[order]
+    y_sorted = y_true[order]
+    # Last index of each run of tied scores: one ROC/PR point per distinct threshold.
+    threshold_idx = np.r_[np.flatnonzero(np.diff(p_sorted)), p_sorted.size - 1]
+    return y_sorted, p_sorted, threshold_idx
+
+
+def _ranking_metrics(tps: np.ndarray, fps: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # tps/fps: (..., T) weighted cumulative positives/negatives at each distinct threshold.
+    n_pos = tps[..., -1:]
+    n_neg = fps[..., -1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(tps + fps > 0, tps / (tps + fps), 0.0)
+        recall = tps / n_pos
+        d_recall = np.diff(recall, axis=-1, prepend=0.0)
+        ap = np.sum(d_recall * precision, axis=-1)
+        # No positives: sklearn returns -0.0 (with a warning); keep that value.
+        ap = np.where(n_pos[..., 0] > 0, ap, -0.0)
+
+        tpr = np.concatenate([np.zeros_like(n_pos), tps / n_pos], axis=-1)
+        fpr = np.concatenate([np.zeros_like(n_neg), fps / n_neg], axis=-1)
+        auc = np.sum(np.diff(fpr, axis=-1) * (tpr[..., 1:] + tpr[..., :-1]) / 2.0, axis=-1)
+        auc = np.where((n_pos[..., 0] > 0) & (n_neg[..., 0] > 0), auc, np.nan)
+    return ap, auc
+
+
+def binary_metrics(y_true: np.ndarray, p_pred: np.ndarray) -> dict[str, float]:
+    y_true = np.asarray(y_true).reshape(-1).astype(np.float64)
+    p_pred = np.asarray(p_pred, dtype=np.float64).reshape(-1)
+    y_sorted, p_sorted, threshold_idx = _sorted_inputs(y_true, p_pred)
+
+    tps = np.cumsum(y_sorted)[threshold_idx]
+    fps = (threshold_idx + 1) - tps
+    ap, auc = _ranking_metrics(tps, fps)
+
+    p = np.clip(p_sorted, _EPS, 1.0 - _EPS)
+    logloss = -np.mean(y_sorted * np.log(p) + (1.0 - y_sorted) * np.log1p(-p))
+    return {"prauc": float(ap), "rocauc": float(auc), "logloss": float(logloss)}
+
+
+def bootstrap_metrics(
+    y_true: np.ndarray,
+    p_pred: np.ndarray,
+    *,
+    n_boot: int,
+    ci: float,
+    rng: np.random.Generator,
+    batch: int = _BOOTSTRAP_BATCH,
+) -> dict[str, Any]:
+    # Poisson(1) weights approximate resampling with replacement and reuse the single sort:
+    # each replicate is just a weighted cumulative sum over the same order. Replicates are drawn
+    # `batch` at a time (same RNG stream, so the CIs do not depend on the batch size).
+    y_true = np.asarray(y_true).reshape(-1).astype(np.float64)
+    p_pred = np.asarray(p_pred, dtype=np.float64).reshape(-1)
+    y_sorted, p_sorted, threshold_idx = _sorted_inputs(y_true, p_pred)
+    p = np.clip(p_sorted, _EPS, 1.0 - _EPS)
+    losses = -(y_sorted * np.log(p) + (1.0 - y_sorted) * np.log1p(-p))
+
+    ap_parts, auc_parts, logloss_parts = [], [], []
+    for start in range(0, int(n_boot), max(int(batch), 1)):
+        rows = min(max(int(batch), 1), int(n_boot) - start)
+        w = rng.poisson(1.0, size=(rows, y_sorted.size)).astype(np.float64)
+        tps = np.cumsum(w * y_sorted, axis=1)[:, threshold_idx]
+        fps = np.cumsum(w * (1.0 - y_sorted), axis=1)[:, threshold_idx]
+        ap, auc = _ranking_metrics(tps, fps)
+        ap_parts.append(ap)
+        auc_parts.append(auc)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            logloss_parts.append((w @ losses) / w.sum(axis=1))
+    ap = np.concatenate(ap_parts) if ap_parts else np.empty(0)
+    auc = np.concatenate(auc_parts) if auc_parts else np.empty(0)
+    logloss = np.concatenate(logloss_parts) if logloss_parts else np.empty(0)
+
+    alpha = (1.0 - float(ci)) / 2.0
+    out: dict[str, Any] = {}
+    for name, values in (("prauc", ap), ("rocauc", auc), ("logloss", logloss)):
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            lo = hi = float("nan")
+        else:
+            lo, hi = (float(v) for v in np.quantile(values, [alpha, 1.0 - alpha]))
+        out[f"{name}_ci_lo"] = lo
+        out[f"{name}_ci_hi"] = hi
+    return out
@@ -1,20 +1,246 @@
 from __future__ import annotations
 
+import threading
 from dataclasses import dataclass
 from typing import Any
 
 import numpy as np
-from sklearn.metrics import average_precision_score, log_loss, roc_auc_score
-from xgboost import XGBClassifier
+import xgboost
+from xgboost import Booster, DMatrix, QuantileDMatrix, XGBClassifier
+
+from xgb_complex_features.models.metrics import binary_metrics
+from xgb_complex_features.tracing import traced
+
+
+ENGINES = {"sklearn", "native"}
+
+# Constructor arguments of the sklearn wrapper that are not learner parameters.
+_WRAPPER_ONLY_PARAMS = {
+    "n_estimators",
+    "early_stopping_rounds",
+    "missing",
+    "enable_categorical",
+    "feature_types",
+    "importance_type",
+    "callbacks",
+}
+
+Model = XGBClassifier | Booster
 
 
 @dataclass(frozen=True)
 class FitResult:
-    model: XGBClassifier
+    model: Model
     best_iteration: int | None
     best_score: float | None
 
 
+def _uses_quantile_dmatrix(tree_method: str | None, booster: str | None) -> bool:
+    # Same rule as XGBClassifier._create_dmatrix: only hist tree boosters train from QuantileDMatrix.
+    return tree_method in ("hist", "gpu_hist", None, "auto") and booster != "gblinear"
+
+
+class QuantileDMatrixCache:
+    # QuantileDMatrix objects built by XGBClassifier.fit, keyed by the exact arrays they bin, max_bin,
+    # tree_method and booster. Fits of several configs on the same matrices then share one quantile
+    # sketch and binning; configs that cannot train from a QuantileDMatrix bypass the cache.
+    def __init__(self) -> None:
+        self._entries: dict[tuple[Any, ...], tuple[list[Any], DMatrix]] = {}
+        # Concurrent fits (runner.concurrent_fits) must not build the same matrix twice.
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        *,
+        ref: DMatrix | None,
+        max_bin: int | None,
+        tree_method: str | None,
+        booster: str | None,
+        kwargs: dict[str, Any],
+        create: Any,
+    ) -> DMatrix:
+        parts = []
+        keep = [ref]
+        for name, value in sorted(kwargs.items()):
+            if value is None or isinstance(value, (bool, int, float, str)):
+                parts.append((name, value))
+            else:
+                # Identity, not content: callers pass the same array objects for every config.
+                parts.append((name, id(value)))
+                keep.append(value)
+        key = (id(ref), max_bin, tree_method, booster, tuple(parts))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = (keep, create())
+                self._entries[key] = entry
+        return entry[1]
+
+
+class _SharedQuantileClassifier(XGBClassifier):
+    # The sklearn wrapper builds its train/eval DMatrix objects through _create_dmatrix.
+    _dmatrix_cache: QuantileDMatrixCache | None = None
+
+    def _create_dmatrix(self, ref: DMatrix | None, **kwargs: Any) -> DMatrix:
+        cache = self._dmatrix_cache
+        if cache is None or not _uses_quantile_dmatrix(self.tree_method, self.booster):
+            return super()._create_dmatrix(ref=ref, **kwargs)
+        return cache.get(
+            ref=ref,
+            max_bin=self.max_bin,
+            tree_method=self.tree_method,
+            booster=self.booster,
+            kwargs=kwargs,
+            create=lambda: super(_SharedQuantileClassifier, self)._create_dmatrix(ref=ref, **kwargs),
+        )
+
+
+def _native_dmatrix(
+    *,
+    cache: QuantileDMatrixCache | None,
+    ref: DMatrix | None,
+    params: dict[str, Any],
+    data: np.ndarray,
+    label: np.ndarray,
+) -> DMatrix:
+    # Same matrices the sklearn wrapper would build: QuantileDMatrix for hist, DMatrix otherwise.
+    kwargs = {"data": data, "label": label, "missing": params.get("missing", np.nan)}
+    max_bin = params.get("max_bin")
+    nthread = params.get("n_jobs", params.get("nthread"))
+    tree_method = params.get("tree_method")
+    booster = params.get("booster")
+
+    if not _uses_quantile_dmatrix(tree_method, booster):
+        return DMatrix(**kwargs, nthread=nthread)
+
+    def _create() -> DMatrix:
+        return QuantileDMatrix(**kwargs, ref=ref, nthread=nthread, max_bin=max_bin)
+
+    if cache is None:
+        return _create()
+    return cache.get(
+        ref=ref, max_bin=max_bin, tree_method=tree_method, booster=booster, kwargs=kwargs, create=_create
+    )
+
+
+def _native_learner(params: dict[str, Any], seed: int) -> tuple[dict[str, Any], int, int | None]:
+    early_stopping_rounds = params.get("early_stopping_rounds", 50)
+    num_boost_round = int(params.get("n_estimators") or 100)
+    learner = {k: v for k, v in params.items() if k not in _WRAPPER_ONLY_PARAMS and v is not None}
+    learner.setdefault("objective", "binary:logistic")
+    learner["random_state"] = int(seed)
+    return learner, num_boost_round, int(early_stopping_rounds) if early_stopping_rounds is not None else None
+
+
+def train_on_dmatrices(*, dtrain: DMatrix, dval: DMatrix, params: dict[str, Any], seed: int) -> FitResult:
+    # Native fit on prebuilt (e.g. iterator-backed) matrices; same parameters as model.engine: native.
+    learner, num_boost_round, early_stopping_rounds = _native_learner(params, seed)
+    booster = xgboost.train(
+        learner,
+        dtrain,
+        num_boost_round=num_boost_round,
+        evals=[(dval, "validation_0")],
+        early_stopping_rounds=early_stopping_rounds,
+        verbose_eval=False,
+    )
+    best_iteration = getattr(booster, "best_iteration", None)
+    best_score = getattr(booster, "best_score", None)
+    return FitResult(model=booster, best_iteration=best_iteration, best_score=best_score)
+
+
+def _train_native(
+    *,
+    x_train: np.ndarray,
+    y_train: np.ndarray,
+    x_val: np.ndarray,
+    y_val: np.ndarray,
+    params: dict[str, Any],
+    seed: int,
+    dmatrix_cache: QuantileDMatrixCache | None,
+) -> FitResult:
+    # Mirrors XGBClassifier.fit for binary labels, minus the wrapper and its per-call conversions.
+    dtrain = _native_dmatrix(cache=dmatrix_cache, ref=None, params=params, data=x_train, label=y_train)
+    dval = _native_dmatrix(cache=dmatrix_cache, ref=dtrain, params=params, data=x_val, label=y_val)
+    return train_on_dmatrices(dtrain=dtrain, dval=dval, params=params, seed=seed)
+
+
+def _maximize_metric(metric: str) -> bool:
+    # Same direction rule as xgboost.callback.EarlyStopping with maximize=None.
+    prefixes = ("auc", "aucpr", "pre", "pre@", "map", "ndcg", "auc@", "aucpr@", "map@", "ndcg@")
+    return metric != "mape" and metric.startswith(prefixes)
+
+
+def _samples_rows_or_columns(params: dict[str, Any]) -> bool:
+    return any(
+        params.get(name) is not None and float(params[name]) < 1.0
+        for name in ("subsample", "colsample_bytree", "colsample_bylevel", "colsample_bynode")
+    )
+
+
+class IncrementalFit:
+    # The loop of xgboost.train (same Booster object, callbacks and iteration numbers) split into
+    # resumable segments: advancing rung by rung ends with the same model as one native fit.
+    # Row/column sampling draws from XGBoost's per-thread RNG, which every booster reseeds on its
+    # first update, so `stochastic` fits interleaved with other boosters are not reproducible
+    # and must be retrained alone (retrain) for a result equal to a native fit.
+    def __init__(
+        self,
+        *,
+        x_train: np.ndarray,
+        y_train: np.ndarray,
+        x_val: np.ndarray,
+        y_val: np.ndarray,
+        params: dict[str, Any],
+        seed: int,
+        dmatrix_cache: QuantileDMatrixCache | None = None,
+    ) -> None:
+        learner, self.num_boost_round, early_stopping_rounds = _native_learner(params, seed)
+        self._params = params
+        self._seed = seed
+        self.stochastic = _samples_rows_or_columns(learner)
+        self._dtrain = _native_dmatrix(cache=dmatrix_cache, ref=None, params=params, data=x_train, label=y_train)
+        dval = _native_dmatrix(cache=dmatrix_cache, ref=self._dtrain, params=params, data=x_val, label=y_val)
+        self._evals = [(dval, "validation_0")]
+        callbacks = [xgboost.callback.EarlyStopping(rounds=early_stopping_rounds)] if early_stopping_rounds else []
+        self._callbacks = xgboost.callback.CallbackContainer(callbacks, output_margin=False)
+        self._booster = self._callbacks.before_training(Booster(learner, [self._dtrain, dval]))
+        self.rounds = 0
+        self.stopped = False
+
+    @property
+    def done(self) -> bool:
+        return self.stopped or self.rounds >= self.num_boost_round
+
+    def advance(self, until_round: int) -> None:
+        while not self.done and self.rounds < until_round:
+            i = self.rounds
+            if self._callbacks.before_iteration(self._booster, i, self._dtrain, self._evals):
+                self.stopped = True
+                break
+            self._booster.update(self._dtrain, i)
+            self.rounds += 1
+            if self._callbacks.after_iteration(self._booster, i, self._dtrain, self._evals):
+                self.stopped = True
+
+    def score(self) -> tuple[str, float, bool]:
+        # (metric, best validation score so far, maximize): what early stopping would keep.
+        metric, values = list(self._callbacks.history["validation_0"].items())[-1]
+        maximize = _maximize_metric(metric)
+        best = max(values) if maximize else min(values)
+        return metric, float(best), maximize
+
+    def finish(self) -> FitResult:
+        booster = self._callbacks.after_training(self._booster).copy()
+        best_iteration = getattr(booster, "best_iteration", None)
+        best_score = getattr(booster, "best_score", None)
+        return FitResult(model=booster, best_iteration=best_iteration, best_score=best_score)
+
+    def retrain(self) -> FitResult:
+        # A fresh native fit on the same matrices, independent of the boosters it competed with.
+        return train_on_dmatrices(dtrain=self._dtrain, dval=self._evals[0][0], params=self._params, seed=self._seed)
+
+
+@traced
 def train_xgb_classifier(
     *,
     x_train: np.ndarray,
@@ -23,46 +249,109 @@ def train_xgb_classifier(
     y_val: np.ndarray,
     params: dict[str, Any],
     seed: int,
+    dmatrix_cache: QuantileDMatrixCache | None = None,
+    engine: str = "sklearn",
 ) -> FitResult:
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown model.engine: {engine}")
+    if engine == "native":
+        return _train_native(
+            x_train=x_train,
+            y_train=y_train,
+            x_val=x_val,
+            y_val=y_val,
+            params=params,
+            seed=seed,
+            dmatrix_cache=dmatrix_cache,
+        )
+
     params = dict(params)
     early_stopping_rounds = params.pop("early_stopping_rounds", 50)
     if early_stopping_rounds is not None:
         params["early_stopping_rounds"] = int(early_stopping_rounds)
 
-    model = XGBClassifier(
+    model_cls = XGBClassifier if dmatrix_cache is None else _SharedQuantileClassifier
+    model = model_cls(
         random_state=int(seed),
         **params,
     )
-    model.fit(
-        x_train,
-        y_train,
-        eval_set=[(x_val, y_val)],
-        verbose=False,
-    )
+    if dmatrix_cache is not None:
+        model._dmatrix_cache = dmatrix_cache
+    try:
+        model.fit(
+            x_train,
+            y_train,
+            eval_set=[(x_val, y_val)],
+            verbose=False,
+        )
+    finally:
+        # Do not keep the shared matrices alive (or pickled) with the fitted model.
+        if dmatrix_cache is not None:
+            model._dmatrix_cache = None
 
     best_iteration = getattr(model, "best_iteration", None)
     best_score = getattr(model, "best_score", None)
     return FitResult(model=model, best_iteration=best_iteration, best_score=best_score)
 
 
-def predict_proba_positive(model: XGBClassifier, x: np.ndarray) -> np.ndarray:
-    p = model.predict_proba(x)
+def _iteration_range(booster: Booster) -> tuple[int, int]:
+    # Same rule as the sklearn wrapper: predict with trees up to the early-stopping best iteration.
+    best = booster.attr("best_iteration")
+    return (0, int(best) + 1) if best is not None else (0, 0)
+
+
+def _native_predict(
+    booster: Booster,
+    x: np.ndarray,
+    *,
+    predict_type: str,
+    iteration_range: tuple[int, int] | None = None,
+) -> np.ndarray:
+    x = np.ascontiguousarray(x, dtype=np.float32)
+    if iteration_range is None:
+        iteration_range = _iteration_range(booster)
+    p = booster.inplace_predict(x, iteration_range=iteration_range, predict_type=predict_type)
+    return np.asarray(p, dtype=np.float64).reshape(-1)
+
+
+def predict_margin(model: Model, x: np.ndarray) -> np.ndarray:
+    if isinstance(model, Booster):
+        return _native_predict(model, x, predict_type="margin")
+    return np.asarray(model.predict(x, output_margin=True), dtype=np.float64).reshape(-1)
+
+
+def predict_proba_positive(
+    model: Model,
+    x: np.ndarray,
+    *,
+    iteration_range: tuple[int, int] | None = None,
+) -> np.ndarray:
+    if isinstance(model, Booster):
+        return _native_predict(model, x, predict_type="value", iteration_range=iteration_range)
+    p = model.predict_proba(x, iteration_range=iteration_range)
     if p.ndim != 2 or p.shape[1] != 2:
         raise ValueError("predict_proba must return shape (n, 2)")
     return p[:, 1].astype(np.float64, copy=False)
 
 
 def compute_metrics(y_true: np.ndarray, p_pred: np.ndarray) -> dict[str, float]:
-    y_true = np.asarray(y_true).reshape(-1)
-    p_pred = np.asarray(p_pred).reshape(-1)
-    out: dict[str, float] = {}
-    out["prauc"] = float(average_precision_score(y_true, p_pred))
-    try:
-        out["rocauc"] = float(roc_auc_score(y_true, p_pred))
-    except Exception:
-        out["rocauc"] = float("nan")
-    try:
-        out["logloss"] = float(log_loss(y_true, p_pred, labels=[0, 1]))
-    except Exception:
-        out["logloss"] = float("nan")
-    return out
+    # Single-sort kernel; matches sklearn's average_precision_score, roc_auc_score and log_loss.
+    return binary_metrics(y_true, p_pred)
+
+
+def n_boosted_rounds(model: Model) -> int:
+    booster = model if isinstance(model, Booster) else model.get_booster()
+    return int(booster.num_boosted_rounds())
+
+
+def capacity_curve(model: Model, x: np.ndarray, y: np.ndarray, iterations: list[int]) -> list[dict[str, float]]:
+    # Metrics of the first k trees of one fitted model; k beyond the trees actually grown
+    # (e.g. after early stopping) are skipped.
+    n_rounds = n_boosted_rounds(model)
+    points = []
+    for k in sorted({int(k) for k in iterations}):
+        if k <= 0 or k > n_rounds:
+            continue
+        p = predict_proba_positive(model, x, iteration_range=(0, k))
+        points.append({"iteration": k, **compute_metrics(y, p)})
+    return points
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import json
 import logging
 import math
 import shutil
@@ -8,6 +9,9 @@ from typing import Any
 
 import pandas as pd
 
+from xgb_complex_features.runner.shards import MANIFEST_NAME, SHARD_DIRNAME, read_shards
+from xgb_complex_features.runner.shifts import shift_sweep_table
+from xgb_complex_features.tracing import traced
 from xgb_complex_features.utils import ensure_dir
 
 logger = logging.getLogger(__name__)
@@ -15,13 +19,17 @@ logger = logging.getLogger(__name__)
 
 def _find_result_files(input_dir: Path) -> list[Path]:
     parquet = sorted(input_dir.rglob("results.parquet"))
-    if parquet:
-        return parquet
     csv = sorted(input_dir.rglob("results.csv"))
-    return csv
+    files = parquet or csv
+    # Runs that are still in progress (or were killed) only have per-spec shards.
+    done = {p.parent for p in parquet + csv}
+    shard_dirs = sorted(m.parent for m in input_dir.rglob(f"{SHARD_DIRNAME}/{MANIFEST_NAME}") if m.parent.parent not in done)
+    return files + shard_dirs
 
 
 def _read_results(path: Path) -> pd.DataFrame:
+    if path.is_dir():
+        return read_shards(path)
     if path.name.endswith(".parquet"):
         return pd.read_parquet(path)
     if path.name.endswith(".csv"):
@@ -135,13 +143,46 @@ def _loo_median_range_table(
     return df.groupby(group_cols, dropna=False).apply(_one, include_groups=False).reset_index()
 
 
+def _timings_table(runs: pd.DataFrame, *, group_cols: list[str]) -> pd.DataFrame:
+    stage_cols = [c for c in runs.columns if c.startswith("time_") and c.endswith("_seconds")]
+    runs = runs.copy()
+    if "time_generate_seconds" in runs.columns:
+        # Generation runs once per dataset and is repeated on each of its cells; split it evenly.
+        dataset_keys = ["source_path", "task_id", "regime_id", "n", "seed"]
+        n_cells = runs.groupby(dataset_keys, dropna=False)["task_id"].transform("size")
+        runs["time_generate_seconds"] = runs["time_generate_seconds"] / n_cells
+
+    agg_specs: dict[str, tuple[str, Any]] = {"n_cells": ("task_id", "size")}
+    for col in stage_cols:
+        stage = col[len("time_") : -len("_seconds")]
+        agg_specs[f"{stage}_seconds_total"] = (col, "sum")
+        agg_specs[f"{stage}_seconds_median"] = (col, "median")
+    if "peak_rss_mb" in runs.columns:
+        agg_specs["peak_rss_mb_max"] = ("peak_rss_mb", "max")
+    table = runs.groupby(group_cols, dropna=False).agg(**agg_specs).reset_index()
+
+    total_cols = [c for c in table.columns if c.endswith("_seconds_total")]
+    table["seconds_total"] = table[total_cols].sum(axis=1)
+    return table.sort_values("seconds_total", ascending=False)
+
+
+def _capacity_curves_table(runs: pd.DataFrame) -> pd.DataFrame:
+    keys = ["task_id", "level", "regime_id", "regime_family", "seed", "n", "oracle_mode", "xgb_config_id"]
+    records = []
+    for row in runs[runs["capacity_curve_json"].notna()].itertuples(index=False):
+        for point in json.loads(row.capacity_curve_json):
+            records.append({**{k: getattr(row, k) for k in keys}, **point})
+    return pd.DataFrame.from_records(records)
+
+
+@traced
 def aggregate_runs(*, input_dir: str, output_dir: str) -> None:
     in_dir = Path(input_dir)
     out_dir = ensure_dir(output_dir)
 
     files = _find_result_files(in_dir)
     if not files:
-        raise FileNotFoundError(f"No results.parquet or results.csv found under {in_dir}")
+        raise FileNotFoundError(f"No results.parquet, results.csv or result shards found under {in_dir}")
 
     dfs = []
     for p in files:
@@ -151,6 +192,15 @@ def aggregate_runs(*, input_dir: str, output_dir: str) -> None:
     runs = pd.concat(dfs, ignore_index=True)
     logger.info("Loaded %d rows from %d files", len(runs), len(files))
 
+    # Successive-halving runs: keep the pruned configs' partial scores in their own table, and
+    # summarize only configs that were trained to completion.
+    if "search_status" in runs.columns:
+        search_cols = ["task_id", "regime_id", "seed", "n", "oracle_mode", "xgb_config_id", "best_iteration", "best_score"]
+        search = runs[search_cols + ["search_status", "search_rung", "search_rounds"]]
+        search.to_parquet(Path(out_dir) / "config_search.parquet", index=False)
+        search.to_csv(Path(out_dir) / "config_search.csv", index=False)
+        runs = runs[runs["search_status"] != "pruned"].reset_index(drop=True)
+
     # Compute deltas for each oracle mode vs raw_only.
     keys = ["task_id", "regime_id", "seed", "n", "xgb_config_id"]
     raw = runs[runs["oracle_mode"] == "raw_only"].copy()
@@ -330,6 +380,53 @@ def aggregate_runs(*, input_dir: str, output_dir: str) -> None:
     by_level_regime_family.to_parquet(Path(out_dir) / "summary_by_level_regime_family.parquet", index=False)
     by_level_regime_family.to_csv(Path(out_dir) / "summary_by_level_regime_family.csv", index=False)
 
+    # Where the compute goes; only runs that recorded per-stage timings contribute.
+    timed = runs[runs["time_fit_seconds"].notna()] if "time_fit_seconds" in runs.columns else runs.iloc[0:0]
+    if not timed.empty:
+        timings = _timings_table(timed, group_cols=["task_kind", "regime_id", "xgb_config_id", "oracle_mode", "n"])
+        timings.to_parquet(Path(out_dir) / "timings.parquet", index=False)
+        timings.to_csv(Path(out_dir) / "timings.csv", index=False)
+
+    # Capacity curves: one row per (run, iteration) in long form, plus medians across seeds.
+    if "capacity_curve_json" in runs.columns and runs["capacity_curve_json"].notna().any():
+        curves = _capacity_curves_table(runs)
+        curves.to_parquet(Path(out_dir) / "capacity_curves.parquet", index=False)
+        curves.to_csv(Path(out_dir) / "capacity_curves.csv", index=False)
+        curve_summary = (
+            curves.groupby(["task_id", "level", "regime_family", "oracle_mode", "xgb_config_id", "n", "iteration"], dropna=False)
+            .agg(
+                prauc_median=("prauc", "median"),
+                rocauc_median=("rocauc", "median"),
+                logloss_median=("logloss", "median"),
+                n_runs=("prauc", "size"),
+            )
+            .reset_index()
+        )
+        curve_summary.to_parquet(Path(out_dir) / "summary_capacity_curves.parquet", index=False)
+        curve_summary.to_csv(Path(out_dir) / "summary_capacity_curves.csv", index=False)
+
+    # Shift sweeps: one row per (run, shift) in long form, plus medians across seeds.
+    if "shift_sweep_json" in runs.columns and runs["shift_sweep_json"].notna().any():
+        sweep = shift_sweep_table(runs)
+        sweep.to_parquet(Path(out_dir) / "shift_sweep.parquet", index=False)
+        sweep.to_csv(Path(out_dir) / "shift_sweep.csv", index=False)
+        sweep_summary = (
+            sweep.groupby(
+                ["task_id", "level", "regime_id", "oracle_mode", "xgb_config_id", "n", "shift_type", "shift_c"],
+                dropna=False,
+            )
+            .agg(
+                prauc_median=("prauc", "median"),
+                rocauc_median=("rocauc", "median"),
+                logloss_median=("logloss", "median"),
+                prevalence_test_median=("prevalence_test", "median"),
+                n_runs=("prauc", "size"),
+            )
+            .reset_index()
+        )
+        sweep_summary.to_parquet(Path(out_dir) / "summary_shift_sweep.parquet", index=False)
+        sweep_summary.to_csv(Path(out_dir) / "summary_shift_sweep.csv", index=False)
+
     meta_src = Path(input_dir) / "run_metadata.json"
     if meta_src.exists():
         shutil.copy(meta_src, Path(out_dir) / "run_metadata.json")
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from xgboost import Booster
+
+from xgb_complex_features.models.xgb import Model
+from xgb_complex_features.utils import ensure_dir
+
+MODEL_NAME = "model.ubj"
+PREDICTIONS_NAME = "predictions.npz"
+META_NAME = "meta.json"
+
+
+class ArtifactStore:
+    # One directory per fitted cell, addressed by its model key: booster (UBJSON), test
+    # predictions/labels (compressed; float64 so recomputed metrics match the original row) and a
+    # small JSON header.
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+
+    def _dir(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def contains(self, key: str) -> bool:
+        return (self._dir(key) / META_NAME).exists()
+
+    def put(self, key: str, *, model: Model, p_test: np.ndarray, y_test: np.ndarray, meta: dict[str, Any]) -> None:
+        path = self._dir(key)
+        ensure_dir(path.parent)
+        booster = model if isinstance(model, Booster) else model.get_booster()
+        # Build in a sibling temp dir and rename, like dgp.store.save_dataset.
+        tmp = Path(tempfile.mkdtemp(dir=path.parent, prefix=f".{key}."))
+        try:
+            booster.save_model(str(tmp / MODEL_NAME))
+            np.savez_compressed(
+                tmp / PREDICTIONS_NAME,
+                p_test=np.asarray(p_test, dtype=np.float64),
+                y_test=np.asarray(y_test, dtype=np.int8),
+            )
+            (tmp / META_NAME).write_text(json.dumps(meta, default=str), encoding="utf-8")
+            if path.exists():
+                shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp, path)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+    def load_model(self, key: str) -> Booster:
+        booster = Booster()
+        booster.load_model(str(self._dir(key) / MODEL_NAME))
+        return booster
+
+    def load_predictions(self, key: str) -> tuple[np.ndarray, np.ndarray]:
+        with np.load(self._dir(key) / PREDICTIONS_NAME) as f:
+            return f["p_test"].astype(np.float64), f["y_test"].astype(np.int64)
+
+    def load_meta(self, key: str) -> dict[str, Any]:
+        return json.loads((self._dir(key) / META_NAME).read_text(encoding="utf-8"))
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any
+
+from xgb_complex_features import __version__
+from xgb_complex_features.dgp.stream import streams
+from xgb_complex_features.runner.grid import DatasetSpec, nested_n_max
+from xgb_complex_features.runner.search import halving_settings
+from xgb_complex_features.runner.shifts import shift_sweep_settings, sweeps_regime
+from xgb_complex_features.utils import ensure_dir, stable_hash
+
+
+def _model_payload(
+    *,
+    cfg: dict[str, Any],
+    spec: DatasetSpec,
+    xgb_cfg: dict[str, Any],
+    oracle_mode: str,
+    root_seed: int,
+) -> dict[str, Any]:
+    # Everything that determines the dataset and the fitted model of one cell.
+    data = dict(cfg.get("data", {}) or {})
+    if not streams(data, spec.n):
+        # data.stream only changes specs that actually stream; keep the other keys unchanged.
+        data.pop("stream", None)
+    # Where the chunked generator maps its scratch file, and how many threads fill it, do not
+    # change the data.
+    data.pop("memmap_dir", None)
+    data.pop("generation_threads", None)
+    payload = {
+        "task": spec.task,
+        "regime": spec.regime,
+        "n": int(spec.n),
+        "seed": int(spec.seed),
+        "data": data,
+        "label": cfg.get("label", {}) or {},
+        "splits": cfg.get("splits", {}) or {},
+        "xgb_config_id": str(xgb_cfg["id"]),
+        "xgb_params": xgb_cfg.get("params", {}) or {},
+        "oracle_mode": str(oracle_mode),
+        "root_seed": int(root_seed),
+        "version": __version__,
+    }
+    n_max = nested_n_max(cfg)
+    if n_max is not None and spec.n < n_max:
+        # Nested subsets depend on the dataset they are cut from; the largest n is an ordinary dataset.
+        payload["nested_n_max"] = n_max
+    return payload
+
+
+def dataset_key(*, cfg: dict[str, Any], spec: DatasetSpec, root_seed: int) -> str:
+    # Everything generate_dataset reads for one spec (see _model_payload for what is left out).
+    data = dict(cfg.get("data", {}) or {})
+    for name in ("stream", "memmap_dir", "generation_threads"):
+        data.pop(name, None)
+    return stable_hash(
+        {
+            "task": spec.task,
+            "regime": spec.regime,
+            "n": int(spec.n),
+            "seed": int(root_seed) + int(spec.seed),
+            "data": data,
+            "label": cfg.get("label", {}) or {},
+            "splits": cfg.get("splits", {}) or {},
+            "version": __version__,
+            "kind": "dataset",
+        }
+    )
+
+
+def model_key(
+    *,
+    cfg: dict[str, Any],
+    spec: DatasetSpec,
+    xgb_cfg: dict[str, Any],
+    oracle_mode: str,
+    root_seed: int,
+) -> str:
+    # Independent of diagnostics/metrics settings, so stored models outlive changes to them.
+    payload = _model_payload(cfg=cfg, spec=spec, xgb_cfg=xgb_cfg, oracle_mode=oracle_mode, root_seed=root_seed)
+    return stable_hash({**payload, "kind": "model"})
+
+
+def cell_key(
+    *,
+    cfg: dict[str, Any],
+    spec: DatasetSpec,
+    xgb_cfg: dict[str, Any],
+    oracle_mode: str,
+    root_seed: int,
+) -> str:
+    # Everything that can change a results row for one (spec, xgb_config, oracle_mode) cell.
+    payload = _model_payload(cfg=cfg, spec=spec, xgb_cfg=xgb_cfg, oracle_mode=oracle_mode, root_seed=root_seed)
+    payload["diagnostics"] = cfg.get("diagnostics", {}) or {}
+    # model.engine/share_quantiles do not change results; optional outputs do. Only added when set,
+    # so keys of cells without them are unchanged.
+    model_cfg = cfg.get("model", {}) or {}
+    if model_cfg.get("curve_iterations"):
+        payload["curve_iterations"] = sorted(int(k) for k in model_cfg["curve_iterations"])
+    metrics_cfg = cfg.get("metrics", {}) or {}
+    if metrics_cfg.get("bootstrap"):
+        payload["metrics"] = metrics_cfg
+    sweep = shift_sweep_settings(cfg)
+    if sweeps_regime(sweep, spec.regime):
+        payload["shift_sweep"] = asdict(sweep)  # type: ignore[arg-type]
+    settings = halving_settings(cfg)
+    if settings is not None:
+        # Whether a config is pruned depends on every config it competes with.
+        payload["config_search"] = {
+            "halving": asdict(settings),
+            "xgb_configs": [{"id": str(c["id"]), "params": c.get("params", {}) or {}} for c in cfg.get("xgb_configs", [])],
+        }
+    return stable_hash(payload)
+
+
+class ResultCache:
+    # One JSON file per finished results row, addressed by its cell key.
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def contains(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        path = self._path(key)
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, row: dict[str, Any]) -> None:
+        path = self._path(key)
+        ensure_dir(path.parent)
+        # Write-then-rename so concurrent workers and killed runs never leave partial entries.
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{key}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(row, f)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
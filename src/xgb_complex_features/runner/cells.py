@@ -0,0 +1,615 @@
+from __future__ import annotations
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+import numpy as np
+
+from xgb_complex_features.dgp.dataset import Dataset, OracleMode, build_features, generate_dataset, nested_subset
+from xgb_complex_features.dgp.store import DatasetCache
+from xgb_complex_features.diagnostics.dominance import compute_dominance
+from xgb_complex_features.diagnostics.invariance import compute_all_invariance
+from xgb_complex_features.models.metrics import bootstrap_metrics
+from xgb_complex_features.models.xgb import (
+    FitResult,
+    IncrementalFit,
+    QuantileDMatrixCache,
+    capacity_curve,
+    compute_metrics,
+    predict_proba_positive,
+    train_xgb_classifier,
+)
+from xgb_complex_features.runner.artifacts import ArtifactStore
+from xgb_complex_features.runner.cache import ResultCache, cell_key, dataset_key, model_key
+from xgb_complex_features.runner.grid import DatasetSpec, nested_n_max
+from xgb_complex_features.runner.search import halving_settings, successive_halving
+from xgb_complex_features.runner.shifts import ShiftedTestSets, shift_sweep_settings, shifted_test_sets, sweeps_regime
+from xgb_complex_features.runner.threads import concurrent_fits, fit_threads
+from xgb_complex_features.tracing import span, trace_context
+from xgb_complex_features.utils import make_rng, peak_rss_mb
+
+
+ORACLE_MODES = {"raw_only", "oracle_s_only", "oracle_coords_only", "oracle_all"}
+
+Cell = tuple[dict[str, Any], str]
+
+
+@dataclass
+class SharedInputs:
+    # Reused by every cell of one dataset: split feature matrices per oracle mode, and the
+    # QuantileDMatrix bins XGBoost builds from them (identical for every config with the same max_bin).
+    features: dict[str, tuple[np.ndarray, np.ndarray, np.ndarray]] = field(default_factory=dict)
+    labels: tuple[np.ndarray, np.ndarray, np.ndarray] | None = None
+    dmatrices: QuantileDMatrixCache = field(default_factory=QuantileDMatrixCache)
+    shifted: ShiftedTestSets | None = None
+
+
+def shared_inputs_for(cfg: dict[str, Any]) -> SharedInputs | None:
+    model_cfg = cfg.get("model", {}) or {}
+    return SharedInputs() if bool(model_cfg.get("share_quantiles", True)) else None
+
+
+def dataset_cache_for(cfg: dict[str, Any]) -> DatasetCache | None:
+    out = cfg.get("output", {}) or {}
+    if not out.get("dataset_cache_dir"):
+        return None
+    max_gb = out.get("dataset_cache_max_gb")
+    return DatasetCache(
+        Path(out["dataset_cache_dir"]).resolve(),
+        max_bytes=int(float(max_gb) * 1024**3) if max_gb else None,
+    )
+
+
+def grid_cells(cfg: dict[str, Any]) -> list[Cell]:
+    xgb_configs = cfg.get("xgb_configs", []) or []
+    oracle_modes = cfg.get("oracle_modes", []) or []
+    if not xgb_configs:
+        raise ValueError("Config must include xgb_configs")
+    if not oracle_modes:
+        raise ValueError("Config must include oracle_modes")
+    for oracle_mode in oracle_modes:
+        if str(oracle_mode) not in ORACLE_MODES:
+            raise ValueError(f"Unknown oracle_mode: {oracle_mode}")
+    return [(xgb_cfg, str(oracle_mode)) for xgb_cfg in xgb_configs for oracle_mode in oracle_modes]
+
+
+def _cell_params(xgb_cfg: dict[str, Any], n_threads: int | None) -> dict[str, Any]:
+    params = deepcopy(xgb_cfg.get("params", {}) or {})
+    if n_threads is not None:
+        # The runner's thread budget overrides per-config n_jobs/nthread.
+        params.pop("nthread", None)
+        params["n_jobs"] = int(n_threads)
+    return params
+
+
+def _cell_inputs(
+    ds: Dataset,
+    oracle_mode: str,
+    shared: SharedInputs | None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    tr, va, te = ds.splits.train, ds.splits.val, ds.splits.test
+    if shared is not None and oracle_mode in shared.features:
+        x_train, x_val, x_test = shared.features[oracle_mode]
+    else:
+        x, _ = build_features(ds, oracle_mode=oracle_mode)  # type: ignore[arg-type]
+        x_train, x_val, x_test = x[tr], x[va], x[te]
+        if shared is not None:
+            shared.features[oracle_mode] = (x_train, x_val, x_test)
+    if shared is not None and shared.labels is not None:
+        y_train, y_val, y_test = shared.labels
+    else:
+        y_train, y_val, y_test = ds.y[tr], ds.y[va], ds.y[te]
+        if shared is not None:
+            shared.labels = (y_train, y_val, y_test)
+    return x_train, x_val, x_test, y_train, y_val, y_test
+
+
+def _model_seed(*, spec: DatasetSpec, oracle_mode: str, xgb_config_id: str, root_seed: int) -> int:
+    rng = _cell_rng(spec=spec, oracle_mode=oracle_mode, xgb_config_id=xgb_config_id, root_seed=root_seed, stream="model_seed")
+    return int(rng.integers(0, 2**31 - 1))
+
+
+def _row_header(metadata: dict[str, Any], spec: DatasetSpec, oracle_mode: str, xgb_config_id: str) -> dict[str, Any]:
+    return {
+        "task_id": metadata["task_id"],
+        "level": metadata["task_level"],
+        "task_kind": metadata["task_kind"],
+        "regime_id": metadata["regime_id"],
+        "regime_family": metadata["regime_family"],
+        "seed": int(spec.seed),
+        "n": int(spec.n),
+        "oracle_mode": oracle_mode,
+        "model_variant": "raw" if oracle_mode == "raw_only" else "oracle",
+        "xgb_config_id": xgb_config_id,
+    }
+
+
+def _dataset_columns(metadata: dict[str, Any]) -> dict[str, Any]:
+    columns = {
+        "prevalence_train": metadata["prevalence_train"],
+        "prevalence_val": metadata["prevalence_val"],
+        "prevalence_test": metadata["prevalence_test"],
+        "sigma": metadata.get("sigma"),
+        "rho": metadata.get("rho"),
+        "mixture_json": json.dumps(metadata.get("mixture"), sort_keys=True)
+        if metadata.get("mixture") is not None
+        else None,
+        "shift_type": metadata.get("shift_type"),
+        "shift_cols_json": json.dumps(metadata.get("shift_cols"), sort_keys=True)
+        if metadata.get("shift_cols") is not None
+        else None,
+    }
+    if "nested_n_max" in metadata:
+        columns["nested_n_max"] = metadata["nested_n_max"]
+    return columns
+
+
+def _cell_rng(*, spec: DatasetSpec, oracle_mode: str, xgb_config_id: str, root_seed: int, stream: str) -> np.random.Generator:
+    return make_rng(
+        root_seed,
+        spec.seed,
+        spec.task["id"],
+        spec.regime["id"],
+        spec.n,
+        oracle_mode,
+        xgb_config_id,
+        stream,
+    )
+
+
+def _test_metrics(
+    *,
+    cfg: dict[str, Any],
+    spec: DatasetSpec,
+    oracle_mode: str,
+    xgb_config_id: str,
+    root_seed: int,
+    y_test: np.ndarray,
+    p_test: np.ndarray,
+) -> dict[str, Any]:
+    metrics = compute_metrics(y_test, p_test)
+    metrics_cfg = cfg.get("metrics", {}) or {}
+    n_boot = int(metrics_cfg.get("bootstrap", 0) or 0)
+    if n_boot > 0:
+        rng_boot = _cell_rng(
+            spec=spec, oracle_mode=oracle_mode, xgb_config_id=xgb_config_id, root_seed=root_seed, stream="bootstrap"
+        )
+        metrics.update(
+            bootstrap_metrics(y_test, p_test, n_boot=n_boot, ci=float(metrics_cfg.get("ci", 0.95)), rng=rng_boot)
+        )
+    return metrics
+
+
+def _result_row(
+    *,
+    metadata: dict[str, Any],
+    spec: DatasetSpec,
+    oracle_mode: str,
+    xgb_config_id: str,
+    fit: FitResult,
+    metrics: dict[str, Any],
+    invariance: dict[str, float],
+    dom_train: dict[str, Any],
+    dom_test: dict[str, Any],
+    curve: list[dict[str, float]] | None,
+    timings: dict[str, float],
+) -> dict[str, Any]:
+    return {
+        **_row_header(metadata, spec, oracle_mode, xgb_config_id),
+        "best_iteration": fit.best_iteration,
+        "best_score": fit.best_score,
+        **metrics,
+        **invariance,
+        **_dataset_columns(metadata),
+        "dominance_train_mean": dom_train["dominance_mean"],
+        "dominance_train_median": dom_train["dominance_median"],
+        "dominance_train_p90": dom_train["dominance_p90"],
+        "dominance_test_mean": dom_test["dominance_mean"],
+        "dominance_test_median": dom_test["dominance_median"],
+        "dominance_test_p90": dom_test["dominance_p90"],
+        "dominance_train_groups_json": dom_train["dominance_groups_json"],
+        "dominance_test_groups_json": dom_test["dominance_groups_json"],
+        "capacity_curve_json": json.dumps(curve) if curve is not None else None,
+        # Generation happens once per dataset spec, so every cell of a spec repeats its time.
+        "time_generate_seconds": metadata.get("generate_seconds"),
+        **{f"time_{stage}_seconds": seconds for stage, seconds in timings.items()},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _train_cell(
+    *,
+    cfg: dict[str, Any],
+    spec: DatasetSpec,
+    xgb_cfg: dict[str, Any],
+    oracle_mode: str,
+    root_seed: int,
+    inputs: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+    n_threads: int | None,
+    shared: SharedInputs | None,
+) -> tuple[FitResult, float]:
+    x_train, y_train, x_val, y_val = inputs
+    model_cfg = cfg.get("model", {}) or {}
+    xgb_config_id = str(xgb_cfg["id"])
+    start = perf_counter()
+    fit = train_xgb_classifier(
+        x_train=x_train,
+        y_train=y_train,
+        x_val=x_val,
+        y_val=y_val,
+        params=_cell_params(xgb_cfg, n_threads),
+        seed=_model_seed(spec=spec, oracle_mode=oracle_mode, xgb_config_id=xgb_config_id, root_seed=root_seed),
+        dmatrix_cache=shared.dmatrices if shared is not None else None,
+        engine=str(model_cfg.get("engine", "sklearn")),
+    )
+    return fit, perf_counter() - start
+
+
+def _train_concurrently(
+    *,
+    ds: Dataset,
+    cfg: dict[str, Any],
+    spec: DatasetSpec,
+    cells: list[Cell],
+    root_seed: int,
+    n_threads: int | None,
+    shared: SharedInputs | None,
+    fits: int,
+) -> list[tuple[FitResult, float]]:
+    # Trains up to `fits` cells at once on a thread pool (XGBoost releases the GIL), each booster
+    # with an equal slice of the worker's thread budget. Inputs are built first, in this thread.
+    features = shared if shared is not None else SharedInputs()
+    inputs = {}
+    for _, oracle_mode in cells:
+        if oracle_mode not in inputs:
+            x_train, x_val, _, y_train, y_val, _ = _cell_inputs(ds, oracle_mode, features)
+            inputs[oracle_mode] = (x_train, y_train, x_val, y_val)
+    fits = min(fits, len(cells))
+
+    def _fit(xgb_cfg: dict[str, Any], oracle_mode: str) -> tuple[FitResult, float]:
+        # Trace context is per thread.
+        with trace_context(spec_id=spec.spec_id), span("fit", xgb_config_id=str(xgb_cfg["id"]), oracle_mode=oracle_mode):
+            return _train_cell(
+                cfg=cfg,
+                spec=spec,
+                xgb_cfg=xgb_cfg,
+                oracle_mode=oracle_mode,
+                root_seed=root_seed,
+                inputs=inputs[oracle_mode],
+                n_threads=fit_threads(n_threads, fits),
+                shared=shared,
+            )
+
+    with span("concurrent_fits", fits=fits), ThreadPoolExecutor(max_workers=fits) as pool:
+        futures = [pool.submit(_fit, xgb_cfg, oracle_mode) for xgb_cfg, oracle_mode in cells]
+        return [future.result() for future in futures]
+
+
+def store_cell_artifacts(
+    artifacts_dir: str,
+    *,
+    cfg: dict[str, Any],
+    spec: DatasetSpec,
+    xgb_cfg: dict[str, Any],
+    oracle_mode: str,
+    root_seed: int,
+    fit: FitResult,
+    p_test: np.ndarray,
+    y_test: np.ndarray,
+) -> None:
+    ArtifactStore(artifacts_dir).put(
+        model_key(cfg=cfg, spec=spec, xgb_cfg=xgb_cfg, oracle_mode=oracle_mode, root_seed=root_seed),
+        model=fit.model,
+        p_test=p_test,
+        y_test=y_test,
+        meta={"spec_id": spec.spec_id, "xgb_config_id": str(xgb_cfg["id"]), "oracle_mode": oracle_mode},
+    )
+
+
+def run_cell(
+    *,
+    ds: Dataset,
+    cfg: dict[str, Any],
+    spec: DatasetSpec,
+    xgb_cfg: dict[str, Any],
+    oracle_mode: str,
+    root_seed: int,
+    n_threads: int | None = None,
+    shared: SharedInputs | None = None,
+    artifacts_dir: str | None = None,
+    fit: FitResult | None = None,
+    fit_seconds: float | None = None,
+) -> dict[str, Any]:
+    # `fit`/`fit_seconds`: a model already trained by the caller (config search); skips training.
+    diagnostics_cfg = cfg.get("diagnostics", {}) or {}
+    model_cfg = cfg.get("model", {}) or {}
+    xgb_config_id = str(xgb_cfg["id"])
+    oracle_mode_t: OracleMode = oracle_mode  # type: ignore[assignment]
+
+    timings: dict[str, float] = {}
+    start = perf_counter()
+    tr, te = ds.splits.train, ds.splits.test
+    x_train, x_val, x_test, y_train, y_val, y_test = _cell_inputs(ds, oracle_mode, shared)
+    timings["features"] = perf_counter() - start
+
+    if fit is None:
+        fit, fit_seconds = _train_cell(
+            cfg=cfg,
+            spec=spec,
+            xgb_cfg=xgb_cfg,
+            oracle_mode=oracle_mode,
+            root_seed=root_seed,
+            inputs=(x_train, y_train, x_val, y_val),
+            n_threads=n_threads,
+            shared=shared,
+        )
+    timings["fit"] = float(fit_seconds or 0.0)
+
+    start = perf_counter()
+    p_test = predict_proba_positive(fit.model, x_test)
+    timings["predict"] = perf_counter() - start
+    metrics = _test_metrics(
+        cfg=cfg,
+        spec=spec,
+        oracle_mode=oracle_mode,
+        xgb_config_id=xgb_config_id,
+        root_seed=root_seed,
+        y_test=y_test,
+        p_test=p_test,
+    )
+    if artifacts_dir is not None:
+        store_cell_artifacts(
+            artifacts_dir,
+            cfg=cfg,
+            spec=spec,
+            xgb_cfg=xgb_cfg,
+            oracle_mode=oracle_mode,
+            root_seed=root_seed,
+            fit=fit,
+            p_test=p_test,
+            y_test=y_test,
+        )
+    curve_iterations = model_cfg.get("curve_iterations")
+    curve = None
+    if curve_iterations:
+        start = perf_counter()
+        curve = capacity_curve(fit.model, x_test, y_test, list(curve_iterations))
+        timings["curve"] = perf_counter() - start
+
+    sweep = shift_sweep_settings(cfg)
+    shift_sweep = None
+    if sweep is not None and sweeps_regime(sweep, spec.regime):
+        start = perf_counter()
+        shifted = shared.shifted if shared is not None else None
+        if shifted is None:
+            shifted = shifted_test_sets(ds, settings=sweep, cfg=cfg, spec=spec, root_seed=root_seed)
+            if shared is not None:
+                shared.shifted = shifted
+        shift_sweep = shifted.evaluate(fit.model, ds, oracle_mode)
+        timings["shift_sweep"] = perf_counter() - start
+
+    rng_diag = _cell_rng(spec=spec, oracle_mode=oracle_mode, xgb_config_id=xgb_config_id, root_seed=root_seed, stream="diag")
+    invariance = compute_all_invariance(
+        model=fit.model,
+        oracle_mode=oracle_mode_t,
+        task=ds.task,
+        x_test_raw=ds.x_raw[te],
+        rng=rng_diag,
+        cfg=diagnostics_cfg,
+        timings=timings,
+    )
+
+    start = perf_counter()
+    dom_train = compute_dominance(x_raw=ds.x_raw, idx=tr, sum_groups=ds.task.diagnostics.sum_groups)
+    dom_test = compute_dominance(x_raw=ds.x_raw, idx=te, sum_groups=ds.task.diagnostics.sum_groups)
+    timings["dominance"] = perf_counter() - start
+
+    row = _result_row(
+        metadata=ds.metadata,
+        spec=spec,
+        oracle_mode=oracle_mode,
+        xgb_config_id=xgb_config_id,
+        fit=fit,
+        metrics=metrics,
+        invariance=invariance,
+        dom_train=dom_train,
+        dom_test=dom_test,
+        curve=curve,
+        timings=timings,
+    )
+    if shift_sweep is not None:
+        row["shift_sweep_json"] = json.dumps(shift_sweep)
+    return row
+
+
+def run_cells(
+    *,
+    ds: Dataset,
+    cfg: dict[str, Any],
+    spec: DatasetSpec,
+    cells: list[Cell],
+    root_seed: int,
+    cache_dir: str | None = None,
+    n_threads: int | None = None,
+    artifacts_dir: str | None = None,
+) -> list[dict[str, Any]]:
+    cache = ResultCache(cache_dir) if cache_dir is not None else None
+    shared = shared_inputs_for(cfg)
+    settings = halving_settings(cfg)
+    if settings is not None:
+        rows = _run_cells_halving(
+            ds=ds,
+            cfg=cfg,
+            spec=spec,
+            cells=cells,
+            root_seed=root_seed,
+            n_threads=n_threads,
+            shared=shared,
+            artifacts_dir=artifacts_dir,
+        )
+        if cache is not None:
+            for (xgb_cfg, oracle_mode), row in zip(cells, rows):
+                cache.put(cell_key(cfg=cfg, spec=spec, xgb_cfg=xgb_cfg, oracle_mode=oracle_mode, root_seed=root_seed), row)
+        return rows
+
+    fits = concurrent_fits(cfg.get("runner", {}) or {})
+    trained: list[tuple[FitResult | None, float | None]] = [(None, None)] * len(cells)
+    if fits > 1 and len(cells) > 1:
+        trained = _train_concurrently(  # type: ignore[assignment]
+            ds=ds,
+            cfg=cfg,
+            spec=spec,
+            cells=cells,
+            root_seed=root_seed,
+            n_threads=n_threads,
+            shared=shared,
+            fits=fits,
+        )
+
+    rows: list[dict[str, Any]] = []
+    for (xgb_cfg, oracle_mode), (fit, fit_seconds) in zip(cells, trained):
+        with span("run_cell", xgb_config_id=str(xgb_cfg["id"]), oracle_mode=oracle_mode):
+            row = run_cell(
+                ds=ds,
+                cfg=cfg,
+                spec=spec,
+                xgb_cfg=xgb_cfg,
+                oracle_mode=oracle_mode,
+                root_seed=root_seed,
+                n_threads=n_threads,
+                shared=shared,
+                artifacts_dir=artifacts_dir,
+                fit=fit,
+                fit_seconds=fit_seconds,
+            )
+        if cache is not None:
+            key = cell_key(cfg=cfg, spec=spec, xgb_cfg=xgb_cfg, oracle_mode=oracle_mode, root_seed=root_seed)
+            cache.put(key, row)
+        rows.append(row)
+    return rows
+
+
+def _run_cells_halving(
+    *,
+    ds: Dataset,
+    cfg: dict[str, Any],
+    spec: DatasetSpec,
+    cells: list[Cell],
+    root_seed: int,
+    n_threads: int | None,
+    shared: SharedInputs | None,
+    artifacts_dir: str | None,
+) -> list[dict[str, Any]]:
+    # The xgb_configs of each oracle mode compete in one successive-halving search; survivors get
+    # full rows, pruned configs a row with their partial validation score and no test results.
+    settings = halving_settings(cfg)
+    assert settings is not None
+    by_mode: dict[str, list[dict[str, Any]]] = {}
+    for xgb_cfg, oracle_mode in cells:
+        by_mode.setdefault(oracle_mode, []).append(xgb_cfg)
+
+    out: dict[tuple[str, str], dict[str, Any]] = {}
+    for oracle_mode, xgb_cfgs in by_mode.items():
+        x_train, x_val, _, y_train, y_val, _ = _cell_inputs(ds, oracle_mode, shared)
+        fits = {
+            str(xgb_cfg["id"]): IncrementalFit(
+                x_train=x_train,
+                y_train=y_train,
+                x_val=x_val,
+                y_val=y_val,
+                params=_cell_params(xgb_cfg, n_threads),
+                seed=_model_seed(spec=spec, oracle_mode=oracle_mode, xgb_config_id=str(xgb_cfg["id"]), root_seed=root_seed),
+                dmatrix_cache=shared.dmatrices if shared is not None else None,
+            )
+            for xgb_cfg in xgb_cfgs
+        }
+        fit_seconds: dict[str, float] = {}
+        with span("config_search", oracle_mode=oracle_mode):
+            pruned = successive_halving(fits, settings=settings, fit_seconds=fit_seconds)
+
+        for xgb_cfg in xgb_cfgs:
+            config_id = str(xgb_cfg["id"])
+            if config_id not in pruned and fits[config_id].stochastic:
+                start = perf_counter()
+                with span("retrain", xgb_config_id=config_id, oracle_mode=oracle_mode):
+                    fit = fits[config_id].retrain()
+                fit_seconds[config_id] = fit_seconds.get(config_id, 0.0) + perf_counter() - start
+            else:
+                fit = fits[config_id].finish()
+            if config_id in pruned:
+                row = {
+                    **_row_header(ds.metadata, spec, oracle_mode, config_id),
+                    "best_iteration": fit.best_iteration,
+                    "best_score": fit.best_score,
+                    **_dataset_columns(ds.metadata),
+                    "time_generate_seconds": ds.metadata.get("generate_seconds"),
+                    "time_fit_seconds": fit_seconds.get(config_id, 0.0),
+                    "peak_rss_mb": peak_rss_mb(),
+                    "search_status": "pruned",
+                    "search_rung": pruned[config_id].rung,
+                }
+            else:
+                with span("run_cell", xgb_config_id=config_id, oracle_mode=oracle_mode):
+                    row = run_cell(
+                        ds=ds,
+                        cfg=cfg,
+                        spec=spec,
+                        xgb_cfg=xgb_cfg,
+                        oracle_mode=oracle_mode,
+                        root_seed=root_seed,
+                        n_threads=n_threads,
+                        shared=shared,
+                        artifacts_dir=artifacts_dir,
+                        fit=fit,
+                        fit_seconds=fit_seconds.get(config_id, 0.0),
+                    )
+                row["search_status"] = "finished"
+                row["search_rung"] = None
+            row["search_rounds"] = fits[config_id].rounds
+            out[(config_id, oracle_mode)] = row
+    return [out[(str(xgb_cfg["id"]), oracle_mode)] for xgb_cfg, oracle_mode in cells]
+
+
+def generate_spec_dataset(
+    *,
+    cfg: dict[str, Any],
+    spec: DatasetSpec,
+    root_seed: int,
+    base: Dataset | None = None,
+) -> Dataset:
+    # `base`: the dataset already generated at nested_n_max for this (task, regime, seed).
+    n_max = nested_n_max(cfg)
+    if base is not None and spec.n == n_max:
+        return base
+    if n_max is not None and spec.n < n_max:
+        if base is None:
+            base = generate_spec_dataset(cfg=cfg, spec=replace(spec, n=n_max), root_seed=root_seed)
+        return nested_subset(base, spec.n, cfg.get("splits", {}) or {})
+
+    dataset_seed = int(root_seed) + int(spec.seed)
+    start = perf_counter()
+    cache = dataset_cache_for(cfg)
+    key = dataset_key(cfg=cfg, spec=spec, root_seed=root_seed) if cache is not None else ""
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            cached.metadata["generate_seconds"] = perf_counter() - start
+            return cached
+    ds = generate_dataset(
+        n=spec.n,
+        seed=dataset_seed,
+        task_cfg=spec.task,
+        regime_cfg=spec.regime,
+        data_cfg=cfg.get("data", {}) or {},
+        label_cfg=cfg.get("label", {}) or {},
+        splits_cfg=cfg.get("splits", {}) or {},
+    )
+    ds.metadata["generate_seconds"] = perf_counter() - start
+    if cache is not None:
+        cache.put(key, ds)
+    return ds
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from xgb_complex_features.dgp.tasks import FittedTask, fit_task
+from xgb_complex_features.runner.cells import Cell
+from xgb_complex_features.runner.grid import DatasetSpec
+from xgb_complex_features.runner.shards import MANIFEST_NAME, SHARD_DIRNAME, read_manifest
+
+logger = logging.getLogger(__name__)
+
+# Rough single-thread priors (seconds per unit); history-based factors correct the overall scale.
+_GEN_SECONDS_PER_UNIT = 2e-9  # per n * d_total * d_total (latent matmul dominates)
+_GEN_STRUCTURED_SECONDS_PER_UNIT = 5e-8  # per n * d_total (correlation.sampler: structured)
+_FIT_SECONDS_PER_UNIT = 5e-10  # per row * feature * round * depth (histogram building)
+_ROUND_OVERHEAD_SECONDS = 1e-4  # per boosting round (eval set, callbacks)
+_PREDICT_SECONDS_PER_UNIT = 2e-9  # per row * tree * depth
+_PREDICT_CALL_SECONDS = 3e-4  # fixed overhead per predict call (iso-variance loops are call-bound)
+
+
+def task_structure(task_cfg: dict[str, Any], cfg: dict[str, Any]) -> FittedTask:
+    # Diagnostics structure only depends on the task config; fit on a dummy positive matrix.
+    data_cfg = cfg.get("data", {}) or {}
+    label_cfg = cfg.get("label", {}) or {}
+    nonmono_cfg = label_cfg.get("nonmonotone", {}) or {}
+    gating_cfg = label_cfg.get("gating", {}) or {}
+    d_signal_max = int(data_cfg.get("d_signal_max", 10))
+    x_dummy = np.linspace(1.0, 2.0, 16 * d_signal_max).reshape(16, d_signal_max)
+    return fit_task(
+        task_cfg,
+        x_dummy,
+        d_signal_max=d_signal_max,
+        epsilon_rel=float(label_cfg.get("epsilon_rel", 1e-3)),
+        nonmonotone_mu=float(nonmono_cfg.get("mu", 0.0)),
+        nonmonotone_delta=float(nonmono_cfg.get("delta", 1.0)),
+        gating_threshold_quantile=float(gating_cfg.get("threshold_quantile", 0.7)),
+    )
+
+
+def n_ratio_product_diagnostics(task: FittedTask) -> int:
+    # Ratio and product invariance/iso-variance diagnostics each run only if the task has such coords.
+    return int(bool(task.diagnostics.ratio_coords)) + int(bool(task.diagnostics.product_coords))
+
+
+def predict_spec_seconds(*, cfg: dict[str, Any], spec: DatasetSpec, cells: list[Cell]) -> float:
+    data_cfg = cfg.get("data", {}) or {}
+    splits_cfg = cfg.get("splits", {}) or {}
+    diag_cfg = cfg.get("diagnostics", {}) or {}
+    inv_cfg = diag_cfg.get("invariance", {}) or {}
+    iso_cfg = diag_cfg.get("iso_variance", {}) or {}
+
+    n = int(spec.n)
+    d_total = int(data_cfg.get("d_total", 120))
+    n_fit = n * (float(splits_cfg.get("train", 0.6)) + float(splits_cfg.get("val", 0.2)))
+    n_test = n * float(splits_cfg.get("test", 0.2))
+    n_diag = min(int(inv_cfg.get("n_diag", 2000)), n_test)
+    m_c = int(inv_cfg.get("m_c", 5))
+    n_base = min(int(iso_cfg.get("n_base", 500)), n_test)
+    m_iso = int(iso_cfg.get("m", 10))
+    n_kinds = n_ratio_product_diagnostics(task_structure(spec.task, cfg))
+
+    if str((data_cfg.get("correlation", {}) or {}).get("sampler", "dense")) == "structured":
+        seconds = _GEN_STRUCTURED_SECONDS_PER_UNIT * n * d_total
+    else:
+        seconds = _GEN_SECONDS_PER_UNIT * n * d_total * d_total
+    for xgb_cfg, _ in cells:
+        params = xgb_cfg.get("params", {}) or {}
+        rounds = int(params.get("n_estimators", 100))
+        depth = int(params.get("max_depth", 6))
+        seconds += _FIT_SECONDS_PER_UNIT * n_fit * d_total * rounds * depth
+        seconds += _ROUND_OVERHEAD_SECONDS * rounds
+        pred_rows = n_test + n_kinds * n_diag * (1 + m_c) + n_kinds * n_base * m_iso
+        seconds += _PREDICT_SECONDS_PER_UNIT * pred_rows * rounds * depth
+        seconds += _PREDICT_CALL_SECONDS * n_kinds * (n_base * m_iso + 1 + m_c)
+    return float(seconds)
+
+
+@dataclass
+class CostModel:
+    # Observed/prior ratios from earlier runs, per task id with a global fallback.
+    task_factors: dict[str, float] = field(default_factory=dict)
+    default_factor: float = 1.0
+
+    @classmethod
+    def from_history(cls, root: str | Path) -> CostModel:
+        ratios: dict[str, list[float]] = {}
+        for manifest in Path(root).rglob(f"{SHARD_DIRNAME}/{MANIFEST_NAME}"):
+            for entry in read_manifest(manifest.parent):
+                observed = entry.get("duration_seconds")
+                predicted = entry.get("prior_seconds")
+                if not observed or not predicted:
+                    continue
+                ratios.setdefault(str(entry.get("task_id")), []).append(float(observed) / float(predicted))
+        if not ratios:
+            return cls()
+        all_ratios = [r for rs in ratios.values() for r in rs]
+        model = cls(
+            task_factors={task: float(np.median(rs)) for task, rs in ratios.items()},
+            default_factor=float(np.median(all_ratios)),
+        )
+        logger.info("Cost model calibrated from %d timed specs under %s", len(all_ratios), root)
+        return model
+
+    def factor(self, spec: DatasetSpec) -> float:
+        return self.task_factors.get(str(spec.task["id"]), self.default_factor)
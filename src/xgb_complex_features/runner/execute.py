@@ -1,23 +1,36 @@
 from __future__ import annotations
 
-import json
 import logging
-from copy import deepcopy
-from datetime import datetime
+import shutil
+from dataclasses import replace
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Any
 from time import perf_counter
 
-import pandas as pd
-from joblib import Parallel, delayed
+from joblib import Parallel, delayed, parallel_config
 
 from xgb_complex_features.config import load_yaml, resolve_output_paths
-from xgb_complex_features.dgp.dataset import OracleMode, build_features, generate_dataset
-from xgb_complex_features.diagnostics.dominance import compute_dominance
-from xgb_complex_features.diagnostics.invariance import compute_all_invariance
-from xgb_complex_features.models.xgb import compute_metrics, predict_proba_positive, train_xgb_classifier
-from xgb_complex_features.runner.grid import DatasetSpec, iter_dataset_specs
-from xgb_complex_features.utils import ensure_dir, make_rng, write_json
+from xgb_complex_features.dgp.stream import streams
+from xgb_complex_features.runner.cache import ResultCache, cell_key
+from xgb_complex_features.runner.cells import Cell, dataset_cache_for, generate_spec_dataset, grid_cells, run_cells
+from xgb_complex_features.runner.cost import CostModel, predict_spec_seconds
+from xgb_complex_features.runner.grid import DatasetSpec, iter_dataset_specs, nested_groups, nested_n_max
+from xgb_complex_features.runner.scheduler import run_cell_scheduler, run_pipeline_scheduler
+from xgb_complex_features.runner.search import halving_settings
+from xgb_complex_features.runner.shards import SHARD_DIRNAME, ShardWriter, read_shards
+from xgb_complex_features.runner.shifts import shift_sweep_table
+from xgb_complex_features.runner.stream import generate_spec_stream, run_stream_cells
+from xgb_complex_features.runner.threads import apply_thread_limits, resolve_thread_budget
+from xgb_complex_features.tracing import (
+    CHROME_TRACE_NAME,
+    TRACE_DIRNAME,
+    configure_tracing,
+    span,
+    trace_context,
+    write_chrome_trace,
+)
+from xgb_complex_features.utils import ensure_dir, write_json
 
 logger = logging.getLogger(__name__)
 
@@ -27,175 +40,385 @@ def _run_one_dataset(
     cfg: dict[str, Any],
     spec: DatasetSpec,
     root_seed: int,
+    cells: list[Cell] | None = None,
+    cache_dir: str | None = None,
+    n_threads: int | None = None,
+    artifacts_dir: str | None = None,
 ) -> list[dict[str, Any]]:
-    data_cfg = cfg.get("data", {}) or {}
-    label_cfg = cfg.get("label", {}) or {}
-    splits_cfg = cfg.get("splits", {}) or {}
-    diagnostics_cfg = cfg.get("diagnostics", {}) or {}
-
-    xgb_configs = cfg.get("xgb_configs", []) or []
-    oracle_modes = cfg.get("oracle_modes", []) or []
-    if not xgb_configs:
-        raise ValueError("Config must include xgb_configs")
-    if not oracle_modes:
-        raise ValueError("Config must include oracle_modes")
-
-    dataset_seed = int(root_seed) + int(spec.seed)
-    ds = generate_dataset(
-        n=spec.n,
-        seed=dataset_seed,
-        task_cfg=spec.task,
-        regime_cfg=spec.regime,
-        data_cfg=data_cfg,
-        label_cfg=label_cfg,
-        splits_cfg=splits_cfg,
+    if cells is None:
+        cells = grid_cells(cfg)
+
+    if streams(cfg.get("data", {}) or {}, spec.n):
+        # Out-of-core: chunks are generated on demand and never held together in memory.
+        stream = generate_spec_stream(cfg=cfg, spec=spec, root_seed=root_seed)
+        return run_stream_cells(
+            ds=stream,
+            cfg=cfg,
+            spec=spec,
+            cells=cells,
+            root_seed=root_seed,
+            cache_dir=cache_dir,
+            n_threads=n_threads,
+            artifacts_dir=artifacts_dir,
+        )
+    ds = generate_spec_dataset(cfg=cfg, spec=spec, root_seed=root_seed)
+    return run_cells(
+        ds=ds,
+        cfg=cfg,
+        spec=spec,
+        cells=cells,
+        root_seed=root_seed,
+        cache_dir=cache_dir,
+        n_threads=n_threads,
+        artifacts_dir=artifacts_dir,
     )
 
-    rows: list[dict[str, Any]] = []
-    for xgb_cfg in xgb_configs:
-        xgb_config_id = str(xgb_cfg["id"])
-        params = deepcopy(xgb_cfg.get("params", {}) or {})
-
-        for oracle_mode in oracle_modes:
-            oracle_mode = str(oracle_mode)
-            if oracle_mode not in {"raw_only", "oracle_s_only", "oracle_coords_only", "oracle_all"}:
-                raise ValueError(f"Unknown oracle_mode: {oracle_mode}")
-            oracle_mode_t: OracleMode = oracle_mode  # type: ignore[assignment]
-
-            x, _ = build_features(ds, oracle_mode=oracle_mode_t)
-            tr, va, te = ds.splits.train, ds.splits.val, ds.splits.test
-            x_train, y_train = x[tr], ds.y[tr]
-            x_val, y_val = x[va], ds.y[va]
-            x_test, y_test = x[te], ds.y[te]
-
-            model_seed = int(
-                make_rng(
-                    root_seed,
-                    spec.seed,
-                    spec.task["id"],
-                    spec.regime["id"],
-                    spec.n,
-                    oracle_mode,
-                    xgb_config_id,
-                    "model_seed",
-                ).integers(0, 2**31 - 1)
-            )
-            fit = train_xgb_classifier(
-                x_train=x_train,
-                y_train=y_train,
-                x_val=x_val,
-                y_val=y_val,
-                params=params,
-                seed=model_seed,
-            )
 
-            p_test = predict_proba_positive(fit.model, x_test)
-            metrics = compute_metrics(y_test, p_test)
-
-            rng_diag = make_rng(
-                root_seed,
-                spec.seed,
-                spec.task["id"],
-                spec.regime["id"],
-                spec.n,
-                oracle_mode,
-                xgb_config_id,
-                "diag",
-            )
-            invariance = compute_all_invariance(
-                model=fit.model,
-                oracle_mode=oracle_mode_t,
-                task=ds.task,
-                x_test_raw=ds.x_raw[te],
-                rng=rng_diag,
-                cfg=diagnostics_cfg,
+def _run_nested_group(
+    *,
+    group: list[tuple[int, list[Cell]]],
+    cfg: dict[str, Any],
+    specs: list[DatasetSpec],
+    root_seed: int,
+    cache_dir: str | None,
+    n_threads: int | None,
+    trace_dir: str | None = None,
+    artifacts_dir: str | None = None,
+) -> tuple[list[tuple[int, list[dict[str, Any]], float]], dict[str, Any]]:
+    # All n of one (task, regime, seed) in sample_complexity: nested: one dataset at the largest n,
+    # then each spec trains on its nested subset of it.
+    worker = apply_thread_limits(n_threads)
+    configure_tracing(trace_dir)
+    first = specs[group[0][0]]
+    start = perf_counter()
+    with trace_context(spec_id=first.spec_id):
+        base = generate_spec_dataset(
+            cfg=cfg, spec=replace(first, n=nested_n_max(cfg)), root_seed=root_seed  # type: ignore[arg-type]
+        )
+    # Generation is shared by the group; split its time evenly across the specs.
+    base.metadata["generate_seconds"] /= len(group)
+    shared_seconds = (perf_counter() - start) / len(group)
+
+    results = []
+    for spec_idx, cells in group:
+        spec = specs[spec_idx]
+        start = perf_counter()
+        with trace_context(spec_id=spec.spec_id), span("run_spec"):
+            ds = generate_spec_dataset(cfg=cfg, spec=spec, root_seed=root_seed, base=base)
+            rows = run_cells(
+                ds=ds,
+                cfg=cfg,
+                spec=spec,
+                cells=cells,
+                root_seed=root_seed,
+                cache_dir=cache_dir,
+                n_threads=n_threads,
+                artifacts_dir=artifacts_dir,
             )
+        results.append((spec_idx, rows, shared_seconds + perf_counter() - start))
+    return results, worker
+
+
+def _lookup_cached_rows(
+    *,
+    cache: ResultCache | None,
+    cfg: dict[str, Any],
+    spec: DatasetSpec,
+    cells: list[Cell],
+    root_seed: int,
+) -> list[dict[str, Any] | None]:
+    if cache is None:
+        return [None] * len(cells)
+    return [
+        cache.get(cell_key(cfg=cfg, spec=spec, xgb_cfg=xgb_cfg, oracle_mode=oracle_mode, root_seed=root_seed))
+        for xgb_cfg, oracle_mode in cells
+    ]
+
+
+def _run_pending(
+    *,
+    spec_idx: int,
+    cfg: dict[str, Any],
+    spec: DatasetSpec,
+    root_seed: int,
+    cells: list[Cell],
+    cache_dir: str | None,
+    n_threads: int | None,
+    trace_dir: str | None = None,
+    artifacts_dir: str | None = None,
+) -> tuple[int, list[dict[str, Any]], float, dict[str, Any]]:
+    worker = apply_thread_limits(n_threads)
+    configure_tracing(trace_dir)
+    start = perf_counter()
+    with trace_context(spec_id=spec.spec_id), span("run_spec"):
+        rows = _run_one_dataset(
+            cfg=cfg,
+            spec=spec,
+            root_seed=root_seed,
+            cells=cells,
+            cache_dir=cache_dir,
+            n_threads=n_threads,
+            artifacts_dir=artifacts_dir,
+        )
+    return spec_idx, rows, perf_counter() - start, worker
+
 
-            dom_train = compute_dominance(x_raw=ds.x_raw, idx=tr, sum_groups=ds.task.diagnostics.sum_groups)
-            dom_test = compute_dominance(x_raw=ds.x_raw, idx=te, sum_groups=ds.task.diagnostics.sum_groups)
-
-            row: dict[str, Any] = {
-                "task_id": ds.metadata["task_id"],
-                "level": ds.metadata["task_level"],
-                "task_kind": ds.metadata["task_kind"],
-                "regime_id": ds.metadata["regime_id"],
-                "regime_family": ds.metadata["regime_family"],
-                "seed": int(spec.seed),
-                "n": int(spec.n),
-                "oracle_mode": oracle_mode,
-                "model_variant": "raw" if oracle_mode == "raw_only" else "oracle",
-                "xgb_config_id": xgb_config_id,
-                "best_iteration": fit.best_iteration,
-                "best_score": fit.best_score,
-                **metrics,
-                **invariance,
-                "prevalence_train": ds.metadata["prevalence_train"],
-                "prevalence_val": ds.metadata["prevalence_val"],
-                "prevalence_test": ds.metadata["prevalence_test"],
-                "sigma": ds.metadata.get("sigma"),
-                "rho": ds.metadata.get("rho"),
-                "mixture_json": json.dumps(ds.metadata.get("mixture"), sort_keys=True)
-                if ds.metadata.get("mixture") is not None
-                else None,
-                "shift_type": ds.metadata.get("shift_type"),
-                "shift_cols_json": json.dumps(ds.metadata.get("shift_cols"), sort_keys=True)
-                if ds.metadata.get("shift_cols") is not None
-                else None,
-                "dominance_train_mean": dom_train["dominance_mean"],
-                "dominance_train_median": dom_train["dominance_median"],
-                "dominance_train_p90": dom_train["dominance_p90"],
-                "dominance_test_mean": dom_test["dominance_mean"],
-                "dominance_test_median": dom_test["dominance_median"],
-                "dominance_test_p90": dom_test["dominance_p90"],
-                "dominance_train_groups_json": dom_train["dominance_groups_json"],
-                "dominance_test_groups_json": dom_test["dominance_groups_json"],
-            }
-            rows.append(row)
-
-    return rows
-
-
-def run_experiment(*, config_path: str) -> Path:
+def run_experiment(*, config_path: str | None = None, resume_dir: str | None = None) -> Path:
     start_wall = datetime.now()
     start_perf = perf_counter()
 
+    if resume_dir is not None:
+        run_dir = Path(resume_dir).resolve()
+        config_path = str(run_dir / "config_source.yaml")
+        if not Path(config_path).exists():
+            raise FileNotFoundError(f"Cannot resume {run_dir}: missing config_source.yaml")
+    elif config_path is None:
+        raise ValueError("run_experiment requires config_path or resume_dir")
+
     cfg = load_yaml(config_path)
     exp = cfg.get("experiment", {}) or {}
     root_seed = int(exp.get("root_seed", 0))
 
     paths = resolve_output_paths(cfg, config_path=config_path)
     base_dir = paths.base_dir
+    # Read timings of earlier runs before an overwritten run directory is cleared.
+    cost_model = CostModel.from_history(base_dir)
 
-    run_dir = base_dir
-    if run_dir.exists() and not paths.overwrite:
-        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        run_dir = base_dir / stamp
-    ensure_dir(run_dir)
+    if resume_dir is None:
+        run_dir = base_dir
+        if run_dir.exists() and not paths.overwrite:
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            run_dir = base_dir / stamp
+        ensure_dir(run_dir)
+        # Shards (and spans) from an earlier run in an overwritten directory must not leak into this one.
+        shutil.rmtree(run_dir / SHARD_DIRNAME, ignore_errors=True)
+        shutil.rmtree(run_dir / TRACE_DIRNAME, ignore_errors=True)
+        (run_dir / CHROME_TRACE_NAME).unlink(missing_ok=True)
 
-    # Persist resolved config alongside outputs.
-    write_json(run_dir / "config_resolved.json", cfg)
-    (run_dir / "config_source.yaml").write_text(Path(config_path).read_text(encoding="utf-8"), encoding="utf-8")
+        # Persist resolved config alongside outputs.
+        write_json(run_dir / "config_resolved.json", cfg)
+        (run_dir / "config_source.yaml").write_text(Path(config_path).read_text(encoding="utf-8"), encoding="utf-8")
 
     runner_cfg = cfg.get("runner", {}) or {}
-    n_jobs = int(runner_cfg.get("n_jobs", 1))
+    budget = resolve_thread_budget(runner_cfg)
+    n_jobs = budget.n_jobs if budget is not None else int(runner_cfg.get("n_jobs", 1))
     if n_jobs == 0:
         n_jobs = 1
+    n_threads = budget.threads_per_job if budget is not None else None
+    if budget is not None:
+        logger.info(
+            "Thread budget: %d jobs x %d threads (total_threads=%d)",
+            budget.n_jobs,
+            budget.threads_per_job,
+            budget.total_threads,
+        )
+    scheduler = str(runner_cfg.get("scheduler", "dataset"))
+    if scheduler not in {"dataset", "cells", "pipeline"}:
+        raise ValueError(f"Unknown runner.scheduler: {scheduler}")
+    if scheduler == "cells" and halving_settings(cfg) is not None:
+        # A halving search needs every config of a dataset in the same worker.
+        raise ValueError("runner.config_search: successive_halving requires scheduler dataset or pipeline")
+    if runner_cfg.get("scratch_dir"):
+        scratch_dir = Path(runner_cfg["scratch_dir"])
+    elif scheduler == "pipeline" and Path("/dev/shm").is_dir():
+        # Pipelined datasets are handed over through shared memory (tmpfs), not the run disk.
+        scratch_dir = Path("/dev/shm")
+    else:
+        scratch_dir = run_dir / "scratch"
+    # Opt-in span tracing: every process appends to its own JSONL file under <run_dir>/trace.
+    trace_dir = str(run_dir / TRACE_DIRNAME) if bool(runner_cfg.get("trace", False)) else None
+    configure_tracing(trace_dir)
 
     specs = list(iter_dataset_specs(cfg))
-    logger.info("Running %d dataset specs (n_jobs=%d) into %s", len(specs), n_jobs, run_dir)
+    cells = grid_cells(cfg)
+    if scheduler != "dataset" and any(streams(cfg.get("data", {}) or {}, spec.n) for spec in specs):
+        # The cells/pipeline schedulers hand whole datasets between processes.
+        raise ValueError("data.stream requires runner.scheduler: dataset")
+    if nested_n_max(cfg) is not None and any(streams(cfg.get("data", {}) or {}, spec.n) for spec in specs):
+        raise ValueError("sample_complexity: nested cannot be combined with data.stream")
 
-    if n_jobs == 1:
-        all_rows: list[dict[str, Any]] = []
-        for i, spec in enumerate(specs, start=1):
-            logger.info("Dataset %d/%d: task=%s regime=%s n=%d seed=%d", i, len(specs), spec.task["id"], spec.regime["id"], spec.n, spec.seed)
-            all_rows.extend(_run_one_dataset(cfg=cfg, spec=spec, root_seed=root_seed))
-    else:
-        results = Parallel(n_jobs=n_jobs, backend="loky")(
-            delayed(_run_one_dataset)(cfg=cfg, spec=spec, root_seed=root_seed) for spec in specs
+    shards = ShardWriter(run_dir)
+    finished = shards.finished() if resume_dir is not None else {}
+    todo = [i for i, spec in enumerate(specs) if spec.spec_id not in finished]
+    if resume_dir is not None:
+        logger.info("Resuming %s: %d/%d dataset specs already finished", run_dir, len(specs) - len(todo), len(specs))
+
+    # Rows already in the result cache are reused; only specs with missing cells are dispatched.
+    cache = ResultCache(paths.cache_dir) if paths.cache_dir is not None else None
+    cache_dir = str(paths.cache_dir) if paths.cache_dir is not None else None
+    artifacts_dir = str(paths.artifacts_dir) if paths.artifacts_dir is not None else None
+    dataset_cache = dataset_cache_for(cfg)
+    spec_rows = {
+        i: _lookup_cached_rows(cache=cache, cfg=cfg, spec=specs[i], cells=cells, root_seed=root_seed) for i in todo
+    }
+    n_cached_cells = sum(row is not None for rows in spec_rows.values() for row in rows)
+    if cache is not None:
+        logger.info("Result cache %s: %d/%d cells cached", paths.cache_dir, n_cached_cells, len(todo) * len(cells))
+
+    pending: list[tuple[int, list[Cell]]] = []
+    for i in todo:
+        missing = [cell for cell, row in zip(cells, spec_rows[i]) if row is None]
+        if missing:
+            pending.append((i, missing))
+        else:
+            shards.write(specs[i].spec_id, spec_rows.pop(i), duration_seconds=None)  # type: ignore[arg-type]
+
+    # Predicted runtimes drive longest-first submission (fewer stragglers) and the ETA.
+    prior_seconds = {i: predict_spec_seconds(cfg=cfg, spec=specs[i], cells=c) for i, c in pending}
+    predicted = {i: cost_model.factor(specs[i]) * prior_seconds[i] for i, _ in pending}
+    order = str(runner_cfg.get("order", "longest_first"))
+    if order == "longest_first":
+        pending.sort(key=lambda p: predicted[p[0]], reverse=True)
+    elif order == "shared_data":
+        # Specs that can share generated data (data.common_random_numbers) back to back.
+        def _data_key(p: tuple[int, list[Cell]]) -> tuple[int, int, str, str]:
+            spec = specs[p[0]]
+            return spec.n, spec.seed, str(spec.regime.get("rho")), str(spec.regime["id"])
+
+        pending.sort(key=_data_key)
+    elif order != "grid":
+        raise ValueError(f"Unknown runner.order: {order}")
+
+    logger.info(
+        "Running %d/%d dataset specs (n_jobs=%d, scheduler=%s, predicted work %s) into %s",
+        len(pending),
+        len(specs),
+        n_jobs,
+        scheduler,
+        timedelta(seconds=round(sum(predicted.values()))),
+        run_dir,
+    )
+    run_start = perf_counter()
+    n_done = 0
+    predicted_done = 0.0
+    workers: dict[int, dict[str, Any]] = {}
+
+    def _finish(spec_idx: int, new_rows: list[dict[str, Any]], seconds: float) -> None:
+        nonlocal n_done, predicted_done
+        fresh = iter(new_rows)
+        rows = [row if row is not None else next(fresh) for row in spec_rows.pop(spec_idx)]
+        spec = specs[spec_idx]
+        shards.write(
+            spec.spec_id,
+            rows,
+            duration_seconds=seconds,
+            extra={"task_id": str(spec.task["id"]), "prior_seconds": prior_seconds[spec_idx]},
+        )
+        n_done += 1
+        predicted_done += predicted[spec_idx]
+        # Remaining predicted work at the throughput observed so far.
+        remaining = sum(predicted.values()) - predicted_done
+        eta = remaining * (perf_counter() - run_start) / max(predicted_done, 1e-9)
+        logger.info(
+            "Finished dataset %d/%d: %s (%.1fs, predicted %.1fs); ETA %s",
+            n_done,
+            len(pending),
+            spec.spec_id,
+            seconds,
+            predicted[spec_idx],
+            timedelta(seconds=round(eta)),
+        )
+
+    if nested_n_max(cfg) is not None and scheduler == "dataset":
+        # One task per (task, regime, seed) group, so the dataset at the largest n is generated once.
+        groups = nested_groups(pending, specs)
+        group_kwargs = dict(
+            cfg=cfg,
+            specs=specs,
+            root_seed=root_seed,
+            cache_dir=cache_dir,
+            n_threads=n_threads,
+            trace_dir=trace_dir,
+            artifacts_dir=artifacts_dir,
         )
-        all_rows = [row for part in results for row in part]
+        if n_jobs == 1:
+            group_results = (_run_nested_group(group=group, **group_kwargs) for group in groups)
+            for results, worker in group_results:
+                workers[worker["pid"]] = worker
+                for spec_idx, new_rows, seconds in results:
+                    _finish(spec_idx, new_rows, seconds)
+        else:
+            with parallel_config(backend="loky", inner_max_num_threads=n_threads):
+                parallel_results = Parallel(n_jobs=n_jobs, return_as="generator_unordered")(
+                    delayed(_run_nested_group)(group=group, **group_kwargs) for group in groups
+                )
+                for results, worker in parallel_results:
+                    workers[worker["pid"]] = worker
+                    for spec_idx, new_rows, seconds in results:
+                        _finish(spec_idx, new_rows, seconds)
+    elif n_jobs == 1 and scheduler != "pipeline":
+        for i, (spec_idx, spec_cells) in enumerate(pending, start=1):
+            spec = specs[spec_idx]
+            logger.info("Dataset %d/%d: task=%s regime=%s n=%d seed=%d", i, len(pending), spec.task["id"], spec.regime["id"], spec.n, spec.seed)
+            _, new_rows, seconds, worker = _run_pending(
+                spec_idx=spec_idx,
+                cfg=cfg,
+                spec=spec,
+                root_seed=root_seed,
+                cells=spec_cells,
+                cache_dir=cache_dir,
+                n_threads=n_threads,
+                trace_dir=trace_dir,
+                artifacts_dir=artifacts_dir,
+            )
+            workers[worker["pid"]] = worker
+            _finish(spec_idx, new_rows, seconds)
+    elif scheduler == "cells":
+        # Each dataset is generated once, then its (xgb_config, oracle_mode) cells run as separate tasks.
+        run_cell_scheduler(
+            cfg=cfg,
+            specs=specs,
+            pending=pending,
+            root_seed=root_seed,
+            n_jobs=n_jobs,
+            cache_dir=cache_dir,
+            scratch_dir=scratch_dir,
+            n_threads=n_threads,
+            trace_dir=trace_dir,
+            artifacts_dir=artifacts_dir,
+            workers=workers,
+            on_spec_done=_finish,
+        )
+    elif scheduler == "pipeline":
+        # Producers generate upcoming datasets while consumers train on ones already generated.
+        run_pipeline_scheduler(
+            cfg=cfg,
+            specs=specs,
+            pending=pending,
+            root_seed=root_seed,
+            n_jobs=n_jobs,
+            n_producers=int(runner_cfg.get("producers", 1)),
+            prefetch=int(runner_cfg["prefetch"]) if runner_cfg.get("prefetch") is not None else None,
+            cache_dir=cache_dir,
+            scratch_dir=scratch_dir,
+            n_threads=n_threads,
+            trace_dir=trace_dir,
+            artifacts_dir=artifacts_dir,
+            workers=workers,
+            on_spec_done=_finish,
+        )
+    else:
+        # Unordered generator: each finished spec is sharded immediately instead of after the whole grid.
+        with parallel_config(backend="loky", inner_max_num_threads=n_threads):
+            results = Parallel(n_jobs=n_jobs, return_as="generator_unordered")(
+                delayed(_run_pending)(
+                    spec_idx=spec_idx,
+                    cfg=cfg,
+                    spec=specs[spec_idx],
+                    root_seed=root_seed,
+                    cells=spec_cells,
+                    cache_dir=cache_dir,
+                    n_threads=n_threads,
+                    trace_dir=trace_dir,
+                    artifacts_dir=artifacts_dir,
+                )
+                for spec_idx, spec_cells in pending
+            )
+            for spec_idx, new_rows, seconds, worker in results:
+                workers[worker["pid"]] = worker
+                _finish(spec_idx, new_rows, seconds)
 
-    df = pd.DataFrame(all_rows)
+    df = read_shards(shards.shard_dir, [spec.spec_id for spec in specs])
     if df.empty:
         raise RuntimeError("No results produced.")
 
@@ -204,8 +427,17 @@ def run_experiment(*, config_path: str) -> Path:
         df.to_parquet(run_dir / "results.parquet", index=False)
     if "csv" in out_formats:
         df.to_csv(run_dir / "results.csv", index=False)
+    if "shift_sweep_json" in df.columns and df["shift_sweep_json"].notna().any():
+        # The sweep in long form (one row per model and shift) next to the results.
+        sweep = shift_sweep_table(df)
+        if "parquet" in out_formats:
+            sweep.to_parquet(run_dir / "shift_sweep.parquet", index=False)
+        if "csv" in out_formats:
+            sweep.to_csv(run_dir / "shift_sweep.csv", index=False)
 
     logger.info("Wrote %d rows", len(df))
+    if trace_dir is not None:
+        logger.info("Wrote Chrome trace to %s", write_chrome_trace(trace_dir))
 
     end_wall = datetime.now()
     duration = perf_counter() - start_perf
@@ -221,6 +453,19 @@ def run_experiment(*, config_path: str) -> Path:
         "n_regimes": len(cfg.get("regimes", [])),
         "n_oracle_modes": len(cfg.get("oracle_modes", []) or []),
         "n_jobs": n_jobs,
+        "scheduler": scheduler,
+        "order": order,
+        "predicted_seconds": sum(predicted.values()),
+        "threads_per_job": n_threads,
+        "total_threads": budget.total_threads if budget is not None else None,
+        "workers": sorted(workers.values(), key=lambda w: w["pid"]),
+        "cache_dir": cache_dir,
+        "artifacts_dir": artifacts_dir,
+        "dataset_cache_dir": str(dataset_cache.root) if dataset_cache is not None else None,
+        "n_cached_cells": n_cached_cells,
+        "resumed": resume_dir is not None,
+        "n_resumed_specs": len(specs) - len(todo),
+        "trace_dir": trace_dir,
     }
     write_json(run_dir / "run_metadata.json", run_meta)
     return run_dir
@@ -11,6 +11,10 @@ class DatasetSpec:
     seed: int
     n: int
 
+    @property
+    def spec_id(self) -> str:
+        return f"{self.task['id']}__{self.regime['id']}__n{self.n}__seed{self.seed}"
+
 
 def iter_dataset_specs(cfg: dict[str, Any]) -> Iterator[DatasetSpec]:
     tasks = cfg.get("tasks", [])
@@ -32,3 +36,23 @@ def iter_dataset_specs(cfg: dict[str, Any]) -> Iterator[DatasetSpec]:
             for n in n_values:
                 for seed in seeds:
                     yield DatasetSpec(task=task, regime=regime, seed=int(seed), n=int(n))
+
+
+def nested_n_max(cfg: dict[str, Any]) -> int | None:
+    # sample_complexity: nested derives every n from one dataset generated at the largest n.
+    mode = str(cfg.get("sample_complexity", "independent"))
+    if mode not in {"independent", "nested"}:
+        raise ValueError(f"Unknown sample_complexity: {mode}")
+    if mode == "independent":
+        return None
+    return max(int(n) for n in cfg.get("n_values", []))
+
+
+def nested_groups(pending: list[tuple[int, Any]], specs: list[DatasetSpec]) -> list[list[tuple[int, Any]]]:
+    # (spec index, cells) grouped by (task, regime, seed): the specs sharing one nested base dataset.
+    # Keeps the order of `pending` (longest first) by each group's first member.
+    groups: dict[tuple[str, str, int], list[tuple[int, Any]]] = {}
+    for spec_idx, cells in pending:
+        spec = specs[spec_idx]
+        groups.setdefault((str(spec.task["id"]), str(spec.regime["id"]), spec.seed), []).append((spec_idx, cells))
+    return list(groups.values())
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+from joblib import Parallel, delayed
+
+from xgb_complex_features.config import load_yaml, resolve_output_paths
+from xgb_complex_features.dgp.stream import streams
+from xgb_complex_features.diagnostics.invariance import compute_all_invariance
+from xgb_complex_features.runner.artifacts import ArtifactStore
+from xgb_complex_features.runner.cache import model_key
+from xgb_complex_features.runner.cells import Cell, _cell_rng, _test_metrics, generate_spec_dataset, grid_cells
+from xgb_complex_features.runner.grid import DatasetSpec, iter_dataset_specs
+from xgb_complex_features.runner.stream import generate_spec_stream
+
+logger = logging.getLogger(__name__)
+
+_ROW_KEY = ["task_id", "regime_id", "n", "seed", "xgb_config_id", "oracle_mode"]
+
+
+def _load_run(run_dir: Path, config_path: str | None) -> tuple[dict[str, Any], str, pd.DataFrame]:
+    config_path = config_path or str(run_dir / "config_source.yaml")
+    cfg = load_yaml(config_path)
+    if (run_dir / "results.parquet").exists():
+        df = pd.read_parquet(run_dir / "results.parquet")
+    elif (run_dir / "results.csv").exists():
+        df = pd.read_csv(run_dir / "results.csv")
+    else:
+        raise FileNotFoundError(f"No results.parquet/results.csv in {run_dir}")
+    return cfg, config_path, df
+
+
+def _write_results(df: pd.DataFrame, run_dir: Path, formats: list[str]) -> None:
+    out_formats = set(formats)
+    if "parquet" in out_formats:
+        df.to_parquet(run_dir / "results.parquet", index=False)
+    if "csv" in out_formats:
+        df.to_csv(run_dir / "results.csv", index=False)
+
+
+def _row_index(df: pd.DataFrame) -> dict[tuple[Any, ...], int]:
+    keys = zip(*(df[col].tolist() for col in _ROW_KEY))
+    return {(str(t), str(r), int(n), int(s), str(c), str(m)): i for i, (t, r, n, s, c, m) in enumerate(keys)}
+
+
+def _cell_row_key(spec: DatasetSpec, xgb_cfg: dict[str, Any], oracle_mode: str) -> tuple[Any, ...]:
+    return (str(spec.task["id"]), str(spec.regime["id"]), int(spec.n), int(spec.seed), str(xgb_cfg["id"]), oracle_mode)
+
+
+def _stored_cells(
+    *,
+    cfg: dict[str, Any],
+    root_seed: int,
+    store: ArtifactStore,
+    df: pd.DataFrame,
+) -> list[tuple[DatasetSpec, list[tuple[int, Cell, str]]]]:
+    # (spec, [(results row, cell, model key)]) for every row whose model is in the store.
+    index = _row_index(df)
+    cells = grid_cells(cfg)
+    out = []
+    n_missing = 0
+    for spec in iter_dataset_specs(cfg):
+        found = []
+        for xgb_cfg, oracle_mode in cells:
+            row = index.get(_cell_row_key(spec, xgb_cfg, oracle_mode))
+            if row is None:
+                continue
+            key = model_key(cfg=cfg, spec=spec, xgb_cfg=xgb_cfg, oracle_mode=oracle_mode, root_seed=root_seed)
+            if store.contains(key):
+                found.append((row, (xgb_cfg, oracle_mode), key))
+            else:
+                n_missing += 1
+        if found:
+            out.append((spec, found))
+    if n_missing:
+        logger.warning("%d results rows have no stored artifacts; keeping their old values", n_missing)
+    return out
+
+
+def _rediagnose_spec(
+    *,
+    cfg: dict[str, Any],
+    spec: DatasetSpec,
+    found: list[tuple[int, Cell, str]],
+    root_seed: int,
+    artifacts_dir: str,
+) -> list[tuple[int, dict[str, Any]]]:
+    # Regenerating is deterministic per spec, so the test rows are the ones the model was scored on.
+    store = ArtifactStore(artifacts_dir)
+    data_cfg = cfg.get("data", {}) or {}
+    if streams(data_cfg, spec.n):
+        # Streamed specs ran diagnostics on the first sample_rows test rows; regenerate just those.
+        stream = generate_spec_stream(cfg=cfg, spec=spec, root_seed=root_seed)
+        task = stream.task
+        x_test_raw = stream.sample("test", stream.settings.sample_rows)
+    else:
+        ds = generate_spec_dataset(cfg=cfg, spec=spec, root_seed=root_seed)
+        task = ds.task
+        x_test_raw = ds.x_raw[ds.splits.test]
+    updates = []
+    for row, (xgb_cfg, oracle_mode), key in found:
+        # Same stream as the online diagnostics (run_cell).
+        rng_diag = _cell_rng(
+            spec=spec, oracle_mode=oracle_mode, xgb_config_id=str(xgb_cfg["id"]), root_seed=root_seed, stream="diag"
+        )
+        timings: dict[str, float] = {}
+        invariance = compute_all_invariance(
+            model=store.load_model(key),
+            oracle_mode=oracle_mode,  # type: ignore[arg-type]
+            task=task,
+            x_test_raw=x_test_raw,
+            rng=rng_diag,
+            cfg=cfg.get("diagnostics", {}) or {},
+            timings=timings,
+        )
+        updates.append((row, {**invariance, **{f"time_{name}_seconds": s for name, s in timings.items()}}))
+    return updates
+
+
+def _apply_updates(df: pd.DataFrame, updates: list[tuple[int, dict[str, Any]]]) -> pd.DataFrame:
+    df = df.copy()
+    for row, values in updates:
+        for col, value in values.items():
+            if col not in df.columns:
+                df[col] = None
+            df.at[df.index[row], col] = value
+    return df
+
+
+def rediagnose_run(*, run_dir: str, config_path: str | None = None, n_jobs: int | None = None) -> Path:
+    run_path = Path(run_dir).resolve()
+    cfg, config_path, df = _load_run(run_path, config_path)
+    paths = resolve_output_paths(cfg, config_path=config_path)
+    if paths.artifacts_dir is None:
+        raise ValueError("rediagnose needs output.artifacts_dir in the config")
+    root_seed = int((cfg.get("experiment", {}) or {}).get("root_seed", 0))
+    store = ArtifactStore(paths.artifacts_dir)
+    todo = _stored_cells(cfg=cfg, root_seed=root_seed, store=store, df=df)
+    if n_jobs is None:
+        n_jobs = int((cfg.get("runner", {}) or {}).get("n_jobs", 1)) or 1
+
+    logger.info("Re-running diagnostics for %d cells over %d datasets", sum(len(f) for _, f in todo), len(todo))
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_rediagnose_spec)(
+            cfg=cfg, spec=spec, found=found, root_seed=root_seed, artifacts_dir=str(paths.artifacts_dir)
+        )
+        for spec, found in todo
+    )
+    df = _apply_updates(df, [update for spec_updates in results for update in spec_updates])
+    _write_results(df, run_path, paths.formats)
+    return run_path
+
+
+def _remetric_spec(
+    *,
+    cfg: dict[str, Any],
+    spec: DatasetSpec,
+    found: list[tuple[int, Cell, str]],
+    root_seed: int,
+    artifacts_dir: str,
+) -> list[tuple[int, dict[str, Any]]]:
+    # Metrics only need the stored test predictions: no data generation, no model.
+    store = ArtifactStore(artifacts_dir)
+    updates = []
+    for row, (xgb_cfg, oracle_mode), key in found:
+        p_test, y_test = store.load_predictions(key)
+        metrics = _test_metrics(
+            cfg=cfg,
+            spec=spec,
+            oracle_mode=oracle_mode,
+            xgb_config_id=str(xgb_cfg["id"]),
+            root_seed=root_seed,
+            y_test=y_test,
+            p_test=p_test,
+        )
+        updates.append((row, metrics))
+    return updates
+
+
+def remetric_run(*, run_dir: str, config_path: str | None = None, n_jobs: int | None = None) -> Path:
+    run_path = Path(run_dir).resolve()
+    cfg, config_path, df = _load_run(run_path, config_path)
+    paths = resolve_output_paths(cfg, config_path=config_path)
+    if paths.artifacts_dir is None:
+        raise ValueError("remetric needs output.artifacts_dir in the config")
+    root_seed = int((cfg.get("experiment", {}) or {}).get("root_seed", 0))
+    store = ArtifactStore(paths.artifacts_dir)
+    todo = _stored_cells(cfg=cfg, root_seed=root_seed, store=store, df=df)
+    if n_jobs is None:
+        n_jobs = int((cfg.get("runner", {}) or {}).get("n_jobs", 1)) or 1
+
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_remetric_spec)(
+            cfg=cfg, spec=spec, found=found, root_seed=root_seed, artifacts_dir=str(paths.artifacts_dir)
+        )
+        for spec, found in todo
+    )
+    updates = [update for spec_updates in results for update in spec_updates]
+    logger.info("Recomputed metrics for %d cells", len(updates))
+    df = _apply_updates(df, updates)
+    _write_results(df, run_path, paths.formats)
+    return run_path
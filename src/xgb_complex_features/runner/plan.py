@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import os
+from datetime import timedelta
+from pathlib import Path
+from typing import Any
+
+from xgb_complex_features.config import load_yaml, resolve_output_paths
+from xgb_complex_features.runner.cells import grid_cells
+from xgb_complex_features.runner.cost import CostModel, n_ratio_product_diagnostics, predict_spec_seconds, task_structure
+from xgb_complex_features.runner.grid import iter_dataset_specs
+from xgb_complex_features.runner.threads import available_cpus
+from xgb_complex_features.utils import write_json
+
+# Peak bytes per (row x d_total) entry in one worker: float64 latent/base/concat copies during
+# generation, then float32 x_raw + feature/split copies + the float64 copy made by dominance.
+_BYTES_PER_ENTRY = 32
+_WORKER_BASE_BYTES = 300 * 1024**2
+_MEMORY_HEADROOM = 0.8
+
+
+def _n_test(n: int, splits_cfg: dict[str, Any]) -> int:
+    # Mirrors dgp.dataset._split_indices without drawing the permutation.
+    n_train = min(max(int(round(float(splits_cfg.get("train", 0.6)) * n)), 1), n - 2)
+    n_val = min(max(int(round(float(splits_cfg.get("val", 0.2)) * n)), 1), n - n_train - 1)
+    return n - n_train - n_val
+
+
+def _available_memory_bytes() -> int | None:
+    try:
+        return int(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_AVPHYS_PAGES"))
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def plan_experiment(*, config_path: str) -> dict[str, Any]:
+    cfg = load_yaml(config_path)
+    specs = list(iter_dataset_specs(cfg))
+    cells = grid_cells(cfg)
+    paths = resolve_output_paths(cfg, config_path=config_path)
+
+    data_cfg = cfg.get("data", {}) or {}
+    splits_cfg = cfg.get("splits", {}) or {}
+    diag_cfg = cfg.get("diagnostics", {}) or {}
+    inv_cfg = diag_cfg.get("invariance", {}) or {}
+    iso_cfg = diag_cfg.get("iso_variance", {}) or {}
+    d_total = int(data_cfg.get("d_total", 120))
+    m_c = int(inv_cfg.get("m_c", 5))
+    m_iso = int(iso_cfg.get("m", 10))
+
+    structures = {str(t["id"]): task_structure(t, cfg) for t in cfg.get("tasks", [])}
+    cost_model = CostModel.from_history(paths.base_dir)
+
+    predict_calls = 0
+    predict_rows = 0
+    predicted_seconds = []
+    for spec in specs:
+        n_test = _n_test(int(spec.n), splits_cfg)
+        n_diag = min(int(inv_cfg.get("n_diag", 2000)), n_test)
+        n_base = min(int(iso_cfg.get("n_base", 500)), n_test)
+        n_kinds = n_ratio_product_diagnostics(structures[str(spec.task["id"])])
+        # Per cell: one test predict, (1 + m_c) batched invariance predicts and n_base * m
+        # single-row iso-variance predicts for each of the ratio/product diagnostics.
+        calls = 1 + n_kinds * ((1 + m_c) + n_base * m_iso)
+        rows = n_test + n_kinds * (n_diag * (1 + m_c) + n_base * m_iso)
+        predict_calls += calls * len(cells)
+        predict_rows += rows * len(cells)
+        predicted_seconds.append(cost_model.factor(spec) * predict_spec_seconds(cfg=cfg, spec=spec, cells=cells))
+
+    n_max = max(spec.n for spec in specs)
+    peak_worker_bytes = _WORKER_BASE_BYTES + _BYTES_PER_ENTRY * n_max * d_total
+    cpus = available_cpus()
+    mem = _available_memory_bytes()
+    jobs_by_mem = max(int(_MEMORY_HEADROOM * mem // peak_worker_bytes), 1) if mem is not None else cpus
+    # The cells scheduler can spread one spec over several workers; the dataset scheduler cannot.
+    runner_cfg = cfg.get("runner", {}) or {}
+    units = len(specs) * len(cells) if str(runner_cfg.get("scheduler", "dataset")) == "cells" else len(specs)
+    n_jobs = max(min(cpus, jobs_by_mem, units), 1)
+    threads_per_job = max(cpus // n_jobs, 1)
+    total_seconds = float(sum(predicted_seconds))
+
+    return {
+        "config_path": str(Path(config_path).resolve()),
+        "n_dataset_specs": len(specs),
+        "n_cells_per_spec": len(cells),
+        "n_model_fits": len(specs) * len(cells),
+        "n_predict_calls": predict_calls,
+        "n_predict_rows": predict_rows,
+        "n_max": n_max,
+        "d_total": d_total,
+        "peak_worker_memory_gb": peak_worker_bytes / 1024**3,
+        "available_memory_gb": mem / 1024**3 if mem is not None else None,
+        "available_cpus": cpus,
+        "predicted_cpu_seconds": total_seconds,
+        "predicted_longest_spec_seconds": float(max(predicted_seconds)),
+        "proposed_n_jobs": n_jobs,
+        "proposed_threads_per_job": threads_per_job,
+        "predicted_wall_seconds": max(total_seconds / n_jobs, float(max(predicted_seconds))),
+    }
+
+
+def format_plan(plan: dict[str, Any]) -> str:
+    def _gb(v: float | None) -> str:
+        return f"{v:.2f} GB" if v is not None else "unknown"
+
+    lines = [
+        f"Config: {plan['config_path']}",
+        f"Dataset specs: {plan['n_dataset_specs']} x {plan['n_cells_per_spec']} cells = {plan['n_model_fits']} model fits",
+        f"Diagnostic/test predict calls: {plan['n_predict_calls']:,} ({plan['n_predict_rows']:,} rows)",
+        f"Largest dataset: n={plan['n_max']:,} x d_total={plan['d_total']}",
+        f"Peak memory per worker: ~{_gb(plan['peak_worker_memory_gb'])} (available: {_gb(plan['available_memory_gb'])})",
+        f"Predicted compute: {timedelta(seconds=round(plan['predicted_cpu_seconds']))} single-thread "
+        f"(longest spec {timedelta(seconds=round(plan['predicted_longest_spec_seconds']))})",
+        f"Proposed runner: n_jobs={plan['proposed_n_jobs']}, threads_per_job={plan['proposed_threads_per_job']} "
+        f"({plan['available_cpus']} CPUs)",
+        f"Predicted wall time at that setting: ~{timedelta(seconds=round(plan['predicted_wall_seconds']))}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def write_plan(plan: dict[str, Any], output_path: str | Path) -> None:
+    write_json(output_path, plan)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import logging
+import pstats
+import threading
+import tracemalloc
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+from xgb_complex_features.config import load_yaml, resolve_output_paths
+from xgb_complex_features.runner.cells import grid_cells
+from xgb_complex_features.runner.execute import _run_one_dataset
+from xgb_complex_features.runner.grid import DatasetSpec
+from xgb_complex_features.utils import ensure_dir, write_json
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIRNAME = "profile"
+
+
+def _find_by_id(items: list[dict[str, Any]], item_id: str, kind: str) -> dict[str, Any]:
+    for item in items:
+        if str(item["id"]) == item_id:
+            return item
+    known = ", ".join(str(item["id"]) for item in items)
+    raise ValueError(f"Unknown {kind} {item_id!r}; config has: {known}")
+
+
+def resolve_spec(cfg: dict[str, Any], *, task_id: str, regime_id: str, n: int, seed: int | None = None) -> DatasetSpec:
+    # Any n (and seed) is allowed, not only those in the grid: profiling often targets a bigger size.
+    task = _find_by_id(cfg.get("tasks", []) or [], task_id, "task")
+    regime = _find_by_id(cfg.get("regimes", []) or [], regime_id, "regime")
+    if seed is None:
+        seeds = cfg.get("seeds", []) or [0]
+        seed = int(seeds[0])
+    return DatasetSpec(task=task, regime=regime, seed=int(seed), n=int(n))
+
+
+def _stats_table(profiler: cProfile.Profile, *, sort: str, top: int) -> str:
+    buf = io.StringIO()
+    pstats.Stats(profiler, stream=buf).strip_dirs().sort_stats(sort).print_stats(top)
+    return buf.getvalue()
+
+
+def _sample_peak_snapshot(stop: threading.Event, out: dict[str, Any], interval: float) -> None:
+    # Keep the snapshot taken at the highest traced memory seen; the end-of-run snapshot misses
+    # transient float64 copies that set the real peak.
+    best = -1
+    while not stop.wait(interval):
+        current, _ = tracemalloc.get_traced_memory()
+        if current > best:
+            best = current
+            out["snapshot"] = tracemalloc.take_snapshot()
+            out["current"] = current
+
+
+def profile_spec(
+    *,
+    config_path: str,
+    task_id: str,
+    regime_id: str,
+    n: int,
+    seed: int | None = None,
+    trace_memory: bool = False,
+    top: int = 50,
+    output_dir: str | None = None,
+) -> Path:
+    cfg = load_yaml(config_path)
+    root_seed = int((cfg.get("experiment", {}) or {}).get("root_seed", 0))
+    spec = resolve_spec(cfg, task_id=task_id, regime_id=regime_id, n=n, seed=seed)
+    cells = grid_cells(cfg)
+
+    paths = resolve_output_paths(cfg, config_path=config_path)
+    out_dir = ensure_dir(Path(output_dir) if output_dir else paths.base_dir / PROFILE_DIRNAME / spec.spec_id)
+    logger.info("Profiling %s (%d cells) into %s", spec.spec_id, len(cells), out_dir)
+
+    # No result cache: the point is to execute every stage.
+    profiler = cProfile.Profile()
+    start = perf_counter()
+    profiler.enable()
+    rows = _run_one_dataset(cfg=cfg, spec=spec, root_seed=root_seed, cells=cells)
+    profiler.disable()
+    seconds = perf_counter() - start
+
+    profiler.dump_stats(str(out_dir / "profile.pstats"))
+    (out_dir / "hot_cumulative.txt").write_text(_stats_table(profiler, sort="cumulative", top=top), encoding="utf-8")
+    (out_dir / "hot_tottime.txt").write_text(_stats_table(profiler, sort="tottime", top=top), encoding="utf-8")
+
+    summary: dict[str, Any] = {
+        "config_path": str(Path(config_path).resolve()),
+        "spec_id": spec.spec_id,
+        "n_cells": len(cells),
+        "profiled_seconds": seconds,
+        "stage_seconds": {
+            col: float(sum(row[col] or 0.0 for row in rows))
+            for col in rows[0]
+            if col.startswith("time_") and col.endswith("_seconds")
+        },
+    }
+
+    if trace_memory:
+        # Separate pass: tracemalloc slows allocation-heavy code too much to share with cProfile.
+        tracemalloc.start(10)
+        sampled: dict[str, Any] = {}
+        stop = threading.Event()
+        sampler = threading.Thread(target=_sample_peak_snapshot, args=(stop, sampled, 0.2), daemon=True)
+        sampler.start()
+        try:
+            _run_one_dataset(cfg=cfg, spec=spec, root_seed=root_seed, cells=cells)
+        finally:
+            stop.set()
+            sampler.join()
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = sampled.get("snapshot") or tracemalloc.take_snapshot()
+            tracemalloc.stop()
+        lines = [
+            f"Peak traced memory: {peak / 1024**2:.1f} MiB",
+            f"Largest sampled: {sampled.get('current', 0) / 1024**2:.1f} MiB (allocations below)",
+            "",
+        ]
+        lines += [str(stat) for stat in snapshot.statistics("lineno")[:top]]
+        (out_dir / "tracemalloc.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+        summary["tracemalloc_peak_mb"] = peak / 1024**2
+
+    write_json(out_dir / "profile_summary.json", summary)
+    logger.info("Profiled %s in %.1fs; hot functions in %s", spec.spec_id, seconds, out_dir / "hot_cumulative.txt")
+    return out_dir
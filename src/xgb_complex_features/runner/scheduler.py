@@ -0,0 +1,365 @@
+from __future__ import annotations
+
+import logging
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import replace
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable
+
+from joblib import effective_n_jobs
+from joblib.externals.loky import ProcessPoolExecutor
+
+from xgb_complex_features.dgp.store import load_dataset, save_dataset
+from xgb_complex_features.runner.cache import ResultCache, cell_key
+from xgb_complex_features.runner.cells import Cell, generate_spec_dataset, run_cell, run_cells
+from xgb_complex_features.dgp.dataset import Dataset
+from xgb_complex_features.runner.grid import DatasetSpec, nested_groups, nested_n_max
+from xgb_complex_features.runner.threads import apply_thread_limits, thread_env
+from xgb_complex_features.tracing import configure_tracing, span, trace_context
+
+logger = logging.getLogger(__name__)
+
+SpecDone = Callable[[int, list[dict[str, Any]], float], None]
+# The spec to generate, and the (spec index, cells) that train on it.
+Generation = tuple[DatasetSpec, list[tuple[int, list[Cell]]]]
+
+
+def _generations(cfg: dict[str, Any], pending: list[tuple[int, list[Cell]]], specs: list[DatasetSpec]) -> list[Generation]:
+    # One generation per spec, or with sample_complexity: nested one per (task, regime, seed)
+    # at the largest n, shared by the group's specs.
+    n_max = nested_n_max(cfg)
+    if n_max is None:
+        return [(specs[spec_idx], [(spec_idx, cells)]) for spec_idx, cells in pending]
+    return [(replace(specs[group[0][0]], n=n_max), group) for group in nested_groups(pending, specs)]
+
+
+def _spec_dataset(ds: Dataset, *, cfg: dict[str, Any], spec: DatasetSpec, root_seed: int) -> Dataset:
+    # Stored datasets of nested runs are the group's base: take this spec's subset of it.
+    if nested_n_max(cfg) is None:
+        return ds
+    return generate_spec_dataset(cfg=cfg, spec=spec, root_seed=root_seed, base=ds)
+
+
+def _generate_task(
+    *,
+    spec_idx: int,
+    cfg: dict[str, Any],
+    spec: DatasetSpec,
+    root_seed: int,
+    store_dir: str,
+    n_threads: int | None,
+    trace_dir: str | None,
+    share: int = 1,
+) -> tuple[int, str, float, dict[str, Any]]:
+    worker = apply_thread_limits(n_threads)
+    configure_tracing(trace_dir)
+    start = perf_counter()
+    with trace_context(spec_id=spec.spec_id):
+        ds = generate_spec_dataset(cfg=cfg, spec=spec, root_seed=root_seed)
+        # Generation is shared by `share` specs (a nested group); split its time evenly across them.
+        ds.metadata["generate_seconds"] /= share
+        with span("save_dataset"):
+            path = save_dataset(ds, Path(store_dir) / spec.spec_id)
+    return spec_idx, str(path), perf_counter() - start, worker
+
+
+def _cell_task(
+    *,
+    spec_idx: int,
+    cell_idx: int,
+    dataset_path: str,
+    cfg: dict[str, Any],
+    spec: DatasetSpec,
+    cell: Cell,
+    root_seed: int,
+    cache_dir: str | None,
+    n_threads: int | None,
+    trace_dir: str | None,
+    artifacts_dir: str | None,
+) -> tuple[int, int, dict[str, Any], float, dict[str, Any]]:
+    worker = apply_thread_limits(n_threads)
+    configure_tracing(trace_dir)
+    start = perf_counter()
+    # Memory-mapped: every worker training on this spec shares the same page-cache copy of the data.
+    ds = _spec_dataset(load_dataset(dataset_path, mmap_mode="r"), cfg=cfg, spec=spec, root_seed=root_seed)
+    xgb_cfg, oracle_mode = cell
+    with trace_context(spec_id=spec.spec_id), span("run_cell", xgb_config_id=str(xgb_cfg["id"]), oracle_mode=oracle_mode):
+        row = run_cell(
+            ds=ds,
+            cfg=cfg,
+            spec=spec,
+            xgb_cfg=xgb_cfg,
+            oracle_mode=oracle_mode,
+            root_seed=root_seed,
+            n_threads=n_threads,
+            artifacts_dir=artifacts_dir,
+        )
+    if cache_dir is not None:
+        key = cell_key(cfg=cfg, spec=spec, xgb_cfg=xgb_cfg, oracle_mode=oracle_mode, root_seed=root_seed)
+        ResultCache(cache_dir).put(key, row)
+    return spec_idx, cell_idx, row, perf_counter() - start, worker
+
+
+def _consume_task(
+    *,
+    spec_idx: int,
+    dataset_path: str,
+    cfg: dict[str, Any],
+    spec: DatasetSpec,
+    cells: list[Cell],
+    root_seed: int,
+    cache_dir: str | None,
+    n_threads: int | None,
+    trace_dir: str | None,
+    artifacts_dir: str | None,
+) -> tuple[int, list[dict[str, Any]], float, dict[str, Any]]:
+    worker = apply_thread_limits(n_threads)
+    configure_tracing(trace_dir)
+    start = perf_counter()
+    ds = _spec_dataset(load_dataset(dataset_path, mmap_mode="r"), cfg=cfg, spec=spec, root_seed=root_seed)
+    with trace_context(spec_id=spec.spec_id), span("run_spec"):
+        rows = run_cells(
+            ds=ds,
+            cfg=cfg,
+            spec=spec,
+            cells=cells,
+            root_seed=root_seed,
+            cache_dir=cache_dir,
+            n_threads=n_threads,
+            artifacts_dir=artifacts_dir,
+        )
+    return spec_idx, rows, perf_counter() - start, worker
+
+
+def run_cell_scheduler(
+    *,
+    cfg: dict[str, Any],
+    specs: list[DatasetSpec],
+    pending: list[tuple[int, list[Cell]]],
+    root_seed: int,
+    n_jobs: int,
+    cache_dir: str | None,
+    scratch_dir: Path,
+    n_threads: int | None,
+    trace_dir: str | None,
+    artifacts_dir: str | None,
+    workers: dict[int, dict[str, Any]],
+    on_spec_done: SpecDone,
+) -> None:
+    n_workers = effective_n_jobs(n_jobs)
+    env = thread_env(n_threads) if n_threads is not None else None
+    # A private pool: loky's global reusable executor is shared with joblib.Parallel, which fails
+    # when it later picks up an executor it did not create.
+    executor = ProcessPoolExecutor(max_workers=n_workers, env=env)
+    scratch_dir.mkdir(parents=True, exist_ok=True)
+    store_dir = Path(tempfile.mkdtemp(dir=scratch_dir, prefix="datasets_"))
+
+    generations = _generations(cfg, pending, specs)
+    queue = deque(range(len(generations)))
+    spec_cells = dict(pending)
+    # Specs whose cells are not all finished; bounded so scratch space stays small.
+    live: dict[int, dict[str, Any]] = {}
+    # Unfinished specs per stored dataset (several for a nested group).
+    users: dict[str, int] = {}
+    max_live = n_workers
+    futures: dict[Future, tuple[str, int]] = {}
+
+    def _submit_generation() -> None:
+        while queue and len(live) < max_live:
+            gen_idx = queue.popleft()
+            gen_spec, group = generations[gen_idx]
+            for spec_idx, _ in group:
+                live[spec_idx] = {"path": None, "rows": {}, "seconds": 0.0}
+            fut = executor.submit(
+                _generate_task,
+                spec_idx=group[0][0],
+                cfg=cfg,
+                spec=gen_spec,
+                root_seed=root_seed,
+                store_dir=str(store_dir),
+                n_threads=n_threads,
+                trace_dir=trace_dir,
+                share=len(group),
+            )
+            futures[fut] = ("generate", gen_idx)
+
+    try:
+        _submit_generation()
+        while futures:
+            done, _ = wait(list(futures), return_when=FIRST_COMPLETED)
+            for fut in done:
+                kind, idx = futures.pop(fut)
+                if kind == "generate":
+                    _, path, seconds, worker = fut.result()
+                    workers[worker["pid"]] = worker
+                    group = generations[idx][1]
+                    users[path] = len(group)
+                    for spec_idx, cells in group:
+                        state = live[spec_idx]
+                        state["path"] = path
+                        state["seconds"] += seconds / len(group)
+                        for cell_idx, cell in enumerate(cells):
+                            cell_fut = executor.submit(
+                                _cell_task,
+                                spec_idx=spec_idx,
+                                cell_idx=cell_idx,
+                                dataset_path=path,
+                                cfg=cfg,
+                                spec=specs[spec_idx],
+                                cell=cell,
+                                root_seed=root_seed,
+                                cache_dir=cache_dir,
+                                n_threads=n_threads,
+                                trace_dir=trace_dir,
+                                artifacts_dir=artifacts_dir,
+                            )
+                            futures[cell_fut] = ("cell", spec_idx)
+                    continue
+
+                spec_idx = idx
+                state = live[spec_idx]
+                _, cell_idx, row, seconds, worker = fut.result()
+                workers[worker["pid"]] = worker
+                state["rows"][cell_idx] = row
+                state["seconds"] += seconds
+                logger.debug("Finished cell %d of %s (%.1fs)", cell_idx, specs[spec_idx].spec_id, seconds)
+                if len(state["rows"]) == len(spec_cells[spec_idx]):
+                    rows = [state["rows"][i] for i in range(len(spec_cells[spec_idx]))]
+                    del live[spec_idx]
+                    users[state["path"]] -= 1
+                    if not users[state["path"]]:
+                        del users[state["path"]]
+                        shutil.rmtree(state["path"], ignore_errors=True)
+                    on_spec_done(spec_idx, rows, state["seconds"])
+                    _submit_generation()
+    except BaseException:
+        for fut in futures:
+            fut.cancel()
+        raise
+    finally:
+        executor.shutdown(wait=True)
+        shutil.rmtree(store_dir, ignore_errors=True)
+        try:
+            scratch_dir.rmdir()
+        except OSError:
+            pass
+
+
+def run_pipeline_scheduler(
+    *,
+    cfg: dict[str, Any],
+    specs: list[DatasetSpec],
+    pending: list[tuple[int, list[Cell]]],
+    root_seed: int,
+    n_jobs: int,
+    n_producers: int,
+    prefetch: int | None,
+    cache_dir: str | None,
+    scratch_dir: Path,
+    n_threads: int | None,
+    trace_dir: str | None,
+    artifacts_dir: str | None,
+    workers: dict[int, dict[str, Any]],
+    on_spec_done: SpecDone,
+) -> None:
+    n_consumers = effective_n_jobs(n_jobs)
+    # Datasets held at once (being generated, waiting, or being trained on): by default one in
+    # training and one ready per consumer.
+    max_held = max(int(prefetch) if prefetch is not None else 2 * n_consumers, 1)
+    env = thread_env(n_threads) if n_threads is not None else None
+    # Producers get their own small pool so generation never queues behind training tasks.
+    producers = ProcessPoolExecutor(max_workers=max(int(n_producers), 1), env=env)
+    consumers = ProcessPoolExecutor(max_workers=n_consumers, env=env)
+    scratch_dir.mkdir(parents=True, exist_ok=True)
+    store_dir = Path(tempfile.mkdtemp(dir=scratch_dir, prefix="datasets_"))
+
+    generations = _generations(cfg, pending, specs)
+    queue = deque(range(len(generations)))
+    spec_cells = dict(pending)
+    # Generated specs waiting for a consumer.
+    ready: deque[tuple[int, str]] = deque()
+    n_generating = 0
+    n_consuming = 0
+    gen_seconds: dict[int, float] = {}
+    paths: dict[int, str] = {}
+    # Unfinished specs per stored dataset (several for a nested group): the datasets on disk.
+    users: dict[str, int] = {}
+    futures: dict[Future, tuple[str, int]] = {}
+
+    def _fill() -> None:
+        nonlocal n_generating, n_consuming
+        while queue and n_generating + len(users) < max_held:
+            gen_idx = queue.popleft()
+            gen_spec, group = generations[gen_idx]
+            fut = producers.submit(
+                _generate_task,
+                spec_idx=group[0][0],
+                cfg=cfg,
+                spec=gen_spec,
+                root_seed=root_seed,
+                store_dir=str(store_dir),
+                n_threads=n_threads,
+                trace_dir=trace_dir,
+                share=len(group),
+            )
+            futures[fut] = ("generate", gen_idx)
+            n_generating += 1
+        while ready and n_consuming < n_consumers:
+            spec_idx, path = ready.popleft()
+            fut = consumers.submit(
+                _consume_task,
+                spec_idx=spec_idx,
+                dataset_path=path,
+                cfg=cfg,
+                spec=specs[spec_idx],
+                cells=spec_cells[spec_idx],
+                root_seed=root_seed,
+                cache_dir=cache_dir,
+                n_threads=n_threads,
+                trace_dir=trace_dir,
+                artifacts_dir=artifacts_dir,
+            )
+            futures[fut] = ("consume", spec_idx)
+            n_consuming += 1
+
+    try:
+        _fill()
+        while futures:
+            done, _ = wait(list(futures), return_when=FIRST_COMPLETED)
+            for fut in done:
+                kind, idx = futures.pop(fut)
+                if kind == "generate":
+                    _, path, seconds, worker = fut.result()
+                    workers[worker["pid"]] = worker
+                    n_generating -= 1
+                    group = generations[idx][1]
+                    users[path] = len(group)
+                    for spec_idx, _ in group:
+                        gen_seconds[spec_idx] = seconds / len(group)
+                        paths[spec_idx] = path
+                        ready.append((spec_idx, path))
+                    continue
+
+                spec_idx = idx
+                _, rows, seconds, worker = fut.result()
+                workers[worker["pid"]] = worker
+                n_consuming -= 1
+                path = paths.pop(spec_idx)
+                users[path] -= 1
+                if not users[path]:
+                    del users[path]
+                    shutil.rmtree(path, ignore_errors=True)
+                on_spec_done(spec_idx, rows, gen_seconds.pop(spec_idx) + seconds)
+            _fill()
+    except BaseException:
+        for fut in futures:
+            fut.cancel()
+        raise
+    finally:
+        producers.shutdown(wait=True)
+        consumers.shutdown(wait=True)
+        shutil.rmtree(store_dir, ignore_errors=True)
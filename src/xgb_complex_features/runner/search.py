@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Any
+
+from xgb_complex_features.models.xgb import IncrementalFit
+
+CONFIG_SEARCH_MODES = {"grid", "successive_halving"}
+
+
+@dataclass(frozen=True)
+class HalvingSettings:
+    min_rounds: int
+    eta: float
+
+
+@dataclass(frozen=True)
+class Pruned:
+    rung: int
+    rounds: int
+
+
+def halving_settings(cfg: dict[str, Any]) -> HalvingSettings | None:
+    runner_cfg = cfg.get("runner", {}) or {}
+    mode = str(runner_cfg.get("config_search", "grid"))
+    if mode not in CONFIG_SEARCH_MODES:
+        raise ValueError(f"Unknown runner.config_search: {mode}")
+    if mode == "grid":
+        return None
+    halving_cfg = runner_cfg.get("halving", {}) or {}
+    settings = HalvingSettings(
+        min_rounds=int(halving_cfg.get("min_rounds", 100)),
+        eta=float(halving_cfg.get("eta", 2.0)),
+    )
+    if settings.min_rounds < 1 or settings.eta <= 1.0:
+        raise ValueError("runner.halving needs min_rounds >= 1 and eta > 1")
+    return settings
+
+
+def successive_halving(
+    fits: dict[str, IncrementalFit],
+    *,
+    settings: HalvingSettings,
+    fit_seconds: dict[str, float],
+) -> dict[str, Pruned]:
+    # Rung k trains every surviving config up to min_rounds * eta**k boosting rounds, then keeps the
+    # best 1/eta by validation score (ties keep config order). The last survivor trains to completion,
+    # unless it is stochastic: those are retrained alone by the caller (see IncrementalFit.retrain).
+    alive = list(fits)
+    pruned: dict[str, Pruned] = {}
+    rung = 0
+
+    def _advance(config_id: str, until_round: int) -> None:
+        start = perf_counter()
+        fits[config_id].advance(until_round)
+        fit_seconds[config_id] = fit_seconds.get(config_id, 0.0) + perf_counter() - start
+
+    while len(alive) > 1 and not all(fits[c].done for c in alive):
+        budget = int(round(settings.min_rounds * settings.eta**rung))
+        for config_id in alive:
+            _advance(config_id, budget)
+        scores = {config_id: fits[config_id].score() for config_id in alive}
+        metrics = {metric for metric, _, _ in scores.values()}
+        if len(metrics) != 1:
+            raise ValueError(f"successive_halving needs one eval_metric across xgb_configs, got {sorted(metrics)}")
+        ranked = sorted(alive, key=lambda c: -scores[c][1] if scores[c][2] else scores[c][1])
+        keep = set(ranked[: max(math.ceil(len(alive) / settings.eta), 1)])
+        for config_id in alive:
+            if config_id not in keep:
+                pruned[config_id] = Pruned(rung=rung, rounds=fits[config_id].rounds)
+        alive = [c for c in alive if c in keep]
+        rung += 1
+
+    for config_id in alive:
+        if not fits[config_id].stochastic:
+            _advance(config_id, fits[config_id].num_boost_round)
+    return pruned
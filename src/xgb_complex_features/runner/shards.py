@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+from xgb_complex_features.utils import ensure_dir
+
+logger = logging.getLogger(__name__)
+
+SHARD_DIRNAME = "shards"
+MANIFEST_NAME = "manifest.jsonl"
+
+
+def read_manifest(shard_dir: Path) -> list[dict[str, Any]]:
+    path = shard_dir / MANIFEST_NAME
+    if not path.exists():
+        return []
+    entries = []
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A kill mid-append can leave a truncated last line; that spec simply reruns.
+                logger.warning("Skipping unreadable manifest line in %s", path)
+    return [e for e in entries if (shard_dir / e["shard"]).exists()]
+
+
+class ShardWriter:
+    # Per-spec results shards plus an append-only manifest of finished specs.
+    def __init__(self, run_dir: str | Path) -> None:
+        self.shard_dir = ensure_dir(Path(run_dir) / SHARD_DIRNAME)
+        self.manifest_path = self.shard_dir / MANIFEST_NAME
+        # Terminate a truncated last line so new entries start on a fresh one.
+        if self.manifest_path.exists() and self.manifest_path.stat().st_size > 0:
+            with self.manifest_path.open("rb+") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+
+    def finished(self) -> dict[str, dict[str, Any]]:
+        return {e["spec_id"]: e for e in read_manifest(self.shard_dir)}
+
+    def write(
+        self,
+        spec_id: str,
+        rows: list[dict[str, Any]],
+        *,
+        duration_seconds: float | None,
+        extra: dict[str, Any] | None = None,
+    ) -> Path:
+        name = f"{spec_id}.parquet"
+        path = self.shard_dir / name
+        fd, tmp = tempfile.mkstemp(dir=self.shard_dir, prefix=f".{spec_id}.", suffix=".tmp")
+        os.close(fd)
+        try:
+            pd.DataFrame(rows).to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+        entry = {
+            "spec_id": spec_id,
+            "shard": name,
+            "n_rows": len(rows),
+            "duration_seconds": duration_seconds,
+            "finished_at": datetime.now().isoformat(),
+            **(extra or {}),
+        }
+        with self.manifest_path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        return path
+
+
+def read_shards(shard_dir: str | Path, spec_ids: list[str] | None = None) -> pd.DataFrame:
+    shard_dir = Path(shard_dir)
+    entries = {e["spec_id"]: e for e in read_manifest(shard_dir)}
+    order = spec_ids if spec_ids is not None else list(entries)
+    dfs = [pd.read_parquet(shard_dir / entries[s]["shard"]) for s in order if s in entries]
+    if not dfs:
+        return pd.DataFrame()
+    return pd.concat(dfs, ignore_index=True)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from xgb_complex_features.dgp.dataset import Dataset, shift_test_set
+from xgb_complex_features.diagnostics.invariance import features_from_raw
+from xgb_complex_features.models.xgb import Model, compute_metrics, predict_proba_positive
+from xgb_complex_features.runner.grid import DatasetSpec
+from xgb_complex_features.utils import make_rng
+
+SHIFT_TYPES = {"naive", "preserve"}
+
+# Columns of a results row that identify its model in the long-form shift sweep table.
+_SWEEP_KEYS = ["task_id", "level", "regime_id", "regime_family", "seed", "n", "oracle_mode", "xgb_config_id"]
+
+
+@dataclass(frozen=True)
+class ShiftSweep:
+    shifts: tuple[tuple[str, float], ...]
+    subset_fraction: float
+    regimes: tuple[str, ...] | None
+
+
+def shift_sweep_settings(cfg: dict[str, Any]) -> ShiftSweep | None:
+    sweep_cfg = cfg.get("shift_sweep")
+    if not sweep_cfg:
+        return None
+    types = [str(t) for t in sweep_cfg.get("types", ["preserve", "naive"])]
+    for shift_type in types:
+        if shift_type not in SHIFT_TYPES:
+            raise ValueError(f"Unknown shift_sweep type: {shift_type}")
+    cs = [float(c) for c in sweep_cfg.get("c", [1.5, 2.0, 5.0, 10.0])]
+    if not types or not cs:
+        raise ValueError("shift_sweep needs at least one type and one c")
+    regimes = sweep_cfg.get("regimes")
+    return ShiftSweep(
+        shifts=tuple((shift_type, c) for shift_type in types for c in cs),
+        subset_fraction=float(sweep_cfg.get("subset_fraction", 0.2)),
+        regimes=tuple(str(r) for r in regimes) if regimes is not None else None,
+    )
+
+
+def sweeps_regime(settings: ShiftSweep | None, regime: dict[str, Any]) -> bool:
+    # Only unshifted regimes are swept: their test rows are the base the shifts are applied to.
+    if settings is None or (regime.get("shift") or {}).get("type", "none") != "none":
+        return False
+    return settings.regimes is None or str(regime["id"]) in settings.regimes
+
+
+@dataclass
+class ShiftedTestSets:
+    # Every shift of one dataset's test rows, built once and shared by its cells. Features are
+    # stacked per oracle mode so each model scores all shifts in one prediction call.
+    shifts: tuple[tuple[str, float], ...]
+    x_raw: list[np.ndarray]
+    y: list[np.ndarray]
+    features: dict[str, np.ndarray] = field(default_factory=dict)
+
+    def batch(self, ds: Dataset, oracle_mode: str) -> np.ndarray:
+        if oracle_mode not in self.features:
+            self.features[oracle_mode] = np.concatenate(
+                [features_from_raw(x, ds.task, oracle_mode) for x in self.x_raw], axis=0  # type: ignore[arg-type]
+            )
+        return self.features[oracle_mode]
+
+    def evaluate(self, model: Model, ds: Dataset, oracle_mode: str) -> list[dict[str, Any]]:
+        p = predict_proba_positive(model, self.batch(ds, oracle_mode))
+        bounds = np.cumsum([0] + [y.size for y in self.y])
+        return [
+            {
+                "shift_type": shift_type,
+                "shift_c": c,
+                "prevalence_test": float(y.mean()) if y.size else float("nan"),
+                **compute_metrics(y, p[lo:hi]),
+            }
+            for (shift_type, c), y, lo, hi in zip(self.shifts, self.y, bounds[:-1], bounds[1:])
+        ]
+
+
+def shifted_test_sets(
+    ds: Dataset,
+    *,
+    settings: ShiftSweep,
+    cfg: dict[str, Any],
+    spec: DatasetSpec,
+    root_seed: int,
+) -> ShiftedTestSets:
+    def _rng(*parts: Any) -> np.random.Generator:
+        return make_rng(root_seed, spec.seed, spec.task["id"], spec.regime["id"], spec.n, "shift_sweep", *parts)
+
+    u = _rng("y").random(ds.splits.test.size)
+    label_cfg = cfg.get("label", {}) or {}
+    x_raw, y = [], []
+    for shift_type, c in settings.shifts:
+        x, labels = shift_test_set(
+            ds,
+            shift_type=shift_type,
+            c=c,
+            subset_fraction=settings.subset_fraction,
+            label_cfg=label_cfg,
+            # Re-seeded per shift: naive shifts of every c scale the same columns.
+            rng=_rng(shift_type),
+            u=u,
+        )
+        x_raw.append(x)
+        y.append(labels)
+    return ShiftedTestSets(shifts=settings.shifts, x_raw=x_raw, y=y)
+
+
+def shift_sweep_table(results: pd.DataFrame) -> pd.DataFrame:
+    # One row per (results row, shift), expanded from the rows' shift_sweep_json.
+    records = []
+    for row in results[results["shift_sweep_json"].notna()].itertuples(index=False):
+        for point in json.loads(row.shift_sweep_json):
+            records.append({**{k: getattr(row, k) for k in _SWEEP_KEYS}, **point})
+    return pd.DataFrame.from_records(records)
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+from time import perf_counter
+from typing import Any, Callable
+
+import numpy as np
+import xgboost
+from xgboost import QuantileDMatrix
+
+from xgb_complex_features.dgp.stream import StreamingDataset, generate_streaming_dataset
+from xgb_complex_features.diagnostics.dominance import compute_dominance
+from xgb_complex_features.diagnostics.invariance import features_from_raw, compute_all_invariance
+from xgb_complex_features.models.xgb import (
+    FitResult,
+    compute_metrics,
+    n_boosted_rounds,
+    predict_proba_positive,
+    train_on_dmatrices,
+)
+from xgb_complex_features.runner.cache import ResultCache, cell_key
+from xgb_complex_features.runner.cells import (
+    Cell,
+    _cell_params,
+    _cell_rng,
+    _model_seed,
+    _result_row,
+    _test_metrics,
+    store_cell_artifacts,
+)
+from xgb_complex_features.runner.grid import DatasetSpec
+from xgb_complex_features.runner.search import halving_settings
+from xgb_complex_features.runner.shifts import shift_sweep_settings, sweeps_regime
+from xgb_complex_features.tracing import span
+
+
+class ChunkIter(xgboost.DataIter):
+    # Feeds one split of a streamed dataset to XGBoost chunk by chunk, as one oracle mode's features.
+    # XGBoost makes several passes (sketch, then binning); each pass regenerates the chunks.
+    def __init__(self, ds: StreamingDataset, *, part: str, oracle_mode: str) -> None:
+        self._ds = ds
+        self._part = part
+        self._oracle_mode = oracle_mode
+        self._k = 0
+        super().__init__()
+
+    def next(self, input_data: Callable[..., None]) -> int:
+        while self._k < self._ds.n_chunks:
+            chunk = self._ds.chunk(self._k)
+            self._k += 1
+            idx = chunk.rows(self._part)
+            if idx.size == 0:
+                continue
+            x = features_from_raw(chunk.x_raw[idx], self._ds.task, self._oracle_mode)  # type: ignore[arg-type]
+            input_data(data=x, label=chunk.y[idx])
+            return 1
+        return 0
+
+    def reset(self) -> None:
+        self._k = 0
+
+
+def generate_spec_stream(*, cfg: dict[str, Any], spec: DatasetSpec, root_seed: int) -> StreamingDataset:
+    start = perf_counter()
+    ds = generate_streaming_dataset(
+        n=spec.n,
+        seed=int(root_seed) + int(spec.seed),
+        task_cfg=spec.task,
+        regime_cfg=spec.regime,
+        data_cfg=cfg.get("data", {}) or {},
+        label_cfg=cfg.get("label", {}) or {},
+        splits_cfg=cfg.get("splits", {}) or {},
+    )
+    # Only the pilot: chunk generation is paid inside the training and prediction passes.
+    ds.metadata["generate_seconds"] = perf_counter() - start
+    return ds
+
+
+def _stream_dmatrices(
+    ds: StreamingDataset, *, oracle_mode: str, params: dict[str, Any]
+) -> tuple[QuantileDMatrix, QuantileDMatrix]:
+    if params.get("tree_method") not in ("hist", None, "auto"):
+        raise ValueError("data.stream trains from QuantileDMatrix and needs tree_method: hist")
+    kwargs = {
+        "max_bin": params.get("max_bin"),
+        "nthread": params.get("n_jobs", params.get("nthread")),
+        "missing": params.get("missing", np.nan),
+    }
+    dtrain = QuantileDMatrix(ChunkIter(ds, part="train", oracle_mode=oracle_mode), **kwargs)
+    dval = QuantileDMatrix(ChunkIter(ds, part="val", oracle_mode=oracle_mode), ref=dtrain, **kwargs)
+    return dtrain, dval
+
+
+def run_stream_cells(
+    *,
+    ds: StreamingDataset,
+    cfg: dict[str, Any],
+    spec: DatasetSpec,
+    cells: list[Cell],
+    root_seed: int,
+    cache_dir: str | None = None,
+    n_threads: int | None = None,
+    artifacts_dir: str | None = None,
+) -> list[dict[str, Any]]:
+    # Same rows as run_cells, without ever holding the n x d matrix: training reads the splits
+    # through ChunkIter, one fused pass over the chunks predicts every model's test rows, and
+    # diagnostics/dominance use in-memory samples of settings.sample_rows rows.
+    if halving_settings(cfg) is not None:
+        raise ValueError("runner.config_search: successive_halving is not supported with data.stream")
+    if sweeps_regime(shift_sweep_settings(cfg), spec.regime):
+        raise ValueError("shift_sweep is not supported with data.stream")
+    model_cfg = cfg.get("model", {}) or {}
+    by_mode: dict[str, list[dict[str, Any]]] = {}
+    for xgb_cfg, oracle_mode in cells:
+        by_mode.setdefault(oracle_mode, []).append(xgb_cfg)
+
+    fits: dict[tuple[str, str], FitResult] = {}
+    timings: dict[tuple[str, str], dict[str, float]] = {}
+    for oracle_mode, xgb_cfgs in by_mode.items():
+        # One train/val QuantileDMatrix per (oracle mode, max_bin), shared by the configs.
+        dmatrices: dict[Any, tuple[QuantileDMatrix, QuantileDMatrix]] = {}
+        for xgb_cfg in xgb_cfgs:
+            key = (str(xgb_cfg["id"]), oracle_mode)
+            params = _cell_params(xgb_cfg, n_threads)
+            cell_timings: dict[str, float] = {}
+            start = perf_counter()
+            if params.get("max_bin") not in dmatrices:
+                dmatrices[params.get("max_bin")] = _stream_dmatrices(ds, oracle_mode=oracle_mode, params=params)
+            dtrain, dval = dmatrices[params.get("max_bin")]
+            cell_timings["features"] = perf_counter() - start
+            start = perf_counter()
+            with span("run_cell", xgb_config_id=key[0], oracle_mode=oracle_mode):
+                fits[key] = train_on_dmatrices(
+                    dtrain=dtrain,
+                    dval=dval,
+                    params=params,
+                    seed=_model_seed(spec=spec, oracle_mode=oracle_mode, xgb_config_id=key[0], root_seed=root_seed),
+                )
+            cell_timings["fit"] = perf_counter() - start
+            timings[key] = cell_timings
+        del dmatrices
+
+    # One pass over the chunks: test predictions (and capacity-curve points) for every model.
+    curve_iterations = model_cfg.get("curve_iterations")
+    curve_ks: dict[tuple[str, str], list[int]] = {}
+    if curve_iterations:
+        for key, fit in fits.items():
+            curve_ks[key] = sorted({int(k) for k in curve_iterations if 0 < int(k) <= n_boosted_rounds(fit.model)})
+    p_parts: dict[tuple[str, str], list[np.ndarray]] = {key: [] for key in fits}
+    curve_parts: dict[tuple[str, str], dict[int, list[np.ndarray]]] = {
+        key: {k: [] for k in ks} for key, ks in curve_ks.items()
+    }
+    y_parts = []
+    curve_seconds = 0.0
+    start = perf_counter()
+    with span("stream_predict"):
+        for chunk in ds.iter_chunks():
+            idx = chunk.rows("test")
+            y_parts.append(chunk.y[idx])
+            for oracle_mode in by_mode:
+                x = features_from_raw(chunk.x_raw[idx], ds.task, oracle_mode)  # type: ignore[arg-type]
+                for xgb_cfg in by_mode[oracle_mode]:
+                    key = (str(xgb_cfg["id"]), oracle_mode)
+                    p_parts[key].append(predict_proba_positive(fits[key].model, x))
+                    curve_start = perf_counter()
+                    for k, parts in curve_parts.get(key, {}).items():
+                        parts.append(predict_proba_positive(fits[key].model, x, iteration_range=(0, k)))
+                    curve_seconds += perf_counter() - curve_start
+    predict_seconds = perf_counter() - start - curve_seconds
+    ds.record_prevalence()
+    y_test = np.concatenate(y_parts)
+
+    start = perf_counter()
+    sample_rows = ds.settings.sample_rows
+    x_train_sample = ds.sample("train", sample_rows)
+    x_test_sample = ds.sample("test", sample_rows)
+    sum_groups = ds.task.diagnostics.sum_groups
+    dom_train = compute_dominance(x_raw=x_train_sample, idx=np.arange(len(x_train_sample)), sum_groups=sum_groups)
+    dom_test = compute_dominance(x_raw=x_test_sample, idx=np.arange(len(x_test_sample)), sum_groups=sum_groups)
+    dominance_seconds = perf_counter() - start
+
+    rows: list[dict[str, Any]] = []
+    cache = ResultCache(cache_dir) if cache_dir is not None else None
+    for xgb_cfg, oracle_mode in cells:
+        key = (str(xgb_cfg["id"]), oracle_mode)
+        fit = fits[key]
+        cell_timings = timings[key]
+        # Shared passes are split evenly across the cells that used them.
+        cell_timings["predict"] = predict_seconds / len(fits)
+        p_test = np.concatenate(p_parts[key])
+        metrics = _test_metrics(
+            cfg=cfg,
+            spec=spec,
+            oracle_mode=oracle_mode,
+            xgb_config_id=key[0],
+            root_seed=root_seed,
+            y_test=y_test,
+            p_test=p_test,
+        )
+        if artifacts_dir is not None:
+            store_cell_artifacts(
+                artifacts_dir,
+                cfg=cfg,
+                spec=spec,
+                xgb_cfg=xgb_cfg,
+                oracle_mode=oracle_mode,
+                root_seed=root_seed,
+                fit=fit,
+                p_test=p_test,
+                y_test=y_test,
+            )
+        curve = None
+        if curve_iterations:
+            curve = [
+                {"iteration": k, **compute_metrics(y_test, np.concatenate(parts))}
+                for k, parts in curve_parts[key].items()
+            ]
+            cell_timings["curve"] = curve_seconds / len(fits)
+        invariance = compute_all_invariance(
+            model=fit.model,
+            oracle_mode=oracle_mode,  # type: ignore[arg-type]
+            task=ds.task,
+            x_test_raw=x_test_sample,
+            rng=_cell_rng(spec=spec, oracle_mode=oracle_mode, xgb_config_id=key[0], root_seed=root_seed, stream="diag"),
+            cfg=cfg.get("diagnostics", {}) or {},
+            timings=cell_timings,
+        )
+        cell_timings["dominance"] = dominance_seconds / len(fits)
+        row = _result_row(
+            metadata=ds.metadata,
+            spec=spec,
+            oracle_mode=oracle_mode,
+            xgb_config_id=key[0],
+            fit=fit,
+            metrics=metrics,
+            invariance=invariance,
+            dom_train=dom_train,
+            dom_test=dom_test,
+            curve=curve,
+            timings=cell_timings,
+        )
+        if cache is not None:
+            cache.put(cell_key(cfg=cfg, spec=spec, xgb_cfg=xgb_cfg, oracle_mode=oracle_mode, root_seed=root_seed), row)
+        rows.append(row)
+    return rows
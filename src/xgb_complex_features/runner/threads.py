@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import Any
+
+try:
+    from threadpoolctl import threadpool_info, threadpool_limits
+
+    _HAVE_THREADPOOLCTL = True
+except Exception:  # pragma: no cover
+    _HAVE_THREADPOOLCTL = False
+    threadpool_info = None
+    threadpool_limits = None
+
+
+_THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "BLIS_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+# Limit last applied in this process; workers are reused across tasks.
+_applied_threads: int | None = None
+_threadpool_limiter: Any = None
+
+
+@dataclass(frozen=True)
+class ThreadBudget:
+    n_jobs: int
+    threads_per_job: int
+    total_threads: int
+
+
+def available_cpus() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def resolve_thread_budget(runner_cfg: dict[str, Any]) -> ThreadBudget | None:
+    n_jobs = runner_cfg.get("n_jobs", 1)
+    threads_per_job = runner_cfg.get("threads_per_job")
+    total_threads = runner_cfg.get("total_threads")
+    if n_jobs != "auto" and threads_per_job is None and total_threads is None:
+        return None
+
+    total = available_cpus() if total_threads in (None, "auto") else int(total_threads)
+    if total <= 0:
+        raise ValueError("runner.total_threads must be >= 1")
+
+    if n_jobs == "auto":
+        # Fill the budget with processes; each gets threads_per_job (default 1) threads.
+        per_job = 1 if threads_per_job in (None, "auto") else int(threads_per_job)
+        if per_job <= 0:
+            raise ValueError("runner.threads_per_job must be >= 1")
+        return ThreadBudget(n_jobs=max(total // per_job, 1), threads_per_job=per_job, total_threads=total)
+
+    jobs = int(n_jobs)
+    jobs = total if jobs < 0 else max(jobs, 1)
+    if threads_per_job in (None, "auto"):
+        per_job = max(total // jobs, 1)
+    else:
+        per_job = int(threads_per_job)
+        if per_job <= 0:
+            raise ValueError("runner.threads_per_job must be >= 1")
+    return ThreadBudget(n_jobs=jobs, threads_per_job=per_job, total_threads=total)
+
+
+def concurrent_fits(runner_cfg: dict[str, Any]) -> int:
+    fits = int(runner_cfg.get("concurrent_fits", 1) or 1)
+    if fits < 1:
+        raise ValueError("runner.concurrent_fits must be >= 1")
+    return fits
+
+
+def fit_threads(n_threads: int | None, fits: int) -> int | None:
+    # Each of `fits` concurrent boosters gets an equal slice of the worker's thread budget.
+    if n_threads is None:
+        return None
+    return max(int(n_threads) // max(int(fits), 1), 1)
+
+
+def thread_env(threads: int) -> dict[str, str]:
+    return {name: str(int(threads)) for name in _THREAD_ENV_VARS}
+
+
+def apply_thread_limits(threads: int | None) -> dict[str, Any]:
+    global _applied_threads, _threadpool_limiter
+
+    if threads is not None and threads != _applied_threads:
+        # Env vars cover libraries initialized later; threadpoolctl covers pools already loaded.
+        os.environ.update(thread_env(threads))
+        if _HAVE_THREADPOOLCTL:
+            _threadpool_limiter = threadpool_limits(limits=int(threads))  # type: ignore[misc]
+        _applied_threads = int(threads)
+    return worker_thread_info(threads)
+
+
+def worker_thread_info(threads: int | None) -> dict[str, Any]:
+    pools = []
+    if _HAVE_THREADPOOLCTL:
+        pools = [
+            {"internal_api": p.get("internal_api"), "prefix": p.get("prefix"), "num_threads": p.get("num_threads")}
+            for p in threadpool_info()  # type: ignore[misc]
+        ]
+    return {
+        "pid": os.getpid(),
+        "xgb_n_jobs": threads,
+        "env": {name: os.environ.get(name) for name in _THREAD_ENV_VARS},
+        "threadpools": pools,
+    }
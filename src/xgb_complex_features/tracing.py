@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator, TypeVar
+
+from xgb_complex_features.utils import write_json
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+TRACE_DIRNAME = "trace"
+CHROME_TRACE_NAME = "trace.json"
+
+# Per-process state: workers configure tracing themselves, since loky processes are reused.
+_trace_dir: Path | None = None
+_trace_file: Any = None
+_trace_pid: int | None = None
+_lock = threading.Lock()
+_context = threading.local()
+
+
+def configure_tracing(trace_dir: str | Path | None) -> None:
+    global _trace_dir, _trace_file, _trace_pid
+
+    new_dir = Path(trace_dir) if trace_dir is not None else None
+    if new_dir == _trace_dir and _trace_pid == os.getpid():
+        return
+    with _lock:
+        if _trace_file is not None and _trace_pid == os.getpid():
+            _trace_file.close()
+        _trace_file = None
+        _trace_dir = new_dir
+        _trace_pid = os.getpid()
+        if new_dir is not None:
+            new_dir.mkdir(parents=True, exist_ok=True)
+            _trace_file = (new_dir / f"spans-{os.getpid()}.jsonl").open("a", encoding="utf-8", buffering=1)
+
+
+def tracing_dir() -> Path | None:
+    return _trace_dir if _trace_pid == os.getpid() else None
+
+
+@contextmanager
+def trace_context(**attrs: Any) -> Iterator[None]:
+    # Attributes (e.g. spec_id) attached to every span opened on this thread inside the block.
+    previous = getattr(_context, "attrs", {})
+    _context.attrs = {**previous, **attrs}
+    try:
+        yield
+    finally:
+        _context.attrs = previous
+
+
+def _emit(record: dict[str, Any]) -> None:
+    with _lock:
+        if _trace_file is not None:
+            _trace_file.write(json.dumps(record, default=str) + "\n")
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[None]:
+    if _trace_file is None or _trace_pid != os.getpid():
+        yield
+        return
+    start_us = time.time_ns() // 1000
+    error = None
+    try:
+        yield
+    except BaseException as exc:
+        error = type(exc).__name__
+        raise
+    finally:
+        record = {
+            "name": name,
+            "pid": os.getpid(),
+            "tid": threading.get_native_id(),
+            "start_us": start_us,
+            "end_us": time.time_ns() // 1000,
+            **getattr(_context, "attrs", {}),
+            **attrs,
+        }
+        if error is not None:
+            record["error"] = error
+        _emit(record)
+
+
+def traced(fn: F) -> F:
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if _trace_file is None:
+            return fn(*args, **kwargs)
+        with span(fn.__name__):
+            return fn(*args, **kwargs)
+
+    return wrapper  # type: ignore[return-value]
+
+
+def read_spans(trace_dir: str | Path) -> list[dict[str, Any]]:
+    spans = []
+    for path in sorted(Path(trace_dir).glob("spans-*.jsonl")):
+        with path.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    spans.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue  # Truncated last line of a killed worker.
+    return spans
+
+
+def write_chrome_trace(trace_dir: str | Path, output_path: str | Path | None = None) -> Path:
+    trace_dir = Path(trace_dir)
+    out = Path(output_path) if output_path is not None else trace_dir.parent / CHROME_TRACE_NAME
+    spans = read_spans(trace_dir)
+    t0 = min((s["start_us"] for s in spans), default=0)
+    reserved = {"name", "pid", "tid", "start_us", "end_us"}
+
+    # Complete ("X") events, viewable in chrome://tracing or ui.perfetto.dev.
+    events: list[dict[str, Any]] = [
+        {
+            "name": s["name"],
+            "cat": "stage",
+            "ph": "X",
+            "ts": s["start_us"] - t0,
+            "dur": s["end_us"] - s["start_us"],
+            "pid": s["pid"],
+            "tid": s["tid"],
+            "args": {k: v for k, v in s.items() if k not in reserved},
+        }
+        for s in spans
+    ]
+    for pid in sorted({s["pid"] for s in spans}):
+        events.append({"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": f"worker {pid}"}})
+    write_json(out, {"traceEvents": events, "displayTimeUnit": "ms"})
+    return out
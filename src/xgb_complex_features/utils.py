@@ -2,17 +2,28 @@ from __future__ import annotations
 
 import hashlib
 import json
+import sys
 from pathlib import Path
 from typing import Any
 
 import numpy as np
 
+try:
+    import resource
+except ImportError:  # pragma: no cover (Windows)
+    resource = None  # type: ignore[assignment]
+
 
 def stable_int_hash(text: str) -> int:
     h = hashlib.md5(text.encode("utf-8")).hexdigest()
     return int(h[:8], 16)
 
 
+def stable_hash(obj: Any) -> str:
+    text = json.dumps(obj, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
 def make_rng(*parts: Any) -> np.random.Generator:
     seeds = []
     for p in parts:
@@ -35,3 +46,12 @@ def write_json(path: str | Path, obj: Any) -> None:
     p.parent.mkdir(parents=True, exist_ok=True)
     with p.open("w", encoding="utf-8") as f:
         json.dump(obj, f, indent=2, sort_keys=True, default=str)
+
+
+def peak_rss_mb() -> float | None:
+    # High-water mark of this process; loky workers are reused, so it covers earlier tasks too.
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux.
+    return float(peak) / (1024**2 if sys.platform == "darwin" else 1024)
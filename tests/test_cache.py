@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import copy
+
+from xgb_complex_features.runner.cache import ResultCache, cell_key, model_key
+from xgb_complex_features.runner.grid import iter_dataset_specs
+
+CFG = {
+    "data": {
+        "d_total": 20,
+        "d_signal_max": 10,
+        "correlation": {"block_size": 5, "n_blocked_features": 10},
+        "marginals": {"kind": "lognormal"},
+    },
+    "tasks": [{"id": "l4_ratio_x_ratio", "level": 4, "kind": "ratio_x_ratio"}],
+    "label": {"target_prevalence": 0.1, "sigma_eps": 0.5, "a": 2.0, "component_weight": 1.0},
+    "regimes": [{"id": "ln", "family": "tail_corr", "sigma": 0.7, "rho": 0.5}],
+    "n_values": [1000],
+    "seeds": [0],
+    "splits": {"train": 0.6, "val": 0.2, "test": 0.2},
+    "oracle_modes": ["raw_only"],
+    "xgb_configs": [{"id": "d2", "params": {"n_estimators": 10, "max_depth": 2, "tree_method": "hist"}}],
+    "diagnostics": {"invariance": {"n_diag": 20, "m_c": 2}},
+    "runner": {"n_jobs": 1},
+    "output": {"base_dir": "runs"},
+}
+
+
+def _cell_key(cfg, root_seed=0):
+    spec = next(iter_dataset_specs(cfg))
+    return cell_key(cfg=cfg, spec=spec, xgb_cfg=cfg["xgb_configs"][0], oracle_mode="raw_only", root_seed=root_seed)
+
+
+def _with(path, value):
+    cfg = copy.deepcopy(CFG)
+    node = cfg
+    for part in path[:-1]:
+        node = node.setdefault(part, {})
+    node[path[-1]] = value
+    return cfg
+
+
+def test_cell_key_ignores_execution_settings():
+    key = _cell_key(CFG)
+    for path, value in [
+        (("runner", "n_jobs"), 8),
+        (("runner", "scheduler"), "cells"),
+        (("output", "base_dir"), "elsewhere"),
+        (("output", "cache_dir"), "cache"),
+        (("model", "engine"), "native"),
+        (("model", "share_quantiles"), False),
+        (("metrics", "ci"), 0.9),
+    ]:
+        assert _cell_key(_with(path, value)) == key, path
+
+
+def test_cell_key_tracks_result_inputs():
+    key = _cell_key(CFG)
+    for path, value in [
+        (("data", "d_total"), 30),
+        (("label", "sigma_eps"), 0.4),
+        (("splits", "train"), 0.7),
+        (("diagnostics", "invariance"), {"n_diag": 10, "m_c": 2}),
+        (("metrics", "bootstrap"), 20),
+        (("xgb_configs",), [{"id": "d2", "params": {"n_estimators": 20, "max_depth": 2, "tree_method": "hist"}}]),
+    ]:
+        assert _cell_key(_with(path, value)) != key, path
+    assert _cell_key(CFG, root_seed=1) != key
+
+
+def test_result_cache_round_trip(tmp_path):
+    cache = ResultCache(tmp_path)
+    key = _cell_key(CFG)
+    assert not cache.contains(key) and cache.get(key) is None
+    cache.put(key, {"prauc": 0.5, "n": 1000})
+    assert cache.contains(key)
+    assert cache.get(key) == {"prauc": 0.5, "n": 1000}
+    assert [p.name for p in tmp_path.rglob("*")] == [key[:2], f"{key}.json"]
+
+
+def _model_key(cfg):
+    spec = next(iter_dataset_specs(cfg))
+    return model_key(cfg=cfg, spec=spec, xgb_cfg=cfg["xgb_configs"][0], oracle_mode="raw_only", root_seed=0)
+
+
+def test_model_key_ignores_scoring_settings():
+    key = _model_key(CFG)
+    for path, value in [
+        (("diagnostics", "invariance"), {"n_diag": 10, "m_c": 2}),
+        (("metrics", "bootstrap"), 20),
+        (("model", "curve_iterations"), [5, 10]),
+        (("shift_sweep",), {"types": ["naive"], "c": [2.0]}),
+        (("runner", "n_jobs"), 8),
+    ]:
+        assert _model_key(_with(path, value)) == key, path
+    assert _model_key(_with(("label", "sigma_eps"), 0.4)) != key
+    assert key != _cell_key(CFG)
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from xgb_complex_features.dgp.dataset import generate_dataset
+from xgb_complex_features.dgp.stream import generate_streaming_dataset
+
+TASK = {"id": "l4_ratio_x_ratio", "level": 4, "kind": "ratio_x_ratio"}
+REGIME = {"id": "ln", "family": "tail_corr", "sigma": 0.7, "rho": 0.5}
+DATA = {
+    "d_total": 24,
+    "d_signal_max": 10,
+    "distractors": {"n_duplicates": 4},
+    "correlation": {"block_size": 5, "n_blocked_features": 10},
+    "marginals": {"kind": "lognormal"},
+}
+LABEL = {"target_prevalence": 0.1, "sigma_eps": 0.5, "a": 2.0, "component_weight": 1.0}
+SPLITS = {"train": 0.6, "val": 0.2, "test": 0.2}
+
+
+def _generate(data_cfg, regime=REGIME):
+    return generate_dataset(
+        n=2500, seed=3, task_cfg=TASK, regime_cfg=regime, data_cfg=data_cfg, label_cfg=LABEL, splits_cfg=SPLITS
+    )
+
+
+@pytest.mark.parametrize("regime", [REGIME, {**REGIME, "shift": {"type": "naive", "c": 5.0}}])
+def test_chunked_output_ignores_threads_and_memmap(tmp_path, regime):
+    base = _generate({**DATA, "chunk_rows": 600}, regime)
+    memmap = {"memmap_dir": str(tmp_path)}
+    for extra in ({"generation_threads": 3}, memmap, {"generation_threads": 2, **memmap}):
+        other = _generate({**DATA, "chunk_rows": 600, **extra}, regime)
+        np.testing.assert_array_equal(np.asarray(other.x_raw), np.asarray(base.x_raw))
+        np.testing.assert_array_equal(other.y, base.y)
+        np.testing.assert_array_equal(other.p_true, base.p_true)
+        np.testing.assert_array_equal(other.splits.test, base.splits.test)
+        assert other.beta0 == base.beta0
+
+
+def test_streamed_chunks_match_chunked_rows():
+    ds = _generate({**DATA, "chunk_rows": 600})
+    stream = generate_streaming_dataset(
+        n=2500,
+        seed=3,
+        task_cfg=TASK,
+        regime_cfg=REGIME,
+        data_cfg={**DATA, "stream": {"chunk_rows": 600, "pilot_rows": 500}},
+        label_cfg=LABEL,
+        splits_cfg=SPLITS,
+    )
+    assert stream.metadata["duplicate_sources"] == ds.metadata["duplicate_sources"]
+    for k in range(stream.n_chunks):
+        rows = slice(600 * k, min(600 * (k + 1), 2500))
+        np.testing.assert_array_equal(stream.chunk(k).x_raw, ds.x_raw[rows])
+        np.testing.assert_array_equal(
+            stream._chunk_rng(k, "noise").normal(0.0, LABEL["sigma_eps"], rows.stop - rows.start), ds.eps_noise[rows]
+        )
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from xgb_complex_features.dgp import dataset
+from xgb_complex_features.dgp.dataset import generate_dataset
+
+TASKS = [{"id": "l1_ratio", "level": 1, "kind": "ratio"}, {"id": "l1_product", "level": 1, "kind": "product"}]
+REGIMES = [
+    {"id": "ln07", "family": "tail_corr", "sigma": 0.7, "rho": 0.5},
+    {"id": "ln12", "family": "tail_corr", "sigma": 1.2, "rho": 0.5},
+]
+DATA = {
+    "d_total": 24,
+    "d_signal_max": 10,
+    "distractors": {"n_duplicates": 4},
+    "correlation": {"block_size": 5, "n_blocked_features": 10},
+    "marginals": {"kind": "lognormal"},
+    "common_random_numbers": True,
+}
+
+
+@pytest.fixture(autouse=True)
+def _empty_caches():
+    for cache in (dataset._COMMON_LATENTS, dataset._COMMON_FEATURES):
+        cache._items.clear()
+    yield
+    for cache in (dataset._COMMON_LATENTS, dataset._COMMON_FEATURES):
+        cache._items.clear()
+
+
+def _generate(task, regime, data_cfg=DATA):
+    return generate_dataset(
+        n=1500,
+        seed=6,
+        task_cfg=task,
+        regime_cfg=regime,
+        data_cfg=data_cfg,
+        label_cfg={"target_prevalence": 0.1, "sigma_eps": 0.5},
+        splits_cfg={"train": 0.6, "val": 0.2, "test": 0.2},
+    )
+
+
+def test_tasks_of_a_regime_share_features():
+    a, b = (_generate(task, REGIMES[0]) for task in TASKS)
+    np.testing.assert_array_equal(a.x_raw, b.x_raw)
+    assert not np.array_equal(a.y, b.y)
+
+
+def test_sigma_regimes_share_the_latent():
+    lo, hi = (np.log(_generate(TASKS[0], regime).x_raw[:, :20].astype(np.float64)) for regime in REGIMES)
+    np.testing.assert_allclose(lo / 0.7, hi / 1.2, atol=1e-5)
+
+
+def test_features_do_not_depend_on_generation_order():
+    first = _generate(TASKS[0], REGIMES[1]).x_raw.copy()
+    for cache in (dataset._COMMON_LATENTS, dataset._COMMON_FEATURES):
+        cache._items.clear()
+    _generate(TASKS[0], REGIMES[0])
+    _generate(TASKS[1], REGIMES[0])
+    np.testing.assert_array_equal(_generate(TASKS[1], REGIMES[1]).x_raw, first)
+    # Switching CRN off draws the features per dataset again.
+    assert not np.array_equal(_generate(TASKS[0], REGIMES[1], {**DATA, "common_random_numbers": False}).x_raw, first)
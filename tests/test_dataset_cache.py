@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import copy
+import os
+
+import numpy as np
+
+from xgb_complex_features.dgp.store import DatasetCache
+from xgb_complex_features.runner import cells
+from xgb_complex_features.runner.cache import dataset_key
+from xgb_complex_features.runner.grid import iter_dataset_specs
+
+CFG = {
+    "data": {
+        "d_total": 20,
+        "d_signal_max": 10,
+        "correlation": {"block_size": 5, "n_blocked_features": 10},
+        "marginals": {"kind": "lognormal"},
+    },
+    "tasks": [{"id": "l4_ratio_x_ratio", "level": 4, "kind": "ratio_x_ratio"}],
+    "label": {"target_prevalence": 0.1, "sigma_eps": 0.5, "a": 2.0, "component_weight": 1.0},
+    "regimes": [{"id": "ln", "family": "tail_corr", "sigma": 0.7, "rho": 0.5}],
+    "n_values": [1000],
+    "seeds": [0, 1],
+    "splits": {"train": 0.6, "val": 0.2, "test": 0.2},
+    "oracle_modes": ["raw_only"],
+    "xgb_configs": [{"id": "d2", "params": {"n_estimators": 10, "max_depth": 2, "tree_method": "hist"}}],
+}
+
+
+def _key(cfg, root_seed=0, i=0):
+    return dataset_key(cfg=cfg, spec=list(iter_dataset_specs(cfg))[i], root_seed=root_seed)
+
+
+def test_dataset_key_ignores_layout_settings():
+    key = _key(CFG)
+    for name, value in [
+        ("memmap_dir", "/tmp/scratch"),
+        ("generation_threads", 4),
+        ("stream", {"min_n": 10**9}),
+    ]:
+        cfg = copy.deepcopy(CFG)
+        cfg["data"][name] = value
+        assert _key(cfg) == key, name
+    for section, name, value in [("data", "d_total", 30), ("label", "sigma_eps", 0.4), ("splits", "train", 0.7)]:
+        cfg = copy.deepcopy(CFG)
+        cfg[section][name] = value
+        assert _key(cfg) != key, name
+    # The dataset seed is root_seed + spec.seed.
+    assert _key(CFG, root_seed=1, i=0) == _key(CFG, root_seed=0, i=1)
+    assert _key(CFG, i=1) != key
+
+
+def test_cached_dataset_equals_generated(tmp_path):
+    cfg = copy.deepcopy(CFG)
+    cfg["output"] = {"dataset_cache_dir": str(tmp_path)}
+    spec = next(iter_dataset_specs(cfg))
+    generated = cells.generate_spec_dataset(cfg=cfg, spec=spec, root_seed=0)
+    cached = cells.generate_spec_dataset(cfg=cfg, spec=spec, root_seed=0)
+    assert isinstance(cached.x_raw, np.memmap)
+    np.testing.assert_array_equal(cached.x_raw, generated.x_raw)
+    np.testing.assert_array_equal(cached.y, generated.y)
+    np.testing.assert_array_equal(cached.p_true, generated.p_true)
+    np.testing.assert_array_equal(cached.splits.test, generated.splits.test)
+    assert cached.beta0 == generated.beta0
+
+
+def test_eviction_keeps_recent_entries(tmp_path):
+    spec = next(iter_dataset_specs(CFG))
+    ds = cells.generate_spec_dataset(cfg=CFG, spec=spec, root_seed=0)
+    cache = DatasetCache(tmp_path)
+    for i, key in enumerate(["aa1", "bb2", "cc3"]):
+        cache.put(key, ds)
+        os.utime(tmp_path / key[:2] / key, (i, i))
+    assert cache.get("aa1") is not None  # touched: now the most recent
+
+    cache.max_bytes = 2 * sum(f.stat().st_size for f in (tmp_path / "aa" / "aa1").iterdir())
+    cache.evict()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["aa", "cc"]
+    assert cache.get("bb2") is None and cache.get("cc3") is not None
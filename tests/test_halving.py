@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import copy
+
+from xgb_complex_features.runner.cells import generate_spec_dataset, grid_cells, run_cells
+from xgb_complex_features.runner.grid import iter_dataset_specs
+
+CFG = {
+    "experiment": {"root_seed": 3},
+    "data": {
+        "d_total": 20,
+        "d_signal_max": 10,
+        "correlation": {"block_size": 5, "n_blocked_features": 10},
+        "marginals": {"kind": "lognormal"},
+    },
+    "tasks": [{"id": "l4_ratio_x_ratio", "level": 4, "kind": "ratio_x_ratio"}],
+    "label": {"target_prevalence": 0.1, "sigma_eps": 0.5, "a": 2.0, "component_weight": 1.0},
+    "regimes": [{"id": "ln", "family": "tail_corr", "sigma": 0.7, "rho": 0.5}],
+    "n_values": [2000],
+    "seeds": [0],
+    "splits": {"train": 0.6, "val": 0.2, "test": 0.2},
+    "oracle_modes": ["raw_only"],
+    "model": {"engine": "native"},
+    "xgb_configs": [
+        {
+            "id": f"d{depth}",
+            "params": {
+                "n_estimators": 40,
+                "learning_rate": 0.2,
+                "max_depth": depth,
+                "subsample": 0.6,
+                "colsample_bytree": 0.7,
+                "tree_method": "hist",
+                "n_jobs": 1,
+                "eval_metric": "logloss",
+                "early_stopping_rounds": 5,
+            },
+        }
+        for depth in (2, 3, 4)
+    ],
+    "diagnostics": {"invariance": {"n_diag": 20, "m_c": 2}, "iso_variance": {"n_base": 5, "m": 2}},
+}
+
+_COMPARED = ("best_iteration", "best_score", "prauc", "rocauc", "logloss")
+
+
+def _rows(cfg):
+    spec = next(iter_dataset_specs(cfg))
+    ds = generate_spec_dataset(cfg=cfg, spec=spec, root_seed=3)
+    rows = run_cells(ds=ds, cfg=cfg, spec=spec, cells=grid_cells(cfg), root_seed=3, n_threads=1)
+    return {row["xgb_config_id"]: row for row in rows}
+
+
+def test_stochastic_survivor_matches_native_grid_fit():
+    halving_cfg = copy.deepcopy(CFG)
+    halving_cfg["runner"] = {"config_search": "successive_halving", "halving": {"min_rounds": 3, "eta": 2}}
+    halved = _rows(halving_cfg)
+    grid = _rows(CFG)
+
+    survivors = [config_id for config_id, row in halved.items() if row["search_status"] == "finished"]
+    assert survivors
+    for config_id in survivors:
+        for col in _COMPARED:
+            assert halved[config_id][col] == grid[config_id][col], (config_id, col)
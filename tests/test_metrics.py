@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from sklearn.metrics import average_precision_score, log_loss, roc_auc_score
+
+from xgb_complex_features.models.metrics import binary_metrics, bootstrap_metrics
+
+
+def _scores(n: int, seed: int, *, ties: bool) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    y = (rng.random(n) < 0.1).astype(np.int64)
+    p = 1.0 / (1.0 + np.exp(-(rng.normal(size=n) + 1.5 * y - 2.0)))
+    if ties:
+        p = np.round(p, 2)
+    return y, p
+
+
+@pytest.mark.parametrize("ties", [False, True])
+def test_binary_metrics_match_sklearn(ties):
+    y, p = _scores(5000, 0, ties=ties)
+    metrics = binary_metrics(y, p)
+    assert metrics["prauc"] == pytest.approx(average_precision_score(y, p), rel=1e-12)
+    assert metrics["rocauc"] == pytest.approx(roc_auc_score(y, p), rel=1e-12)
+    assert metrics["logloss"] == pytest.approx(log_loss(y, p), rel=1e-12)
+
+
+def test_bootstrap_batches_give_the_same_ci():
+    y, p = _scores(3000, 1, ties=True)
+    results = [
+        bootstrap_metrics(y, p, n_boot=50, ci=0.9, rng=np.random.default_rng(7), batch=batch)
+        for batch in (50, 16, 7, 1)
+    ]
+    for out in results[1:]:
+        assert out.keys() == results[0].keys()
+        for name, value in out.items():
+            assert value == pytest.approx(results[0][name], rel=1e-12), name
+    assert results[0]["prauc_ci_lo"] < binary_metrics(y, p)["prauc"] < results[0]["prauc_ci_hi"]
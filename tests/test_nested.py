@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import copy
+
+import pandas as pd
+import pytest
+import yaml
+
+from xgb_complex_features.runner import cells, execute, scheduler
+from xgb_complex_features.runner.grid import iter_dataset_specs, nested_groups
+
+CFG = {
+    "experiment": {"root_seed": 1},
+    "data": {
+        "d_total": 20,
+        "d_signal_max": 10,
+        "correlation": {"block_size": 5, "n_blocked_features": 10},
+        "marginals": {"kind": "lognormal"},
+    },
+    "tasks": [{"id": "l4_ratio_x_ratio", "level": 4, "kind": "ratio_x_ratio"}],
+    "label": {"target_prevalence": 0.1, "sigma_eps": 0.5, "a": 2.0, "component_weight": 1.0},
+    "regimes": [{"id": "ln", "family": "tail_corr", "sigma": 0.7, "rho": 0.5}],
+    "n_values": [400, 800, 1600],
+    "sample_complexity": "nested",
+    "seeds": [0],
+    "splits": {"train": 0.6, "val": 0.2, "test": 0.2},
+    "oracle_modes": ["raw_only"],
+    "xgb_configs": [
+        {
+            "id": "d2",
+            "params": {"n_estimators": 10, "max_depth": 2, "tree_method": "hist", "n_jobs": 1, "eval_metric": "aucpr"},
+        }
+    ],
+    "diagnostics": {"invariance": {"n_diag": 20, "m_c": 2}, "iso_variance": {"n_base": 5, "m": 2}},
+}
+
+
+def test_nested_group_generates_once(monkeypatch):
+    calls = []
+    generate_dataset = cells.generate_dataset
+
+    def _counting(**kwargs):
+        calls.append(kwargs["n"])
+        return generate_dataset(**kwargs)
+
+    monkeypatch.setattr(cells, "generate_dataset", _counting)
+    specs = list(iter_dataset_specs(CFG))
+    pending = [(i, cells.grid_cells(CFG)) for i in range(len(specs))]
+    groups = nested_groups(pending, specs)
+    assert len(groups) == 1
+
+    results, _ = execute._run_nested_group(
+        group=groups[0], cfg=CFG, specs=specs, root_seed=1, cache_dir=None, n_threads=1
+    )
+    assert calls == [1600]
+    assert sorted(rows[0]["n"] for _, rows, _ in results) == [400, 800, 1600]
+
+
+def test_schedulers_generate_once_per_nested_group():
+    specs = list(iter_dataset_specs(CFG))
+    pending = [(i, cells.grid_cells(CFG)) for i in range(len(specs))]
+    generations = scheduler._generations(CFG, pending, specs)
+    assert [(spec.n, len(group)) for spec, group in generations] == [(1600, 3)]
+
+
+@pytest.mark.parametrize("name", ["cells", "pipeline"])
+def test_schedulers_match_dataset_scheduler(tmp_path, name):
+    frames = {}
+    for sched in ("dataset", name):
+        cfg = copy.deepcopy(CFG)
+        cfg["runner"] = {"n_jobs": 1, "scheduler": sched, "scratch_dir": str(tmp_path / "scratch")}
+        cfg["output"] = {"base_dir": str(tmp_path / sched), "formats": ["parquet"]}
+        config_path = tmp_path / f"{sched}.yaml"
+        config_path.write_text(yaml.safe_dump(cfg))
+        run_dir = execute.run_experiment(config_path=str(config_path))
+        frames[sched] = pd.read_parquet(run_dir / "results.parquet").sort_values("n").reset_index(drop=True)
+    cols = ["n", "nested_n_max", "best_iteration", "prauc", "rocauc", "logloss", "prevalence_train"]
+    pd.testing.assert_frame_equal(frames["dataset"][cols], frames[name][cols])
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import copy
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from xgb_complex_features.runner.artifacts import ArtifactStore
+from xgb_complex_features.runner.execute import run_experiment
+from xgb_complex_features.runner.offline import rediagnose_run, remetric_run
+
+CFG = {
+    "experiment": {"root_seed": 4},
+    "data": {
+        "d_total": 20,
+        "d_signal_max": 10,
+        "correlation": {"block_size": 5, "n_blocked_features": 10},
+        "marginals": {"kind": "lognormal"},
+    },
+    "tasks": [{"id": "l4_ratio_x_ratio", "level": 4, "kind": "ratio_x_ratio"}],
+    "label": {"target_prevalence": 0.1, "sigma_eps": 0.5, "a": 2.0, "component_weight": 1.0},
+    "regimes": [{"id": "ln", "family": "tail_corr", "sigma": 0.7, "rho": 0.5}],
+    "n_values": [1000],
+    "seeds": [0, 1],
+    "splits": {"train": 0.6, "val": 0.2, "test": 0.2},
+    "oracle_modes": ["raw_only", "oracle_s_only"],
+    "metrics": {"bootstrap": 20, "ci": 0.9},
+    "xgb_configs": [
+        {"id": "d2", "params": {"n_estimators": 10, "max_depth": 2, "tree_method": "hist", "n_jobs": 1}},
+    ],
+    "diagnostics": {"invariance": {"n_diag": 20, "m_c": 2}, "iso_variance": {"n_base": 5, "m": 2}},
+    "runner": {"n_jobs": 1},
+}
+
+
+def _run(tmp_path):
+    cfg = copy.deepcopy(CFG)
+    cfg["output"] = {
+        "base_dir": str(tmp_path / "runs"),
+        "artifacts_dir": str(tmp_path / "artifacts"),
+        "formats": ["parquet"],
+    }
+    config_path = tmp_path / "cfg.yaml"
+    config_path.write_text(yaml.safe_dump(cfg))
+    run_dir = run_experiment(config_path=str(config_path))
+    return run_dir, pd.read_parquet(run_dir / "results.parquet")
+
+
+def _compared(df, like):
+    cols = [c for c in df.columns if any(part in c for part in like) and not c.startswith("time_")]
+    assert cols
+    return df[cols].reset_index(drop=True)
+
+
+def test_remetric_reproduces_online_metrics(tmp_path):
+    run_dir, before = _run(tmp_path)
+    remetric_run(run_dir=str(run_dir), n_jobs=2)
+    after = pd.read_parquet(run_dir / "results.parquet")
+    pd.testing.assert_frame_equal(_compared(before, ("prauc", "rocauc", "logloss")), _compared(after, ("prauc", "rocauc", "logloss")))
+
+
+def test_rediagnose_reproduces_online_diagnostics(tmp_path):
+    run_dir, before = _run(tmp_path)
+    rediagnose_run(run_dir=str(run_dir), n_jobs=1)
+    after = pd.read_parquet(run_dir / "results.parquet")
+    pd.testing.assert_frame_equal(_compared(before, ("invariance", "iso_var")), _compared(after, ("invariance", "iso_var")))
+
+
+def test_artifacts_keep_float64_predictions(tmp_path):
+    _run(tmp_path)
+    store = ArtifactStore(tmp_path / "artifacts")
+    keys = [path.name for path in store.root.glob("*/*")]
+    assert len(keys) == 4
+    p_test, y_test = store.load_predictions(keys[0])
+    assert p_test.dtype == np.float64 and p_test.shape == y_test.shape
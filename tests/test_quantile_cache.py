@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import copy
+
+import pytest
+
+from xgb_complex_features.runner.cells import generate_spec_dataset, grid_cells, run_cells
+from xgb_complex_features.runner.grid import iter_dataset_specs
+
+CFG = {
+    "experiment": {"root_seed": 5},
+    "data": {
+        "d_total": 20,
+        "d_signal_max": 10,
+        "correlation": {"block_size": 5, "n_blocked_features": 10},
+        "marginals": {"kind": "lognormal"},
+    },
+    "tasks": [{"id": "l4_ratio_x_ratio", "level": 4, "kind": "ratio_x_ratio"}],
+    "label": {"target_prevalence": 0.1, "sigma_eps": 0.5, "a": 2.0, "component_weight": 1.0},
+    "regimes": [{"id": "ln", "family": "tail_corr", "sigma": 0.7, "rho": 0.5}],
+    "n_values": [1000],
+    "seeds": [0],
+    "splits": {"train": 0.6, "val": 0.2, "test": 0.2},
+    "oracle_modes": ["raw_only", "oracle_s_only"],
+    "xgb_configs": [
+        {
+            "id": tree_method,
+            "params": {
+                "n_estimators": 10,
+                "max_depth": 3,
+                "tree_method": tree_method,
+                "n_jobs": 1,
+                "eval_metric": "aucpr",
+                "early_stopping_rounds": 5,
+            },
+        }
+        for tree_method in ("hist", "exact", "approx")
+    ],
+    "diagnostics": {"invariance": {"n_diag": 20, "m_c": 2}, "iso_variance": {"n_base": 5, "m": 2}},
+}
+
+_COMPARED = ("best_iteration", "best_score", "prauc", "rocauc", "logloss")
+
+
+def _rows(cfg):
+    spec = next(iter_dataset_specs(cfg))
+    ds = generate_spec_dataset(cfg=cfg, spec=spec, root_seed=5)
+    rows = run_cells(ds=ds, cfg=cfg, spec=spec, cells=grid_cells(cfg), root_seed=5, n_threads=1)
+    return {(row["xgb_config_id"], row["oracle_mode"]): row for row in rows}
+
+
+@pytest.mark.parametrize("engine", ["sklearn", "native"])
+def test_mixed_tree_methods_share_only_hist_matrices(engine):
+    shared_cfg = copy.deepcopy(CFG)
+    shared_cfg["model"] = {"engine": engine, "share_quantiles": True}
+    plain_cfg = copy.deepcopy(CFG)
+    plain_cfg["model"] = {"engine": engine, "share_quantiles": False}
+    shared = _rows(shared_cfg)
+    plain = _rows(plain_cfg)
+
+    assert shared.keys() == plain.keys()
+    for key, row in plain.items():
+        for col in _COMPARED:
+            assert shared[key][col] == row[col], (key, col)
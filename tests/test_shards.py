@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import json
+
+import pandas as pd
+import yaml
+
+from xgb_complex_features.runner.execute import run_experiment
+from xgb_complex_features.runner.shards import MANIFEST_NAME, SHARD_DIRNAME, ShardWriter, read_manifest, read_shards
+
+CFG = {
+    "experiment": {"root_seed": 5},
+    "data": {
+        "d_total": 20,
+        "d_signal_max": 10,
+        "correlation": {"block_size": 5, "n_blocked_features": 10},
+        "marginals": {"kind": "lognormal"},
+    },
+    "tasks": [{"id": "l4_ratio_x_ratio", "level": 4, "kind": "ratio_x_ratio"}],
+    "label": {"target_prevalence": 0.1, "sigma_eps": 0.5, "a": 2.0, "component_weight": 1.0},
+    "regimes": [{"id": "ln", "family": "tail_corr", "sigma": 0.7, "rho": 0.5}],
+    "n_values": [800],
+    "seeds": [0, 1, 2],
+    "splits": {"train": 0.6, "val": 0.2, "test": 0.2},
+    "oracle_modes": ["raw_only"],
+    "xgb_configs": [
+        {"id": "d2", "params": {"n_estimators": 10, "max_depth": 2, "tree_method": "hist", "n_jobs": 1}},
+    ],
+    "diagnostics": {"invariance": {"n_diag": 20, "m_c": 2}, "iso_variance": {"n_base": 5, "m": 2}},
+    "runner": {"n_jobs": 1},
+}
+
+
+def test_truncated_manifest_line_is_skipped_and_terminated(tmp_path):
+    shards = ShardWriter(tmp_path)
+    shards.write("a", [{"x": 1}], duration_seconds=1.0)
+    shards.write("b", [{"x": 2}], duration_seconds=1.0)
+    manifest = tmp_path / SHARD_DIRNAME / MANIFEST_NAME
+    text = manifest.read_text()
+    manifest.write_text(text[: len(text) - 10])
+    assert [e["spec_id"] for e in read_manifest(manifest.parent)] == ["a"]
+
+    shards = ShardWriter(tmp_path)
+    shards.write("c", [{"x": 3}], duration_seconds=None)
+    assert list(shards.finished()) == ["a", "c"]
+    assert read_shards(shards.shard_dir, ["c", "b", "a"])["x"].tolist() == [3, 1]
+
+
+def test_resume_reruns_only_unfinished_specs(tmp_path):
+    cfg = {**CFG, "output": {"base_dir": str(tmp_path / "runs"), "formats": ["parquet"]}}
+    config_path = tmp_path / "cfg.yaml"
+    config_path.write_text(yaml.safe_dump(cfg))
+    run_dir = run_experiment(config_path=str(config_path))
+    full = pd.read_parquet(run_dir / "results.parquet")
+
+    # Simulate a run killed while appending the last spec's manifest line.
+    manifest = run_dir / SHARD_DIRNAME / MANIFEST_NAME
+    lines = manifest.read_text().splitlines()
+    manifest.write_text("\n".join(lines[:-1]) + "\n" + lines[-1][:20])
+    (run_dir / "results.parquet").unlink()
+
+    assert run_experiment(resume_dir=str(run_dir)) == run_dir
+    meta = json.loads((run_dir / "run_metadata.json").read_text())
+    assert meta["resumed"] and meta["n_resumed_specs"] == 2
+    resumed = pd.read_parquet(run_dir / "results.parquet")
+    cols = ["seed", "prauc", "rocauc", "logloss", "best_iteration"]
+    pd.testing.assert_frame_equal(full[cols], resumed[cols])
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import json
+
+import pandas as pd
+
+from xgb_complex_features.runner.cells import generate_spec_dataset, grid_cells, run_cells
+from xgb_complex_features.runner.grid import iter_dataset_specs
+from xgb_complex_features.runner.shifts import shift_sweep_table
+
+CFG = {
+    "experiment": {"root_seed": 2},
+    "data": {
+        "d_total": 20,
+        "d_signal_max": 10,
+        "correlation": {"block_size": 5, "n_blocked_features": 10},
+        "marginals": {"kind": "lognormal"},
+    },
+    "tasks": [{"id": "l4_ratio_x_ratio", "level": 4, "kind": "ratio_x_ratio"}],
+    "label": {"target_prevalence": 0.1, "sigma_eps": 0.5, "a": 2.0, "component_weight": 1.0},
+    "regimes": [{"id": "ln", "family": "tail_corr", "sigma": 0.7, "rho": 0.5}],
+    "n_values": [1500],
+    "seeds": [0],
+    "splits": {"train": 0.6, "val": 0.2, "test": 0.2},
+    "oracle_modes": ["raw_only", "oracle_s_only"],
+    "shift_sweep": {"types": ["preserve", "naive"], "c": [2.0, 5.0]},
+    "xgb_configs": [
+        {"id": "d2", "params": {"n_estimators": 10, "max_depth": 2, "tree_method": "hist", "n_jobs": 1}},
+    ],
+    "diagnostics": {"invariance": {"n_diag": 20, "m_c": 2}, "iso_variance": {"n_base": 5, "m": 2}},
+}
+
+
+def test_shift_sweep_table_has_one_row_per_model_and_shift():
+    spec = next(iter_dataset_specs(CFG))
+    ds = generate_spec_dataset(cfg=CFG, spec=spec, root_seed=2)
+    rows = run_cells(ds=ds, cfg=CFG, spec=spec, cells=grid_cells(CFG), root_seed=2, n_threads=1)
+    table = shift_sweep_table(pd.DataFrame(rows))
+
+    assert len(table) == len(rows) * 4
+    assert set(zip(table["shift_type"], table["shift_c"])) == {
+        ("preserve", 2.0),
+        ("preserve", 5.0),
+        ("naive", 2.0),
+        ("naive", 5.0),
+    }
+    for row in rows:
+        points = table[(table["oracle_mode"] == row["oracle_mode"]) & (table["xgb_config_id"] == row["xgb_config_id"])]
+        assert points[["shift_type", "shift_c", "prauc"]].to_dict("records") == [
+            {k: p[k] for k in ("shift_type", "shift_c", "prauc")} for p in json.loads(row["shift_sweep_json"])
+        ]
+    # Every shift relabels the same test rows: prevalence depends on the shift, not the model.
+    assert table.groupby(["shift_type", "shift_c"])["prevalence_test"].nunique().eq(1).all()